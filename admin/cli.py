@@ -0,0 +1,284 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from db.settings import db_settings
+from knowledge.settings import knowledge_settings
+
+######################################################
+## Maintenance commands for the agent app
+## Usage: python -m admin --help
+######################################################
+
+app = typer.Typer(help="Maintenance commands for the agent app.", no_args_is_help=True)
+console = Console()
+
+
+def _format_bytes(num_bytes: int) -> str:
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+@app.command("index-report")
+def index_report(
+    schema: Optional[str] = typer.Option(None, help="Only report tables in this schema."),
+    suffix: str = typer.Option("_sage_kg", help="Suffix of the knowledge tables to inspect."),
+):
+    """Report ANN and full-text index coverage for every tenant knowledge table."""
+    from db.session import db_engine
+    from knowledge.indexes import get_index_coverage, list_knowledge_tables
+
+    report = Table("schema", "table", "rows (est.)", "size", "vector index", "gin index", "status")
+    uncovered = 0
+    for table_schema, table_name in list_knowledge_tables(db_engine, suffix=suffix):
+        if schema is not None and table_schema != schema:
+            continue
+        coverage = get_index_coverage(db_engine, table_schema, table_name)
+        if coverage is None:
+            continue
+        if coverage.covered:
+            status = "ok"
+        elif coverage.row_estimate < knowledge_settings.kg_index_min_rows:
+            status = "below threshold"
+        else:
+            status = "[red]missing[/red]"
+            uncovered += 1
+        if coverage.invalid_indexes:
+            status += f" ({len(coverage.invalid_indexes)} invalid)"
+        vector_index = coverage.vector_index
+        gin_index = coverage.gin_index
+        report.add_row(
+            table_schema,
+            table_name,
+            str(coverage.row_estimate),
+            _format_bytes(coverage.table_bytes),
+            f"{vector_index.method} {vector_index.storage} {_format_bytes(vector_index.size_bytes)}"
+            if vector_index
+            else "-",
+            _format_bytes(gin_index.size_bytes) if gin_index else "-",
+            status,
+        )
+    console.print(report)
+    if uncovered:
+        console.print(f"{uncovered} table(s) above {knowledge_settings.kg_index_min_rows} rows are missing indexes.")
+
+
+@app.command("index-rebuild")
+def index_rebuild(
+    schema: Optional[str] = typer.Option(None, help="Only rebuild tables in this schema."),
+    suffix: str = typer.Option("_sage_kg", help="Suffix of the knowledge tables to rebuild."),
+    force: bool = typer.Option(False, "--force", help="REINDEX existing indexes and index tables below the threshold."),
+):
+    """Create missing indexes (or rebuild all of them with --force) across tenant schemas."""
+    from db.session import db_engine
+    from knowledge.indexes import ensure_indexes, list_knowledge_tables, rebuild_indexes
+
+    for table_schema, table_name in list_knowledge_tables(db_engine, suffix=suffix):
+        if schema is not None and table_schema != schema:
+            continue
+        try:
+            if force:
+                statements = rebuild_indexes(db_engine, table_schema, table_name)
+            else:
+                statements = ensure_indexes(db_engine, table_schema, table_name)
+        except Exception as e:
+            console.print(f"[red]{table_schema}.{table_name}: {e}[/red]")
+            continue
+        console.print(f"{table_schema}.{table_name}: {len(statements)} statement(s)")
+
+
+@app.command("kg-quantize")
+def kg_quantize(
+    storage: str = typer.Option(
+        knowledge_settings.kg_vector_storage, help="Vectors of the ANN index: full, halfvec or binary."
+    ),
+    schema: Optional[str] = typer.Option(None, help="Only convert tables in this schema."),
+    suffix: str = typer.Option("_sage_kg", help="Suffix of the knowledge tables to convert."),
+    drop_old: bool = typer.Option(False, "--drop-old", help="Drop the ANN indexes over another storage."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only print the statements."),
+):
+    """Build the ANN index of every tenant knowledge table over full, halfvec or binary vectors.
+
+    The new indexes are built next to the current ones, which keep serving searches. Once the
+    API runs with KG_VECTOR_STORAGE set to the same value, run again with --drop-old.
+    """
+    from db.session import db_engine
+    from knowledge.indexes import VECTOR_STORAGES, convert_vector_index, get_index_coverage, list_knowledge_tables
+
+    if storage not in VECTOR_STORAGES:
+        raise typer.BadParameter(f"storage must be one of {', '.join(VECTOR_STORAGES)}")
+    before_total = after_total = 0
+    for table_schema, table_name in list_knowledge_tables(db_engine, suffix=suffix):
+        if schema is not None and table_schema != schema:
+            continue
+        before = get_index_coverage(db_engine, table_schema, table_name)
+        try:
+            statements = convert_vector_index(
+                db_engine, table_schema, table_name, storage=storage, drop_old=drop_old, dry_run=dry_run
+            )
+        except Exception as e:
+            console.print(f"[red]{table_schema}.{table_name}: {e}[/red]")
+            continue
+        if not statements:
+            continue
+        if dry_run:
+            for statement in statements:
+                console.print(f"{statement};")
+            continue
+        after = get_index_coverage(db_engine, table_schema, table_name)
+        old = sum(i.size_bytes for i in before.stale_vector_indexes(storage)) if before else 0
+        new = after.vector_index_for(storage).size_bytes if after and after.vector_index_for(storage) else 0
+        before_total, after_total = before_total + old, after_total + new
+        console.print(f"{table_schema}.{table_name}: ANN index {_format_bytes(old)} -> {_format_bytes(new)} {storage}")
+    if not dry_run:
+        console.print(f"ANN indexes: {_format_bytes(before_total)} -> {_format_bytes(after_total)} ({storage})")
+        if storage != knowledge_settings.kg_vector_storage:
+            console.print(f"Set KG_VECTOR_STORAGE={storage} so searches use the new indexes, then run with --drop-old.")
+
+
+@app.command("migrate-shared")
+def migrate_shared(
+    user_name: Optional[str] = typer.Option(None, "--user", help="Only migrate this user."),
+    drop_source: bool = typer.Option(False, "--drop-source", help="Drop the per-user tables once copied."),
+):
+    """Copy per-user schema tables into the shared, tenant-partitioned tables."""
+    from admin.migrate_shared import migrate_all
+    from db.session import db_engine
+
+    for migration in migrate_all(db_engine, db_settings.shared_schema, drop_source=drop_source, user_name=user_name):
+        copied = ", ".join(f"{table}: {rows}" for table, rows in migration.copied.items()) or "nothing to copy"
+        console.print(f"{migration.user_name} ({migration.tenant_id}): {copied}")
+        if migration.dropped:
+            console.print(f"  dropped {', '.join(migration.dropped)}")
+    console.print(f"Set TENANT_STORAGE_LAYOUT=shared to serve tenants from {db_settings.shared_schema}.")
+
+
+@app.command("blobs-migrate")
+def blobs_migrate(
+    tenant_id: Optional[str] = typer.Option(None, "--tenant", help="Only migrate this tenant's directory."),
+):
+    """Move the files in rag_data/<tenant_id>/ into the content-addressed blob store."""
+    from knowledge.blobstore import blob_store, migrate_tenant_dir
+    from knowledge.watcher import load_state
+
+    before = _dir_bytes(blob_store.root)
+    for tenant in [tenant_id] if tenant_id else blob_store.tenants():
+        # Files kept in sync by `watch` stay in place
+        moved = migrate_tenant_dir(blob_store, tenant, skip=load_state(blob_store.root / tenant))
+        if moved:
+            console.print(f"{tenant}: {len(moved)} file(s)")
+    after = _dir_bytes(blob_store.root)
+    console.print(f"rag_data: {_format_bytes(before)} -> {_format_bytes(after)} ({blob_store.codec} blobs)")
+
+
+@app.command("blobs-gc")
+def blobs_gc(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only report what would be removed."),
+    grace_seconds: int = typer.Option(
+        knowledge_settings.kg_blob_gc_grace_seconds, help="Keep unreferenced blobs younger than this."
+    ),
+):
+    """Remove raw document blobs that no tenant manifest refers to."""
+    from knowledge.blobstore import blob_store
+
+    result = blob_store.gc(grace_seconds=grace_seconds, dry_run=dry_run)
+    action = "would remove" if dry_run else "removed"
+    console.print(
+        f"{action} {result.removed} blob(s), {_format_bytes(result.freed_bytes)}; {result.kept} blob(s) referenced"
+    )
+
+
+@app.command("sessions-archive")
+def sessions_archive(
+    idle_days: int = typer.Option(db_settings.session_archive_idle_days, help="Archive sessions idle for longer."),
+    schema: Optional[str] = typer.Option(None, help="Only archive session tables in this schema."),
+    limit: Optional[int] = typer.Option(None, help="Archive at most this many sessions per table."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only count the idle sessions."),
+):
+    """Move idle sessions of the per-schema *_sessions tables into compressed <table>_archive tables."""
+    from db.partitioned import SHARED_SESSIONS_TABLE
+    from db.session import db_engine, db_url
+    from db.storage import schema_storage_class
+    from knowledge.indexes import list_knowledge_tables
+
+    storage_class = schema_storage_class()
+    idle_seconds = idle_days * 86400
+    total = 0
+    for table_schema, table_name in list_knowledge_tables(db_engine, suffix="_sessions"):
+        if schema is not None and table_schema != schema:
+            continue
+        if table_schema == db_settings.shared_schema and table_name == SHARED_SESSIONS_TABLE:
+            continue
+        storage = storage_class(table_name=table_name, schema=table_schema, db_url=db_url)
+        if dry_run:
+            count = len(storage.idle_session_ids(idle_seconds, limit))
+            if count:
+                console.print(f"{table_schema}.{table_name}: {count} idle session(s)")
+            total += count
+            continue
+        archived = storage.archive_idle_sessions(idle_seconds=idle_seconds, limit=limit)
+        if archived:
+            console.print(
+                f"{table_schema}.{table_name}: {len(archived)} session(s), {_format_bytes(sum(archived.values()))}"
+            )
+        total += len(archived)
+    console.print(
+        f"{'would archive' if dry_run else 'archived'} {total} session(s) idle for more than {idle_days} days"
+    )
+
+
+@app.command("usage-rollup")
+def usage_rollup(
+    hours: Optional[int] = typer.Option(None, help="Rebuild the last N hours instead of the latest rolled-up ones."),
+):
+    """Rebuild the hourly usage rollups per tenant, agent and model behind the usage admin page."""
+    from db.session import db_engine
+    from db.usage import rollup_usage, window_start
+
+    rows = rollup_usage(db_engine, window_start(hours) if hours else None)
+    if rows is None:
+        console.print("An API worker is rebuilding the rollups right now, try again later.")
+    else:
+        console.print(f"wrote {rows} rollup row(s)")
+
+
+@app.command("watch")
+def watch(
+    tenant_ids: Optional[List[str]] = typer.Option(None, "--tenant", help="Only watch these tenants."),
+    poll: bool = typer.Option(
+        knowledge_settings.kg_watch_force_polling, "--poll", help="Poll instead of using inotify (e.g. network mounts)."
+    ),
+):
+    """Ingest files added to, changed in or removed from rag_data/<tenant_id>/ as they change."""
+    from db.session import db_engine
+    from db.tenancy import list_tenants
+    from knowledge.store import get_tenant_knowledge
+    from knowledge.watcher import RagDataWatcher
+
+    usernames: Dict[str, str] = {}
+
+    def get_knowledge(tenant_id: str):
+        if tenant_id not in usernames:
+            # New users register while the watcher runs
+            usernames.update({tenant: name for name, tenant in list_tenants(db_engine)})
+        if tenant_id not in usernames:
+            return None
+        return get_tenant_knowledge(tenant_id, usernames[tenant_id])
+
+    console.print("Watching rag_data for changes, press Ctrl+C to stop.")
+    RagDataWatcher(get_knowledge, tenant_ids=tenant_ids, force_polling=poll).run()
+
+
+if __name__ == "__main__":
+    app()
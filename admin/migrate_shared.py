@@ -0,0 +1,134 @@
+"""Copy tenants from the per-user schema layout into the shared, tenant-partitioned tables."""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql.expression import text
+
+from db.partitioned import (
+    SHARED_KNOWLEDGE_TABLE,
+    SHARED_SESSIONS_TABLE,
+    create_shared_knowledge_table,
+    create_shared_sessions_table,
+    ensure_tenant_partition,
+)
+from db.tenancy import list_tenants, table_prefix, tenant_schema
+from knowledge.indexes import build_document_id_sql, qualified_name
+from utils.log import logger
+
+KNOWLEDGE_COLUMNS = (
+    "id, name, meta_data, filters, content, embedding, usage, created_at, updated_at, content_hash, document_id"
+)
+SESSION_COLUMNS = ", ".join(
+    (
+        "session_id",
+        "agent_id",
+        "user_id",
+        "team_session_id",
+        "memory",
+        "session_data",
+        "extra_data",
+        "agent_data",
+        "created_at",
+        "updated_at",
+    )
+)
+
+
+@dataclass
+class TenantMigration:
+    user_name: str
+    tenant_id: str
+    # Rows copied per source table
+    copied: Dict[str, int] = field(default_factory=dict)
+    dropped: List[str] = field(default_factory=list)
+
+
+def _table_exists(conn: Connection, schema: str, table: str) -> bool:
+    fqtn = qualified_name(schema, table)
+    return conn.execute(text("SELECT to_regclass(:fqtn) IS NOT NULL"), {"fqtn": fqtn}).scalar()
+
+
+def _embedding_dimensions(conn: Connection, schema: str, table: str) -> Optional[int]:
+    """Dimensions of the embedding column, from its vector(n) type modifier."""
+    return conn.execute(
+        text(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:fqtn) AND attname = 'embedding' AND atttypmod > 0"
+        ),
+        {"fqtn": qualified_name(schema, table)},
+    ).scalar()
+
+
+def migrate_tenant(
+    engine: Engine, user_name: str, tenant_id: str, shared_schema: str, drop_source: bool = False
+) -> TenantMigration:
+    """Copy one tenant's knowledge and session tables into the shared tables.
+
+    Rows are copied with ON CONFLICT DO NOTHING, so a partially migrated tenant can be migrated again.
+    The source tables are dropped only when `drop_source` is set, in the same transaction as the copy.
+    """
+    schema = tenant_schema(user_name)
+    prefix = table_prefix(tenant_id)
+    result = TenantMigration(user_name=user_name, tenant_id=tenant_id)
+    knowledge_table = f"{prefix}_sage_kg"
+    session_tables = {f"{prefix}_sage_sessions": "sage", f"{prefix}_scholar_sessions": "scholar"}
+
+    with engine.connect() as conn:
+        dimensions = (
+            _embedding_dimensions(conn, schema, knowledge_table)
+            if _table_exists(conn, schema, knowledge_table)
+            else None
+        )
+    if dimensions is not None:
+        create_shared_knowledge_table(engine, shared_schema, dimensions)
+        ensure_tenant_partition(engine, shared_schema, SHARED_KNOWLEDGE_TABLE, tenant_id)
+    create_shared_sessions_table(engine, shared_schema)
+    ensure_tenant_partition(engine, shared_schema, SHARED_SESSIONS_TABLE, tenant_id)
+
+    shared_knowledge = qualified_name(shared_schema, SHARED_KNOWLEDGE_TABLE)
+    shared_sessions = qualified_name(shared_schema, SHARED_SESSIONS_TABLE)
+    with engine.begin() as conn:
+        if dimensions is not None:
+            for statement in build_document_id_sql(schema, knowledge_table):
+                conn.execute(text(statement))
+            copied = conn.execute(
+                text(
+                    f"INSERT INTO {shared_knowledge} (tenant_id, {KNOWLEDGE_COLUMNS}) "
+                    f"SELECT CAST(:tenant_id AS uuid), {KNOWLEDGE_COLUMNS} "
+                    f"FROM {qualified_name(schema, knowledge_table)} ON CONFLICT DO NOTHING"
+                ),
+                {"tenant_id": tenant_id},
+            ).rowcount
+            result.copied[knowledge_table] = copied
+        for table, agent_id in session_tables.items():
+            if not _table_exists(conn, schema, table):
+                continue
+            copied = conn.execute(
+                text(
+                    f"INSERT INTO {shared_sessions} (tenant_id, {SESSION_COLUMNS}) "
+                    f"SELECT CAST(:tenant_id AS uuid), session_id, COALESCE(agent_id, :agent_id), user_id, "
+                    "team_session_id, memory, session_data, extra_data, agent_data, created_at, updated_at "
+                    f"FROM {qualified_name(schema, table)} ON CONFLICT DO NOTHING"
+                ),
+                {"tenant_id": tenant_id, "agent_id": agent_id},
+            ).rowcount
+            result.copied[table] = copied
+        if drop_source:
+            for table in result.copied:
+                conn.execute(text(f"DROP TABLE {qualified_name(schema, table)}"))
+                result.dropped.append(table)
+    logger.info(f"Migrated tenant {user_name}: {result.copied}")
+    return result
+
+
+def migrate_all(
+    engine: Engine, shared_schema: str, drop_source: bool = False, user_name: Optional[str] = None
+) -> List[TenantMigration]:
+    migrations = []
+    for name, tenant_id in list_tenants(engine):
+        if user_name is not None and name != user_name:
+            continue
+        migrations.append(migrate_tenant(engine, name, tenant_id, shared_schema, drop_source=drop_source))
+    return migrations
@@ -0,0 +1,123 @@
+"""Process-wide HTTP clients for model calls.
+
+Agents are built per request, and agno's OpenAIChat opens a new connection pool for each client,
+so every run paid for a TCP and TLS handshake. Models built with `agents.models.get_openai_chat`
+share these clients instead: one sync client for the process and one async client per event loop
+(connections belong to the loop that opened them, Streamlit runs each script in a new loop).
+
+Requests and new connections are counted through httpcore's trace extension, `GET /v1/model-clients`
+returns the counts and the connection reuse rate of a worker.
+"""
+
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass
+from importlib.util import find_spec
+from typing import Any, Dict, Optional
+
+import httpx
+
+from agents.settings import llm_settings
+
+
+@dataclass
+class HttpClientStats:
+    requests: int = 0
+    # New TCP connections and TLS handshakes, every other request reused a pooled connection
+    connections: int = 0
+    tls_handshakes: int = 0
+    http2_responses: int = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        return 1 - min(self.connections, self.requests) / self.requests if self.requests else 0.0
+
+
+class ClientMetrics:
+    def __init__(self):
+        self._stats = HttpClientStats()
+        self._lock = threading.Lock()
+
+    def record(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self._stats, name, getattr(self._stats, name) + count)
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.record(connections=1)
+        elif event_name == "connection.start_tls.complete":
+            self.record(tls_handshakes=1)
+
+    async def atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self.trace(event_name, info)
+
+    def on_request(self, request: httpx.Request) -> None:
+        self.record(requests=1)
+        request.extensions["trace"] = self.trace
+
+    async def on_async_request(self, request: httpx.Request) -> None:
+        self.record(requests=1)
+        request.extensions["trace"] = self.atrace
+
+    def on_response(self, response: httpx.Response) -> None:
+        if response.http_version == "HTTP/2":
+            self.record(http2_responses=1)
+
+    async def on_async_response(self, response: httpx.Response) -> None:
+        self.on_response(response)
+
+    def stats(self) -> HttpClientStats:
+        with self._lock:
+            return HttpClientStats(**vars(self._stats))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = HttpClientStats()
+
+
+client_metrics = ClientMetrics()
+
+_sync_client: Optional[httpx.Client] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def client_options() -> Dict[str, Any]:
+    return dict(
+        http2=llm_settings.llm_http2 and find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=llm_settings.llm_max_connections,
+            max_keepalive_connections=llm_settings.llm_max_keepalive_connections,
+            keepalive_expiry=llm_settings.llm_keepalive_expiry,
+        ),
+    )
+
+
+def shared_http_client() -> httpx.Client:
+    global _sync_client
+    with _clients_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(
+                **client_options(),
+                event_hooks={"request": [client_metrics.on_request], "response": [client_metrics.on_response]},
+            )
+        return _sync_client
+
+
+def shared_async_http_client() -> httpx.AsyncClient:
+    """The async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                **client_options(),
+                event_hooks={
+                    "request": [client_metrics.on_async_request],
+                    "response": [client_metrics.on_async_response],
+                },
+            )
+            _async_clients[loop] = client
+        return client
@@ -0,0 +1,32 @@
+from agno.models.openai import OpenAIChat
+from openai import AsyncOpenAI, OpenAI
+
+from agents.http_client import shared_async_http_client, shared_http_client
+from agents.routing import AUTO_MODEL
+from agents.runtime import ConcurrentToolCallsMixin
+from agents.settings import llm_settings
+
+
+class SharedClientOpenAIChat(OpenAIChat):
+    """OpenAIChat whose API clients use the process-wide connection pools of agents.http_client."""
+
+    def get_client(self) -> OpenAI:
+        if self.client is None:
+            self.client = OpenAI(**self._get_client_params(), http_client=shared_http_client())
+        return self.client
+
+    def get_async_client(self) -> AsyncOpenAI:
+        # Not kept on the model: the pool belongs to the running event loop
+        return AsyncOpenAI(**self._get_client_params(), http_client=shared_async_http_client())
+
+
+class AgentOpenAIChat(ConcurrentToolCallsMixin, SharedClientOpenAIChat):
+    """Model of the agents: shared HTTP connections and capped concurrent tool calls."""
+
+
+def get_openai_chat(model_id: str) -> OpenAIChat:
+    """Model used by the agents, built per request but sharing the HTTP connections.
+
+    "auto" starts with the fast model, agents.routing.route_agent switches it per query.
+    """
+    return AgentOpenAIChat(id=llm_settings.llm_fast_model if model_id == AUTO_MODEL else model_id)
@@ -0,0 +1,120 @@
+"""The "auto" model: route each query to the fast or the strong model.
+
+A local classifier scores the query, without a model call:
+
+- length: long and very long queries
+- question type: analysis (why, compare, trade-offs, step by step, ...) versus lookups (what is,
+  who, when, ...), which the agents' instructions say need no in-depth analysis
+- several questions or enumerated parts in one message
+- calculations and code
+- research that needs several tool calls (sources, latest news, ...)
+
+Queries scoring at least `LLM_ROUTE_COMPLEX_SCORE` go to `LLM_STRONG_MODEL`, the others to
+`LLM_FAST_MODEL`. Every decision is logged with its score and reasons, and `record_route_latency`
+logs the run time per route, so the thresholds can be tuned from the logs. `GET /v1/agent-runs`
+also aggregates the runs and latency per model.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List
+
+from agents.run_metrics import run_metrics
+from agents.settings import llm_settings
+from utils.log import logger
+
+if TYPE_CHECKING:
+    from agno.agent import Agent
+
+AUTO_MODEL = "auto"
+
+ANALYSIS_TERMS = re.compile(
+    r"\b(why|how (?:do|does|can|could|should|would)|explain|compare|comparison|versus|vs\.?|analy[sz]e|analysis"
+    r"|evaluate|trade-?offs?|pros and cons|step[- ]by[- ]step|design|derive|prove|plan|strateg(?:y|ies)"
+    r"|implications?|in[- ]depth|detailed|recommend)\b",
+    re.IGNORECASE,
+)
+LOOKUP_START = re.compile(r"^\s*(what(?: is|'s| are)|who|when|where|which|define|translate)\b", re.IGNORECASE)
+ENUMERATION = re.compile(r"(^|\n)\s*(?:\d+[.)]|[-*•])\s+\S")
+CALCULATION = re.compile(r"```|\d\s*[-+*/^=]\s*\d|\b(calculate|compute|solve|equation|algorithm|code)\b", re.IGNORECASE)
+RESEARCH_TERMS = re.compile(
+    r"\b(sources?|cite|citations?|research|latest|recent|news|survey|literature)\b", re.IGNORECASE
+)
+
+
+@dataclass
+class RouteDecision:
+    requested: str
+    model_id: str
+    score: float = 0.0
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def routed(self) -> bool:
+        return self.requested == AUTO_MODEL
+
+
+def score_query(message: str) -> RouteDecision:
+    """Score a query, higher means it needs the strong model."""
+    score, reasons = 0.0, []
+    words = len(message.split())
+    if words >= 2 * llm_settings.llm_route_long_words:
+        score += 2
+        reasons.append(f"very long ({words} words)")
+    elif words >= llm_settings.llm_route_long_words:
+        score += 1
+        reasons.append(f"long ({words} words)")
+
+    analysis = {match.lower() for match in ANALYSIS_TERMS.findall(message)}
+    if analysis:
+        score += 1 if len(analysis) == 1 else 2
+        reasons.append(f"analysis: {', '.join(sorted(analysis))}")
+    elif LOOKUP_START.search(message) and words < llm_settings.llm_route_long_words:
+        score -= 1
+        reasons.append("lookup question")
+
+    if message.count("?") >= 2 or ENUMERATION.search(message):
+        score += 1
+        reasons.append("several parts")
+    if CALCULATION.search(message):
+        score += 1
+        reasons.append("calculation or code")
+    if RESEARCH_TERMS.search(message):
+        score += 0.5
+        reasons.append("research with several searches")
+
+    model_id = (
+        llm_settings.llm_strong_model if score >= llm_settings.llm_route_complex_score else llm_settings.llm_fast_model
+    )
+    return RouteDecision(requested=AUTO_MODEL, model_id=model_id, score=score, reasons=reasons)
+
+
+def route_model(requested: str, message: str) -> RouteDecision:
+    """Model for a query: the requested one, or the one picked by the classifier for "auto"."""
+    if requested != AUTO_MODEL:
+        return RouteDecision(requested=requested, model_id=requested)
+    decision = score_query(message)
+    logger.info(
+        f"Routed query to {decision.model_id} (score {decision.score:g}: {'; '.join(decision.reasons) or 'simple'})"
+    )
+    return decision
+
+
+def route_agent(agent: "Agent", requested: str, message: str) -> RouteDecision:
+    """Route a query and switch the agent's model if needed, agents are built with the fast model for "auto"."""
+    decision = route_model(requested, message)
+    if decision.routed and (agent.model is None or agent.model.id != decision.model_id):
+        from agents.models import get_openai_chat
+
+        agent.model = get_openai_chat(decision.model_id)
+        # agno sets the tools on the model once per agent, have them set on the new model
+        agent._functions_for_model = None
+        agent._tools_for_model = None
+    return decision
+
+
+def record_route_latency(decision: RouteDecision, seconds: float) -> None:
+    if not decision.routed:
+        return
+    logger.info(f"Route {decision.model_id} answered in {seconds:.2f}s (score {decision.score:g})")
+    run_metrics.record_route(decision.model_id, seconds)
@@ -0,0 +1,87 @@
+"""Counts of completed and cancelled streaming runs of a worker, see `GET /v1/agent-runs`.
+
+A run is cancelled when its client disconnects mid-stream (agents.runtime.cancel_run). What the
+cancellation saved is estimated from the completed runs: a cancelled run would have taken as long
+and written as much as the average completed run.
+
+Runs of the "auto" model are also counted per model it routed to (agents.routing).
+"""
+
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass
+class RunStats:
+    completed_runs: int = 0
+    completed_seconds: float = 0.0
+    completed_output_chars: int = 0
+    cancelled_runs: int = 0
+    # Run time and output until the client disconnected
+    cancelled_seconds: float = 0.0
+    cancelled_output_chars: int = 0
+    # Tool calls that were running when their run was cancelled
+    cancelled_tool_calls: int = 0
+
+    @property
+    def estimated_saved_seconds(self) -> float:
+        if not self.completed_runs:
+            return 0.0
+        average = self.completed_seconds / self.completed_runs
+        return max(average * self.cancelled_runs - self.cancelled_seconds, 0.0)
+
+    @property
+    def estimated_saved_output_chars(self) -> int:
+        if not self.completed_runs:
+            return 0
+        average = self.completed_output_chars / self.completed_runs
+        return max(round(average * self.cancelled_runs) - self.cancelled_output_chars, 0)
+
+
+class RunMetrics:
+    def __init__(self):
+        self._stats = RunStats()
+        self._route_runs: Dict[str, int] = defaultdict(int)
+        self._route_seconds: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record_completed(self, seconds: float, output_chars: int) -> None:
+        with self._lock:
+            self._stats.completed_runs += 1
+            self._stats.completed_seconds += seconds
+            self._stats.completed_output_chars += output_chars
+
+    def record_cancelled(self, seconds: float, output_chars: int, tool_calls: int) -> None:
+        with self._lock:
+            self._stats.cancelled_runs += 1
+            self._stats.cancelled_seconds += seconds
+            self._stats.cancelled_output_chars += output_chars
+            self._stats.cancelled_tool_calls += tool_calls
+
+    def record_route(self, model_id: str, seconds: float) -> None:
+        with self._lock:
+            self._route_runs[model_id] += 1
+            self._route_seconds[model_id] += seconds
+
+    def stats(self) -> RunStats:
+        with self._lock:
+            return RunStats(**vars(self._stats))
+
+    def routes(self) -> Dict[str, Dict[str, float]]:
+        """Runs and average run time per model picked by the "auto" model."""
+        with self._lock:
+            return {
+                model_id: {"runs": runs, "avg_seconds": round(self._route_seconds[model_id] / runs, 3)}
+                for model_id, runs in self._route_runs.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = RunStats()
+            self._route_runs.clear()
+            self._route_seconds.clear()
+
+
+run_metrics = RunMetrics()
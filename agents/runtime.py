@@ -0,0 +1,117 @@
+"""Tool execution of the agents.
+
+When the model asks for several tools in one assistant message (Sage and Scholar search 1-3
+terms), agno runs them concurrently in async runs and keeps their results in the order of the
+tool calls. `ConcurrentToolCallsMixin` caps that concurrency at `LLM_MAX_PARALLEL_TOOL_CALLS` per
+turn, so a run cannot open an unbounded number of searches and database connections at once.
+Sync runs (`agent.run`) keep agno's sequential execution.
+
+`ToolMetricsAgent` adds the time of every tool call to the run metrics, which agno builds from
+the assistant messages only: `tool_call_times` maps tool names to their call times in seconds.
+
+`cancel_run` stops a streaming run whose client went away and keeps what it produced so far
+as a run marked `RunCancelled` in the session.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from agno.agent import Agent
+from agno.memory.agent import AgentRun
+from agno.models.message import Message
+from agno.run.response import RunEvent, RunResponse
+
+from agents.run_metrics import run_metrics
+from agents.settings import llm_settings
+from utils.log import logger
+
+
+class ConcurrentToolCallsMixin:
+    """For agno models: at most `max_parallel_tool_calls` tool calls of a turn run at once."""
+
+    max_parallel_tool_calls: int = llm_settings.llm_max_parallel_tool_calls
+    _tool_call_slots: Optional[asyncio.Semaphore] = None
+
+    async def arun_function_calls(self, function_calls, function_call_results: List[Message]):
+        # Created per turn, Streamlit runs a cached agent on a new event loop every time
+        self._tool_call_slots = asyncio.Semaphore(max(1, self.max_parallel_tool_calls))
+        try:
+            async for response in super().arun_function_calls(function_calls, function_call_results):  # type: ignore[misc]
+                yield response
+        finally:
+            self._tool_call_slots = None
+
+    async def _arun_function_call(self, function_call):
+        if self._tool_call_slots is None:
+            return await super()._arun_function_call(function_call)  # type: ignore[misc]
+        # The call's timer starts once it has a slot, so it measures the tool only
+        async with self._tool_call_slots:
+            return await super()._arun_function_call(function_call)  # type: ignore[misc]
+
+
+class ToolMetricsAgent(Agent):
+    """Agent whose run metrics include `tool_call_times`."""
+
+    def aggregate_metrics_from_messages(self, messages: List[Message]) -> Dict[str, Any]:
+        metrics = super().aggregate_metrics_from_messages(messages)
+        tool_role = self.model.tool_message_role if self.model is not None else "tool"
+        tool_call_times: Dict[str, List[float]] = defaultdict(list)
+        for m in messages:
+            if m.role == tool_role and m.tool_name and m.metrics is not None and m.metrics.time is not None:
+                tool_call_times[m.tool_name].append(m.metrics.time)
+        if tool_call_times:
+            metrics["tool_call_times"] = dict(tool_call_times)
+        return metrics
+
+
+def in_flight_tool_calls(run_response: Optional[RunResponse]) -> int:
+    """Tool calls of the run that started but did not complete."""
+    if run_response is None or not run_response.tools:
+        return 0
+    # Completed calls are replaced by their result, which has a `content` key
+    return sum(1 for tool in run_response.tools if "content" not in tool)
+
+
+def save_cancelled_run(agent: Agent) -> None:
+    """Add the partial run to the agent's memory, marked as cancelled, and write the session."""
+    run_response, run_messages = agent.run_response, agent.run_messages
+    if run_response is None or run_messages is None or agent.memory is None:
+        return
+    messages = [m for m in run_messages.messages if m.add_to_agent_memory]
+    partial = None
+    if isinstance(run_response.content, str) and run_response.content:
+        # The answer being streamed, the model adds its message only once the turn completes
+        role = agent.model.assistant_message_role if agent.model is not None else "assistant"
+        partial = Message(role=role, content=run_response.content)
+        messages.append(partial)
+    run_response.event = RunEvent.run_cancelled.value
+    run_response.messages = messages
+    run_response.metrics = agent.aggregate_metrics_from_messages(messages)
+
+    agent.memory.add_messages(messages=[m for m in (run_messages.user_message, partial) if m is not None])
+    agent_run = AgentRun(response=run_response)
+    agent_run.message = run_messages.user_message
+    agent.memory.add_run(agent_run)
+    agent.write_to_storage()
+
+
+async def cancel_run(agent: Agent, run_stream: AsyncIterator[RunResponse], elapsed_seconds: float) -> None:
+    """Stop a streaming run and save it as cancelled.
+
+    Closing the run's generator closes the model stream below it, which closes the HTTP response to
+    the model API. Tool calls running in the event loop were cancelled with the request; those that
+    run in threads (sync tools) finish, but their results are dropped.
+    """
+    tool_calls = in_flight_tool_calls(agent.run_response)
+    try:
+        await run_stream.aclose()  # type: ignore[attr-defined]
+    except Exception as e:
+        logger.warning(f"Error while closing cancelled run: {e}")
+    content = agent.run_response.content if agent.run_response is not None else None
+    output_chars = len(content) if isinstance(content, str) else 0
+    run_metrics.record_cancelled(elapsed_seconds, output_chars, tool_calls)
+    try:
+        await asyncio.to_thread(save_cancelled_run, agent)
+    except Exception as e:
+        logger.warning(f"Could not save cancelled run: {e}")
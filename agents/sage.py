@@ -1,14 +1,11 @@
 # NEW (MULTITENANCY)
-from sqlalchemy import create_engine, text
-import re
 from textwrap import dedent
 from typing import Optional
 from agno.agent import Agent, AgentKnowledge
-from agno.models.openai import OpenAIChat
-from agno.storage.agent.postgres import PostgresAgentStorage
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.vectordb.pgvector import PgVector, SearchType
-from db.session import db_url
+from agents.runtime import ToolMetricsAgent
+from db.storage import get_agent_storage
+from db.tenancy import tenant_schema
+from knowledge.store import get_vector_db
 
 def get_sage(
     model_id: str = "gpt-4o",
@@ -18,6 +15,11 @@ def get_sage(
     session_id: Optional[str] = None,
     debug_mode: bool = True,
 ) -> Agent:
+    # The OpenAI client and the search tool dominate import time, load them with the first agent
+    from agno.tools.duckduckgo import DuckDuckGoTools
+
+    from agents.models import get_openai_chat
+
     additional_context = ""
     if user_id:
         additional_context += ""
@@ -27,44 +29,21 @@ def get_sage(
     if tenant_id:
         rag_path = os.path.join("rag_data", tenant_id)
         os.makedirs(rag_path, exist_ok=True)
-        table_name = f"{tenant_id[:8]}_sage_kg"
-        
-        # ✅ Sanitize username for schema usage
-        if not username:
-            raise ValueError("Username is required for schema assignment.")
-        schema = re.sub(r'\W+', '_', username.lower())
-
-        # ✅ Create schema if not exists
-        engine = create_engine(db_url)
-        with engine.connect() as conn:
-            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
-            
-            # ✅ Create knowledge table if not exists
-            # create_table_query = f"""
-            # CREATE TABLE IF NOT EXISTS "{schema}"."{table_name}" (
-            #     id TEXT PRIMARY KEY,
-            #     name TEXT,
-            #     meta_data JSONB,
-            #     filters JSONB,
-            #     content TEXT
-            # );
-            # """
-            # conn.execute(text(create_table_query))
-
+        schema = tenant_schema(username)
 
-        return Agent(
+        return ToolMetricsAgent(
             name="Sage",
             agent_id="sage",
             user_id=user_id,
             session_id=session_id,
-            model=OpenAIChat(id=model_id),
+            model=get_openai_chat(model_id),
             # Tools available to the agent
             tools=[DuckDuckGoTools()],
             # Storage for the agent
-            storage=PostgresAgentStorage(table_name=f"{tenant_id[:8]}_sage_sessions" if tenant_id else "sage_sessions", schema=schema, db_url=db_url),
+            storage=get_agent_storage("sage", tenant_id=tenant_id, schema=schema),
             # Knowledge base for the agent
             knowledge=AgentKnowledge(
-                vector_db=PgVector(table_name=table_name, schema=schema, db_url=db_url, search_type=SearchType.hybrid)
+                vector_db=get_vector_db(tenant_id, schema=schema)
             ),
             # Description of the agent
             description=dedent("""\
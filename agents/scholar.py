@@ -1,14 +1,11 @@
 from textwrap import dedent
 from typing import Optional
-from sqlalchemy import create_engine, text
-import re
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from agno.storage.agent.postgres import PostgresAgentStorage
-from agno.tools.duckduckgo import DuckDuckGoTools
 
-from db.session import db_url
+from agents.runtime import ToolMetricsAgent
+from db.storage import get_agent_storage
+from db.tenancy import tenant_schema
 
 
 def get_scholar(
@@ -19,6 +16,11 @@ def get_scholar(
     session_id: Optional[str] = None,
     debug_mode: bool = True,
 ) -> Agent:
+    # The OpenAI client and the search tool dominate import time, load them with the first agent
+    from agno.tools.duckduckgo import DuckDuckGoTools
+
+    from agents.models import get_openai_chat
+
     additional_context = ""
     if user_id:
         additional_context += "<context>"
@@ -26,30 +28,22 @@ def get_scholar(
         additional_context += "</context>"
 
         import os
+    schema = None
     if tenant_id:
         # rag_path = os.path.join("rag_data", tenant_id)
         # os.makedirs(rag_path, exist_ok=True)
-        
-        if not username:
-            raise ValueError("Username is required for schema assignment.")
-        schema = re.sub(r'\W+', '_', username.lower())
-
-        # ✅ Create schema if not exists
-        engine = create_engine(db_url)
-        with engine.connect() as conn:
-            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
-            
+        schema = tenant_schema(username)
 
-    return Agent(
+    return ToolMetricsAgent(
         name="Scholar",
         agent_id="scholar",
         user_id=user_id,
         session_id=session_id,
-        model=OpenAIChat(id=model_id),
+        model=get_openai_chat(model_id),
         # Tools available to the agent
         tools=[DuckDuckGoTools()],
         # Storage for the agent
-        storage=PostgresAgentStorage(table_name=f"{tenant_id[:8]}_scholar_sessions" if tenant_id else "scholar_sessions", schema=schema, db_url=db_url),
+        storage=get_agent_storage("scholar", tenant_id=tenant_id, schema=schema),
         # Description of the agent
         description=dedent("""\
             You are Scholar, a cutting-edge Answer Engine built to deliver precise, context-rich, and engaging responses.
@@ -0,0 +1,39 @@
+from typing import Dict
+
+from pydantic_settings import BaseSettings
+
+
+class LlmSettings(BaseSettings):
+    """Settings of model calls and tool execution, set using environment variables.
+
+    Reference: https://docs.pydantic.dev/latest/usage/pydantic_settings/
+    """
+
+    # Negotiate HTTP/2 with the model API, used when the `h2` package is installed
+    llm_http2: bool = True
+    # Connections of the process-wide client pool, per event loop for the async client
+    llm_max_connections: int = 100
+    # Idle connections kept open, and for how many seconds
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 60.0
+
+    # Tool calls of one model turn that run at the same time, see agents.runtime
+    llm_max_parallel_tool_calls: int = 4
+
+    # Models of the "auto" option, see agents.routing: simple queries go to the fast model,
+    # queries scoring at least `llm_route_complex_score` to the strong one
+    llm_fast_model: str = "gpt-4o"
+    llm_strong_model: str = "o3-mini"
+    llm_route_complex_score: float = 2.0
+    # Queries of at least this many words count as long, twice as many as very long
+    llm_route_long_words: int = 40
+
+    # USD per million tokens by model, for the cost of the usage ledger (db.usage). Set as JSON.
+    llm_prices: Dict[str, Dict[str, float]] = {
+        "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+        "o3-mini": {"input": 1.10, "cached_input": 0.55, "output": 4.40},
+    }
+
+
+# Create LlmSettings object
+llm_settings = LlmSettings()
@@ -0,0 +1,76 @@
+"""Usage records of agent runs for the usage ledger (db.usage).
+
+A record is built from the run metrics agno keeps on `agent.run_response`, once the run is over:
+tokens and prompt cache hits of the model calls, the time spent in model calls, to the first
+streamed token and in tool calls (see agents.runtime.ToolMetricsAgent), and whether the session
+came from the process cache. Cost uses the `LLM_PRICES` of the model.
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from agno.agent import Agent
+
+from agents.settings import llm_settings
+from db.usage import UsageRecord, usage_writer
+from utils.log import logger
+
+
+def run_cost(model_id: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    prices = llm_settings.llm_prices.get(model_id)
+    if prices is None:
+        return 0.0
+    cached_price = prices.get("cached_input", prices.get("input", 0.0))
+    cost = (
+        (input_tokens - cached_tokens) * prices.get("input", 0.0)
+        + cached_tokens * cached_price
+        + output_tokens * prices.get("output", 0.0)
+    )
+    return cost / 1_000_000
+
+
+def _ms(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+def usage_record(agent: Agent, tenant_id: Optional[str], status: str, seconds: float) -> UsageRecord:
+    # ai.usage_runs.tenant_id is a UUID, a record it would reject is not queued (ValueError)
+    tenant_id = str(uuid.UUID(tenant_id)) if tenant_id else None
+    run_response = agent.run_response
+    metrics: Dict[str, Any] = (run_response.metrics if run_response is not None else None) or {}
+    input_tokens = sum(metrics.get("input_tokens", []))
+    output_tokens = sum(metrics.get("output_tokens", []))
+    cached_tokens = sum(
+        (details or {}).get("cached_tokens") or 0 for details in metrics.get("prompt_tokens_details", [])
+    )
+    first_token = metrics.get("time_to_first_token") or []
+    tool_times = [time for times in (metrics.get("tool_call_times") or {}).values() for time in times]
+    model_id = agent.model.id if agent.model is not None else "unknown"
+    return UsageRecord(
+        created_at=datetime.now(timezone.utc),
+        tenant_id=tenant_id,
+        agent_id=agent.agent_id or "unknown",
+        model_id=model_id,
+        status=status,
+        duration_ms=_ms(seconds),
+        run_id=agent.run_id,
+        session_id=agent.session_id,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cached_tokens=cached_tokens,
+        cost_usd=run_cost(model_id, input_tokens, cached_tokens, output_tokens),
+        model_ms=_ms(sum(metrics.get("time", []))),
+        first_token_ms=_ms(first_token[0]) if first_token else None,
+        tool_ms=_ms(sum(tool_times)),
+        tool_calls=len(tool_times),
+        session_cache_hit=getattr(agent.storage, "last_read_cached", None),
+    )
+
+
+def record_run_usage(agent: Agent, tenant_id: Optional[str], status: str, seconds: float) -> None:
+    """Queue the usage record of a finished run ("completed", "cancelled" or "failed"), never raises."""
+    try:
+        usage_writer.record(usage_record(agent, tenant_id, status, seconds))
+    except Exception as e:
+        logger.warning(f"Could not record usage of run {agent.run_id}: {e}")
@@ -1,8 +1,50 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
 from api.routes.v1_router import v1_router
 from api.settings import api_settings
+from db.settings import db_settings
+from utils.log import logger
+
+
+async def rollup_usage_periodically(interval_seconds: int) -> None:
+    """Rebuild the usage rollups every `interval_seconds`, skipped while another worker does it."""
+    from db.session import get_db_engine
+    from db.usage import rollup_usage
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(rollup_usage, get_db_engine())
+        except Exception as e:
+            logger.warning(f"Could not roll up usage: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the worker up and add the playground before it accepts requests, importing the app stays offline"""
+    from api.routes.playground import get_playground_router
+    from api.warmup import warm_up
+
+    await run_in_threadpool(warm_up)
+    app.include_router(get_playground_router(), prefix=v1_router.prefix)
+    rollups = None
+    if db_settings.usage_rollup_interval_seconds > 0:
+        rollups = asyncio.create_task(rollup_usage_periodically(db_settings.usage_rollup_interval_seconds))
+    yield
+    # Runs once in-flight requests and streams are done, or the graceful shutdown timeout expired
+    from db.session import get_db_engine
+    from db.usage import usage_writer
+
+    if rollups is not None:
+        rollups.cancel()
+    # Write the usage records still queued before the pool closes
+    await run_in_threadpool(usage_writer.close)
+    get_db_engine().dispose()
 
 
 def create_app() -> FastAPI:
@@ -15,6 +57,7 @@ def create_app() -> FastAPI:
         docs_url="/docs" if api_settings.docs_enabled else None,
         redoc_url="/redoc" if api_settings.docs_enabled else None,
         openapi_url="/openapi.json" if api_settings.docs_enabled else None,
+        lifespan=lifespan,
     )
 
     # Add v1 router
@@ -0,0 +1,167 @@
+"""On-demand profiling of single agent runs.
+
+A request to `POST /v1/agents/{agent_id}/runs` with `X-Profile: <PROFILE_TOKEN>` (or
+`?profile=<PROFILE_TOKEN>` where headers cannot be set) runs under pyinstrument's sampling profiler
+in async mode: the agent run, its model calls and the tool calls and database reads made on the
+event loop are sampled every `PROFILE_INTERVAL_MS`; time spent awaiting threads (sync tools,
+`run_in_threadpool`) shows as the await that waited for it. The response carries the profile's id
+in `X-Profile-Id`, and `GET /v1/profiles/{profile_id}` returns the rendered HTML flamegraph once the
+run is over.
+
+Requests without the header pay nothing: pyinstrument is not even imported. Profiles are reserved
+in `ai.request_profiles` under an advisory lock, so at most `PROFILE_MAX_PER_HOUR` start per hour
+across all workers; further requests get `429`. Profiles are kept `PROFILE_RETENTION_DAYS` days.
+"""
+
+import hmac
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from importlib.util import find_spec
+from typing import Any, AsyncGenerator, AsyncIterator, List, Optional
+
+import anyio
+from fastapi import HTTPException, status
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.expression import func, select
+from starlette.concurrency import run_in_threadpool
+
+from api.settings import api_settings
+from db.tables import RequestProfile
+from knowledge.settings import knowledge_settings
+from utils.log import logger
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+# Key of the advisory lock that serializes profile reservations
+PROFILE_LOCK_KEY = 0x70726F66
+
+
+def profiling_requested(flag: Optional[str]) -> bool:
+    """Whether the request asked for a profile, with the right token. Raises 403 for a wrong token."""
+    if not flag:
+        return False
+    token = api_settings.profile_token
+    if not token or not hmac.compare_digest(flag.encode(), token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+    if find_spec("pyinstrument") is None:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Profiling needs pyinstrument")
+    return True
+
+
+def reserve_profile(
+    engine: Engine,
+    tenant_id: Optional[str],
+    agent_id: str,
+    max_per_hour: int = api_settings.profile_max_per_hour,
+    retention_days: int = api_settings.profile_retention_days,
+    now: Optional[datetime] = None,
+) -> Optional[str]:
+    """Reserve a profile for a run. Returns its id, None once `max_per_hour` profiles started in the last hour."""
+    now = now or datetime.now(timezone.utc)
+    table = RequestProfile.__table__
+    with engine.begin() as conn:
+        conn.execute(select(func.pg_advisory_xact_lock(PROFILE_LOCK_KEY)))
+        conn.execute(table.delete().where(table.c.created_at < now - timedelta(days=retention_days)))
+        started = conn.execute(
+            select(func.count()).select_from(table).where(table.c.created_at > now - timedelta(hours=1))
+        ).scalar()
+        if started >= max_per_hour:
+            return None
+        profile_id = str(uuid.uuid4())
+        conn.execute(
+            table.insert().values(
+                profile_id=profile_id, created_at=now, tenant_id=tenant_id, agent_id=agent_id, status="running"
+            )
+        )
+    return profile_id
+
+
+def save_profile(engine: Engine, profile_id: str, status: str, duration_ms: int, html: Optional[str]) -> None:
+    from knowledge.blobstore import compress_bytes, resolve_codec
+
+    codec = resolve_codec(knowledge_settings.kg_blob_compression)
+    data = compress_bytes(html.encode("utf-8"), codec) if html is not None else None
+    table = RequestProfile.__table__
+    with engine.begin() as conn:
+        conn.execute(
+            table.update()
+            .where(table.c.profile_id == profile_id)
+            .values(status=status, duration_ms=duration_ms, codec=codec if data is not None else None, data=data)
+        )
+
+
+def load_profile_html(engine: Engine, profile_id: str) -> Optional[str]:
+    """The rendered profile, None while the run is going or if there is no such profile."""
+    from knowledge.blobstore import decompress_bytes
+
+    table = RequestProfile.__table__
+    with engine.connect() as conn:
+        row = conn.execute(select(table.c.codec, table.c.data).where(table.c.profile_id == profile_id)).first()
+    if row is None or row.data is None:
+        return None
+    return decompress_bytes(row.data, row.codec).decode("utf-8")
+
+
+def list_profiles(engine: Engine, limit: int = 50) -> List[Any]:
+    table = RequestProfile.__table__
+    stmt = (
+        select(
+            table.c.profile_id,
+            table.c.created_at,
+            table.c.tenant_id,
+            table.c.agent_id,
+            table.c.status,
+            table.c.duration_ms,
+        )
+        .order_by(table.c.created_at.desc())
+        .limit(limit)
+    )
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+class RunProfile:
+    """Profiler of one run, stored in its reserved row when the run ends."""
+
+    def __init__(self, profile_id: str, engine: Engine):
+        self.profile_id = profile_id
+        self._engine = engine
+        self._profiler = None
+        self._start = 0.0
+
+    def start(self) -> None:
+        from pyinstrument import Profiler
+
+        self._profiler = Profiler(interval=api_settings.profile_interval_ms / 1000, async_mode="enabled")
+        self._start = time.perf_counter()
+        self._profiler.start()
+
+    async def finish(self, failed: bool = False) -> None:
+        if self._profiler is None:
+            return
+        self._profiler.stop()
+        duration_ms = int(round((time.perf_counter() - self._start) * 1000))
+        try:
+            # Rendering walks every sample, keep it off the event loop
+            html = await run_in_threadpool(self._profiler.output_html)
+            await run_in_threadpool(
+                save_profile, self._engine, self.profile_id, "failed" if failed else "done", duration_ms, html
+            )
+        except Exception as e:
+            logger.warning(f"Could not store profile {self.profile_id}: {e}")
+
+
+async def profile_stream(chunks: AsyncIterator[Any], profile: RunProfile) -> AsyncGenerator:
+    """Stream `chunks` with the profiler running, from the first chunk pulled (which starts the run) to the last."""
+    profile.start()
+    failed = True
+    try:
+        async for chunk in chunks:
+            yield chunk
+        failed = False
+    finally:
+        with anyio.CancelScope(shield=True):
+            # Closing the run's stream first lets it cancel the run when the client went away
+            await chunks.aclose()  # type: ignore[attr-defined]
+            await profile.finish(failed)
@@ -0,0 +1,133 @@
+"""Dependency checks behind GET /v1/ready.
+
+- database: a `SELECT 1` through the connection pool, with a statement timeout
+- pgvector: the `vector` extension is installed in the database
+- db_pool: share of the pool (size + overflow) checked out, below `READY_MAX_POOL_SATURATION`
+- event_loop: how long a callback waits to run on this worker's event loop
+
+The database probes are cached for `READY_CACHE_SECONDS` and refreshed by one caller at a time,
+concurrent callers get the previous result meanwhile. The pool and event loop are measured on
+every call, they only read process state.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.expression import text
+
+from api.settings import api_settings
+
+
+@dataclass
+class Check:
+    ok: bool
+    latency_ms: float
+    detail: Optional[str] = None
+
+
+@dataclass
+class Readiness:
+    checks: Dict[str, Check] = field(default_factory=dict)
+    # time.monotonic() of the database probes
+    probed_at: float = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return all(check.ok for check in self.checks.values())
+
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def pool_usage(engine: Engine) -> Tuple[int, int]:
+    """Checked out connections and the most the pool hands out (QueuePool size + overflow)."""
+    pool = engine.pool
+    return pool.checkedout(), pool.size() + max(pool._max_overflow, 0)  # type: ignore[attr-defined]
+
+
+def check_pool(engine: Engine, max_saturation: float) -> Check:
+    start = time.perf_counter()
+    checked_out, capacity = pool_usage(engine)
+    saturation = checked_out / capacity if capacity else 1.0
+    return Check(
+        ok=saturation < max_saturation,
+        latency_ms=elapsed_ms(start),
+        detail=f"{checked_out}/{capacity} connections checked out",
+    )
+
+
+def probe_database(engine: Engine, timeout_ms: int) -> Dict[str, Check]:
+    """Connectivity and the pgvector extension, without waiting for a connection when the pool is exhausted."""
+    checked_out, capacity = pool_usage(engine)
+    if checked_out >= capacity:
+        skipped = Check(ok=False, latency_ms=0.0, detail="no free connection in the pool")
+        return {"database": skipped, "pgvector": skipped}
+
+    checks = {}
+    start = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT set_config('statement_timeout', :timeout, true)"), {"timeout": str(timeout_ms)})
+            conn.execute(text("SELECT 1"))
+            checks["database"] = Check(ok=True, latency_ms=elapsed_ms(start))
+
+            start = time.perf_counter()
+            version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+            checks["pgvector"] = Check(
+                ok=version is not None,
+                latency_ms=elapsed_ms(start),
+                detail=f"vector {version}" if version else "extension vector is not installed",
+            )
+    except Exception as e:
+        failed = Check(ok=False, latency_ms=elapsed_ms(start), detail=str(e).splitlines()[0])
+        checks.setdefault("database", failed)
+        checks.setdefault("pgvector", failed)
+    return checks
+
+
+class DependencyProbes:
+    """Database probes of a worker, cached for `ttl` seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._last: Optional[Readiness] = None
+        self._lock = threading.Lock()
+
+    def fresh(self) -> Optional[Readiness]:
+        """The cached result while it is younger than `ttl`."""
+        last = self._last
+        if last is not None and time.monotonic() - last.probed_at < self.ttl:
+            return last
+        return None
+
+    def get(self, engine: Engine) -> Readiness:
+        last = self._last
+        if self.fresh() is not None:
+            return last  # type: ignore[return-value]
+        # One caller refreshes, the others keep the previous result instead of queueing behind it
+        if not self._lock.acquire(blocking=last is None):
+            return last  # type: ignore[return-value]
+        try:
+            if self.fresh() is not None:
+                return self._last  # type: ignore[return-value]
+            checks = probe_database(engine, api_settings.ready_db_timeout_ms)
+            self._last = Readiness(checks=checks, probed_at=time.monotonic())
+            return self._last
+        finally:
+            self._lock.release()
+
+
+async def check_event_loop(max_lag_ms: float) -> Check:
+    """Time until a callback scheduled now runs, i.e. how far behind the event loop is."""
+    start = time.perf_counter()
+    await asyncio.sleep(0)
+    lag_ms = elapsed_ms(start)
+    return Check(ok=lag_ms < max_lag_ms, latency_ms=lag_ms)
+
+
+dependency_probes = DependencyProbes(ttl=api_settings.ready_cache_seconds)
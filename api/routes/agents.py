@@ -1,14 +1,23 @@
+import asyncio
+import time
 from enum import Enum
-from typing import AsyncGenerator, List, Optional
+from typing import TYPE_CHECKING, AsyncGenerator, List, Optional
 
-from agno.agent import Agent
-from fastapi import APIRouter, HTTPException, status
+import anyio
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from agents.operator import AgentType, get_agent, get_available_agents
+from agents.routing import RouteDecision, record_route_latency, route_model
+from agents.run_metrics import run_metrics
+from db.tenancy import parse_phantom_token, tenant_schema
 from utils.log import logger
 
+if TYPE_CHECKING:
+    from agno.agent import Agent
+
 ######################################################
 ## Router for the Agent Interface
 ######################################################
@@ -19,6 +28,8 @@ agents_router = APIRouter(prefix="/agents", tags=["Agents"])
 class Model(str, Enum):
     gpt_4o = "gpt-4o"
     o3_mini = "o3-mini"
+    # Picks one of the two per message, see agents.routing
+    auto = "auto"
 
 
 @agents_router.get("", response_model=List[str])
@@ -32,23 +43,71 @@ async def list_agents():
     return get_available_agents()
 
 
-async def chat_response_streamer(agent: Agent, message: str) -> AsyncGenerator:
+class CancellableStreamingResponse(StreamingResponse):
+    """StreamingResponse that closes its generator when the client disconnects.
+
+    Starlette stops iterating the body on disconnect but leaves the generator suspended, so
+    without the explicit close the run behind it would only stop when garbage collected.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()  # type: ignore[attr-defined]
+
+
+async def chat_response_streamer(
+    agent: "Agent", message: str, route: Optional[RouteDecision] = None, tenant_id: Optional[str] = None
+) -> AsyncGenerator:
     """
     Stream agent responses chunk by chunk.
 
+    If the client disconnects, the run is cancelled: the model stream and the tool calls are
+    stopped and the partial run is saved as cancelled (see agents.runtime.cancel_run).
+
     Args:
         agent: The agent instance to interact with
         message: User message to process
+        route: Model routing decision of the message, its latency is recorded
+        tenant_id: Tenant the run's usage is recorded for (agents.usage)
 
     Yields:
         Text chunks from the agent response
     """
+    from agents.usage import record_run_usage
+
+    start = time.perf_counter()
     run_response = await agent.arun(message, stream=True)
-    async for chunk in run_response:
-        # chunk.content only contains the text response from the Agent.
-        # For advanced use cases, we should yield the entire chunk
-        # that contains the tool calls and intermediate steps.
-        yield chunk.content
+    completed = cancelled = False
+    try:
+        async for chunk in run_response:
+            # chunk.content only contains the text response from the Agent.
+            # For advanced use cases, we should yield the entire chunk
+            # that contains the tool calls and intermediate steps.
+            yield chunk.content
+        completed = True
+    except (asyncio.CancelledError, GeneratorExit):
+        cancelled = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if cancelled:
+            from agents.runtime import cancel_run
+
+            logger.info(f"Client disconnected, cancelling run {agent.run_id}")
+            with anyio.CancelScope(shield=True):
+                await cancel_run(agent, run_response, elapsed)
+            record_run_usage(agent, tenant_id, "cancelled", elapsed)
+        elif completed:
+            content = agent.run_response.content if agent.run_response is not None else None
+            run_metrics.record_completed(elapsed, len(content) if isinstance(content, str) else 0)
+            if route is not None:
+                record_route_latency(route, elapsed)
+            record_run_usage(agent, tenant_id, "completed", elapsed)
+        else:
+            record_run_usage(agent, tenant_id, "failed", elapsed)
 
 
 class RunRequest(BaseModel):
@@ -62,22 +121,42 @@ class RunRequest(BaseModel):
 
 
 @agents_router.post("/{agent_id}/runs", status_code=status.HTTP_200_OK)
-async def run_agent(agent_id: AgentType, body: RunRequest):
+async def run_agent(
+    agent_id: AgentType,
+    body: RunRequest,
+    response: Response,
+    phantom_token: Optional[str] = Header(None, alias="X-Phantom-Token"),
+    x_profile: Optional[str] = Header(None, alias="X-Profile"),
+    profile: Optional[str] = Query(None, description="Profiling token, for clients that cannot set headers"),
+):
     """
     Sends a message to a specific agent and returns the response.
 
     Args:
         agent_id: The ID of the agent to interact with
         body: Request parameters including the message
+        response: Response the profile id header is set on for non-streaming runs
+        phantom_token: Optional `tenant_id:username` token to run the agent against the tenant's data
+        x_profile: Optional profiling token (PROFILE_TOKEN) to profile this run, see api.profiling
+        profile: The profiling token as a query parameter
 
     Returns:
         Either a streaming response or the complete agent response
     """
     logger.debug(f"RunRequest: {body}")
+    tenant_id = None
+    if phantom_token:
+        # Checked here so a bad token is a 401, not a missing agent or a failed profile insert
+        try:
+            tenant_id = parse_phantom_token(phantom_token)[0]
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    route = route_model(body.model.value, body.message)
 
     try:
-        agent: Agent = get_agent(
-            model_id=body.model.value,
+        agent: "Agent" = get_agent(
+            phantom_token=phantom_token,
+            model_id=route.model_id,
             agent_id=agent_id,
             user_id=body.user_id,
             session_id=body.session_id,
@@ -85,14 +164,117 @@ async def run_agent(agent_id: AgentType, body: RunRequest):
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Agent not found: {str(e)}")
 
+    run_profile = None
+    if x_profile or profile:
+        run_profile = await start_run_profile(x_profile or profile, tenant_id, agent_id.value)
+
     if body.stream:
-        return StreamingResponse(
-            chat_response_streamer(agent, body.message),
+        chunks = chat_response_streamer(agent, body.message, route, tenant_id)
+        if run_profile is None:
+            return CancellableStreamingResponse(chunks, media_type="text/event-stream")
+        from api.profiling import PROFILE_ID_HEADER, profile_stream
+
+        return CancellableStreamingResponse(
+            profile_stream(chunks, run_profile),
             media_type="text/event-stream",
+            headers={PROFILE_ID_HEADER: run_profile.profile_id},
         )
     else:
-        response = await agent.arun(body.message, stream=False)
+        from agents.usage import record_run_usage
+
+        if run_profile is not None:
+            from api.profiling import PROFILE_ID_HEADER
+
+            response.headers[PROFILE_ID_HEADER] = run_profile.profile_id
+            run_profile.start()
+        start = time.perf_counter()
+        failed = True
+        try:
+            run_response = await agent.arun(body.message, stream=False)
+            failed = False
+        except Exception:
+            record_run_usage(agent, tenant_id, "failed", time.perf_counter() - start)
+            raise
+        finally:
+            if run_profile is not None:
+                await run_profile.finish(failed)
+        elapsed = time.perf_counter() - start
+        record_route_latency(route, elapsed)
+        record_run_usage(agent, tenant_id, "completed", elapsed)
         # response.content only contains the text response from the Agent.
         # For advanced use cases, we should yield the entire response
         # that contains the tool calls and intermediate steps.
-        return response.content
+        return run_response.content
+
+
+async def start_run_profile(flag: Optional[str], tenant_id: Optional[str], agent_id: str):
+    """Reserve a profile for a run that asked for one, 429 once the hourly limit is reached."""
+    from api.profiling import RunProfile, profiling_requested, reserve_profile
+    from db.session import get_db_engine
+
+    if not profiling_requested(flag):
+        return None
+    engine = get_db_engine()
+    profile_id = await run_in_threadpool(reserve_profile, engine, tenant_id, agent_id)
+    if profile_id is None:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Profiling limit reached")
+    return RunProfile(profile_id, engine)
+
+
+class ExportFormat(str, Enum):
+    markdown = "markdown"
+    jsonl = "jsonl"
+
+
+@agents_router.get("/{agent_id}/sessions/{session_id}/export")
+async def export_session(
+    agent_id: AgentType,
+    session_id: str,
+    format: ExportFormat = ExportFormat.markdown,
+    user_id: Optional[str] = None,
+    phantom_token: Optional[str] = Header(None, alias="X-Phantom-Token"),
+):
+    """
+    Streams the chat history of a session as Markdown or JSONL (one stored run per line).
+
+    Runs are read from session storage a page at a time and written out as they are read,
+    see db.storage.export.
+
+    Args:
+        agent_id: The ID of the agent the session belongs to
+        session_id: The session to export
+        format: "markdown" or "jsonl"
+        user_id: Only export the session if it belongs to this user, the phantom token's user by default
+        phantom_token: Optional `tenant_id:username` token to read the tenant's sessions
+
+    Returns:
+        The session's chat history as a file download
+    """
+    from db.storage import get_agent_storage
+    from db.storage.export import find_session, iter_session_runs, jsonl_chunks, markdown_chunks
+
+    tenant_id = None
+    if phantom_token:
+        try:
+            tenant_id, username = parse_phantom_token(phantom_token)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+        user_id = user_id or username
+    schema = tenant_schema(username) if tenant_id else None
+    storage = get_agent_storage(agent_id.value, tenant_id=tenant_id, schema=schema)
+
+    source = await run_in_threadpool(find_session, storage, session_id, user_id)
+    if source is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Session not found: {session_id}")
+
+    runs = iter_session_runs(storage, session_id, source, user_id=user_id)
+    if format == ExportFormat.jsonl:
+        chunks, media_type, extension = jsonl_chunks(runs), "application/x-ndjson", "jsonl"
+    else:
+        chunks, media_type, extension = markdown_chunks(agent_id.value, runs), "text/markdown; charset=utf-8", "md"
+    # A sync iterator: Starlette reads it in a thread, so the storage queries do not block the event loop
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{agent_id.value}_{session_id}.{extension}"'},
+    )
@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, Header, HTTPException, UploadFile, status
+from pydantic import BaseModel, HttpUrl
+from starlette.concurrency import run_in_threadpool
+
+from db.tenancy import is_registered_tenant, parse_phantom_token
+from knowledge.ingest import ingest_upload, ingest_url
+from knowledge.jobs import Job, JobStatus, ingestion_jobs
+from knowledge.readers import SUPPORTED_FILE_TYPES
+from knowledge.store import delete_document, delete_tenant_knowledge, get_tenant_knowledge
+from knowledge.uploads import UploadTooLarge, safe_filename, save_upload, staging_name, tenant_upload_dir
+from utils.log import logger
+
+######################################################
+## Router for the tenant knowledge base
+######################################################
+
+knowledge_router = APIRouter(prefix="/knowledge", tags=["Knowledge"])
+
+
+@dataclass
+class Tenant:
+    tenant_id: str
+    username: str
+
+
+def get_tenant(phantom_token: str = Header(..., alias="X-Phantom-Token")) -> Tenant:
+    """Resolve the tenant from the `tenant_id:username` phantom token header.
+
+    The tenant must be registered to the user, checked before anything is written under rag_data.
+    """
+    try:
+        tenant_id, username = parse_phantom_token(phantom_token)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    if not is_registered_tenant(tenant_id, username):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unknown tenant")
+    return Tenant(tenant_id=tenant_id, username=username)
+
+
+class JobResponse(BaseModel):
+    """State of a background ingestion job"""
+
+    job_id: str
+    kind: str
+    source: str
+    status: JobStatus
+    chunks: int
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class UrlRequest(BaseModel):
+    """Request model for ingesting a website"""
+
+    url: HttpUrl
+    max_links: int = 2
+    max_depth: int = 1
+
+
+class DocumentResponse(BaseModel):
+    """A source document in the tenant's knowledge base"""
+
+    document_id: Optional[str]
+    name: Optional[str]
+    chunks: int
+    created_at: Optional[datetime] = None
+
+
+def _job_response(job: Job) -> JobResponse:
+    return JobResponse(**{k: v for k, v in job.to_dict().items() if k != "tenant_id"})
+
+
+@knowledge_router.post("/files", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_file(file: UploadFile = File(...), tenant: Tenant = Depends(get_tenant)):
+    """
+    Uploads a file (.pdf, .csv, .txt, .md, .docx) and queues it for ingestion.
+
+    The upload is streamed to disk in chunks. Poll `GET /v1/knowledge/jobs/{job_id}` for the result.
+    """
+    file_name = file.filename or ""
+    if Path(file_name).suffix.lower().lstrip(".") not in SUPPORTED_FILE_TYPES:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported file type")
+
+    try:
+        name = safe_filename(file_name)
+        path = await run_in_threadpool(
+            save_upload, file.file, tenant_upload_dir(tenant.tenant_id), staging_name(file_name)
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        await file.close()
+
+    logger.info(f"Queueing {path} for tenant {tenant.tenant_id}")
+    knowledge = await run_in_threadpool(get_tenant_knowledge, tenant.tenant_id, tenant.username)
+    job = await run_in_threadpool(
+        ingestion_jobs.submit,
+        tenant.tenant_id,
+        "file",
+        name,
+        ingest_upload,
+        knowledge,
+        path,
+        tenant.tenant_id,
+        name=name,
+    )
+    return _job_response(job)
+
+
+@knowledge_router.post("/urls", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def add_url(body: UrlRequest, tenant: Tenant = Depends(get_tenant)):
+    """
+    Queues a website for crawling and ingestion.
+    """
+    url = str(body.url)
+    knowledge = await run_in_threadpool(get_tenant_knowledge, tenant.tenant_id, tenant.username)
+    job = await run_in_threadpool(
+        ingestion_jobs.submit,
+        tenant.tenant_id,
+        "url",
+        url,
+        ingest_url,
+        knowledge,
+        url,
+        tenant.tenant_id,
+        max_links=body.max_links,
+        max_depth=body.max_depth,
+    )
+    return _job_response(job)
+
+
+@knowledge_router.get("/documents", response_model=List[DocumentResponse])
+async def list_documents(tenant: Tenant = Depends(get_tenant)):
+    """
+    Lists the documents in the tenant's knowledge base with their number of chunks.
+    """
+    knowledge = await run_in_threadpool(get_tenant_knowledge, tenant.tenant_id, tenant.username)
+    documents = await run_in_threadpool(knowledge.vector_db.list_documents)
+    return [DocumentResponse(**document) for document in documents]
+
+
+@knowledge_router.delete("/documents/{document_id:path}", status_code=status.HTTP_200_OK)
+async def delete_tenant_document(document_id: str, tenant: Tenant = Depends(get_tenant)):
+    """
+    Deletes every chunk of a document (its file name or url) from the tenant's knowledge base.
+    """
+    knowledge = await run_in_threadpool(get_tenant_knowledge, tenant.tenant_id, tenant.username)
+    deleted = await run_in_threadpool(delete_document, knowledge, tenant.tenant_id, document_id)
+    if deleted == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document not found: {document_id}")
+    return {"document_id": document_id, "deleted_chunks": deleted}
+
+
+@knowledge_router.delete("/documents", status_code=status.HTTP_200_OK)
+async def delete_all_documents(tenant: Tenant = Depends(get_tenant)):
+    """
+    Deletes the tenant's whole knowledge base.
+    """
+    knowledge = await run_in_threadpool(get_tenant_knowledge, tenant.tenant_id, tenant.username)
+    if not await run_in_threadpool(delete_tenant_knowledge, knowledge, tenant.tenant_id):
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not delete knowledge")
+    return {"deleted": True}
+
+
+@knowledge_router.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(tenant: Tenant = Depends(get_tenant)):
+    """
+    Lists the tenant's ingestion jobs, newest first.
+    """
+    jobs = await run_in_threadpool(ingestion_jobs.list, tenant.tenant_id)
+    return [_job_response(job) for job in jobs]
+
+
+@knowledge_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, tenant: Tenant = Depends(get_tenant)):
+    """
+    Returns the status of an ingestion job.
+    """
+    job = await run_in_threadpool(ingestion_jobs.get, tenant.tenant_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job not found: {job_id}")
+    return _job_response(job)
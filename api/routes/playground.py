@@ -1,23 +1,33 @@
 from os import getenv
 
-from agno.playground import Playground
-
-from agents.sage import get_sage
-from agents.scholar import get_scholar
-from workspace.dev_resources import dev_fastapi
+from fastapi import APIRouter
 
 ######################################################
 ## Router for the Playground Interface
 ######################################################
 
-sage_agent = get_sage(debug_mode=True)
-scholar_agent = get_scholar(debug_mode=True)
 
-# Create a playground instance
-playground = Playground(agents=[sage_agent, scholar_agent])
+def get_playground_router() -> APIRouter:
+    """Router of the agno Playground.
+
+    Building it creates the agents, which imports the model clients and connects to the database,
+    so it is called when the app starts (see api.main) rather than when the routes are imported.
+    """
+    from agno.playground import Playground
+
+    from agents.sage import get_sage
+    from agents.scholar import get_scholar
+
+    # Sage only exists for a tenant, the playground runs without one
+    agents = [agent for agent in (get_sage(debug_mode=True), get_scholar(debug_mode=True)) if agent is not None]
+
+    # Create a playground instance
+    playground = Playground(agents=agents)
+
+    # Register the endpoint where playground routes are served with agno.com
+    if getenv("RUNTIME_ENV") == "dev":
+        from workspace.dev_resources import dev_fastapi
 
-# Register the endpoint where playground routes are served with agno.com
-if getenv("RUNTIME_ENV") == "dev":
-    playground.create_endpoint(f"http://localhost:{dev_fastapi.host_port}")
+        playground.create_endpoint(f"http://localhost:{dev_fastapi.host_port}")
 
-playground_router = playground.get_async_router()
+    return playground.get_async_router()
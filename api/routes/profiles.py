@@ -0,0 +1,61 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
+
+from api.profiling import list_profiles, load_profile_html, profiling_requested
+from db.session import get_db_engine
+
+######################################################
+## Router for stored run profiles
+######################################################
+
+profiles_router = APIRouter(prefix="/profiles", tags=["Profiles"])
+
+
+def authorize(x_profile: Optional[str], token: Optional[str]) -> None:
+    if not profiling_requested(x_profile or token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling token required")
+
+
+@profiles_router.get("")
+async def get_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    x_profile: Optional[str] = Header(None, alias="X-Profile"),
+    token: Optional[str] = Query(None, description="Profiling token, for links that cannot set headers"),
+):
+    """
+    Lists the latest run profiles, newest first.
+
+    Args:
+        limit: Maximum number of profiles to list
+        x_profile: The profiling token (PROFILE_TOKEN)
+        token: The profiling token as a query parameter
+    """
+    authorize(x_profile, token)
+    return await run_in_threadpool(list_profiles, get_db_engine(), limit)
+
+
+@profiles_router.get("/{profile_id}", response_class=HTMLResponse)
+async def get_profile(
+    profile_id: str,
+    x_profile: Optional[str] = Header(None, alias="X-Profile"),
+    token: Optional[str] = Query(None, description="Profiling token, for links that cannot set headers"),
+):
+    """
+    Returns the HTML flamegraph of a profiled run.
+
+    Args:
+        profile_id: The id from the run's X-Profile-Id header
+        x_profile: The profiling token (PROFILE_TOKEN)
+        token: The profiling token as a query parameter
+
+    Returns:
+        The pyinstrument HTML report, 404 while the run is going or for an unknown id
+    """
+    authorize(x_profile, token)
+    html = await run_in_threadpool(load_profile_html, get_db_engine(), profile_id)
+    if html is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found or not ready")
+    return HTMLResponse(html)
@@ -1,5 +1,17 @@
+import time
+from dataclasses import asdict
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
+from agents.http_client import client_metrics
+from agents.run_metrics import run_metrics
+from api.readiness import check_event_loop, check_pool, dependency_probes
+from api.settings import api_settings
+from db.session import get_db_engine
+from db.storage.cache import session_cache
+from db.usage import usage_writer
 from utils.dttm import current_utc_str
 
 ######################################################
@@ -19,3 +31,58 @@ def get_health():
         "path": "/health",
         "utc": current_utc_str(),
     }
+
+
+@status_router.get("/ready")
+async def get_ready():
+    """Check the database, pgvector, the DB pool and the event loop. Returns 503 when one of them fails"""
+
+    engine = get_db_engine()
+    # Cached probes are served without leaving the event loop
+    readiness = dependency_probes.fresh() or await run_in_threadpool(dependency_probes.get, engine)
+    checks = {
+        **readiness.checks,
+        "db_pool": check_pool(engine, api_settings.ready_max_pool_saturation),
+        "event_loop": await check_event_loop(api_settings.ready_max_loop_lag_ms),
+    }
+    ready = all(check.ok for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "checks": {name: asdict(check) for name, check in checks.items()},
+            "probed_ms_ago": round((time.monotonic() - readiness.probed_at) * 1000),
+            "utc": current_utc_str(),
+        },
+    )
+
+
+@status_router.get("/session-cache")
+def get_session_cache():
+    """Hit rate and size of this worker's session cache"""
+
+    stats = session_cache.stats()
+    return {**asdict(stats), "hit_rate": round(stats.hit_rate, 4)}
+
+
+@status_router.get("/model-clients")
+def get_model_clients():
+    """Requests, new connections and connection reuse rate of this worker's model API clients"""
+
+    stats = client_metrics.stats()
+    return {**asdict(stats), "reuse_rate": round(stats.reuse_rate, 4)}
+
+
+@status_router.get("/agent-runs")
+def get_agent_runs():
+    """Completed and cancelled streaming runs of this worker, the work saved by cancelling, the auto model routes
+    and the usage records this worker queued and wrote"""
+
+    stats = run_metrics.stats()
+    return {
+        **asdict(stats),
+        "estimated_saved_seconds": round(stats.estimated_saved_seconds, 3),
+        "estimated_saved_output_chars": stats.estimated_saved_output_chars,
+        "routes": run_metrics.routes(),
+        "usage_writer": asdict(usage_writer.stats()),
+    }
@@ -1,10 +1,13 @@
 from fastapi import APIRouter
 
 from api.routes.agents import agents_router
-from api.routes.playground import playground_router
+from api.routes.knowledge import knowledge_router
+from api.routes.profiles import profiles_router
 from api.routes.status import status_router
 
 v1_router = APIRouter(prefix="/v1")
 v1_router.include_router(status_router)
 v1_router.include_router(agents_router)
-v1_router.include_router(playground_router)
+v1_router.include_router(knowledge_router)
+v1_router.include_router(profiles_router)
+# The playground router is added when the app starts, see api.main
@@ -0,0 +1,66 @@
+"""Production entrypoint of the API: python -m api.server
+
+Runs uvicorn with uvloop and httptools when they are installed, one worker per CPU of the
+container's cgroup quota (`SERVER_WORKERS` overrides it), a keep-alive above the load balancer idle
+timeout and a graceful shutdown: on SIGTERM a worker stops accepting connections and waits up to
+`SERVER_GRACEFUL_SHUTDOWN_SECONDS` for in-flight requests and streams before it exits.
+
+Workers are spawned, not forked, so nothing is preloaded in the parent: each worker warms itself
+up in the app lifespan (see api.warmup) before it accepts requests.
+"""
+
+import math
+import os
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+
+from api.settings import api_settings
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cpu_quota(cgroup_root: Path = CGROUP_ROOT) -> Optional[float]:
+    """CPUs allowed by the cgroup (v2 `cpu.max`, v1 `cpu.cfs_quota_us`), None without a quota."""
+    try:
+        quota, period = (cgroup_root / "cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((cgroup_root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((cgroup_root / "cpu" / "cpu.cfs_period_us").read_text())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def worker_count(cgroup_root: Path = CGROUP_ROOT) -> int:
+    """One worker per CPU available to the container, at least one."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def main() -> None:
+    uvicorn.run(
+        "api.main:app",
+        host=api_settings.server_host,
+        port=api_settings.server_port,
+        workers=api_settings.server_workers or worker_count(),
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        timeout_keep_alive=api_settings.server_keep_alive_seconds,
+        timeout_graceful_shutdown=api_settings.server_graceful_shutdown_seconds,
+        # Client addresses and scheme from the load balancer
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+    )
+
+
+if __name__ == "__main__":
+    main()
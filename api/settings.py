@@ -22,6 +22,45 @@ class ApiSettings(BaseSettings):
     # Set to False to disable docs at /docs and /redoc
     docs_enabled: bool = True
 
+    # Production server (python -m api.server)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    # Worker processes, one per CPU of the container's cgroup quota when not set
+    server_workers: Optional[int] = None
+    # Above the load balancer idle timeout (60s on ALB), so the balancer closes idle connections first
+    server_keep_alive_seconds: int = 65
+    # Time given to in-flight requests and streams after SIGTERM, below the ECS stop timeout (30s)
+    server_graceful_shutdown_seconds: int = 25
+
+    # Warmup of every worker before it accepts requests
+    # Connections opened in the DB pool, 0 disables it
+    warm_db_connections: int = 2
+    # Build each agent once, loading the model clients and tools and the session tables
+    warm_agents: bool = True
+
+    # Readiness (GET /v1/ready)
+    # Seconds the dependency probes are cached for, health checks within that window cost nothing
+    ready_cache_seconds: float = 2.0
+    # Not ready once this share of the DB pool (pool size + overflow) is checked out
+    ready_max_pool_saturation: float = 0.9
+    # Not ready once a callback waits longer than this on the event loop
+    ready_max_loop_lag_ms: float = 250
+    # Timeout of the database probes
+    ready_db_timeout_ms: int = 2000
+
+    # Profiling of single agent runs with the `X-Profile` header, see api.profiling. Off while no token is set,
+    # requests must send the token as the header (or `profile` query parameter) value
+    profile_token: Optional[str] = None
+    # Profiles started per hour, across all workers
+    profile_max_per_hour: int = 6
+    # Sampling interval of the profiler
+    profile_interval_ms: float = 1.0
+    # Stored profiles are deleted after this many days
+    profile_retention_days: int = 7
+
+    # Users who see the usage admin page of the Streamlit UI, set as a JSON list
+    admin_users: List[str] = []
+
     # Cors origin list to allow requests from.
     # This list is set using the set_cors_origin_list validator
     # which uses the runtime_env variable to set the
@@ -0,0 +1,66 @@
+"""Work done by every API worker before it accepts requests.
+
+Uvicorn runs the app lifespan before a worker starts accepting connections, so warming up there
+keeps connection setup, imports of the model clients and agent construction out of the first
+requests. A failed warmup is logged and the worker starts anyway, requests then pay the cost.
+"""
+
+import time
+from contextlib import suppress
+from typing import List
+
+from api.settings import api_settings
+from utils.log import logger
+
+
+def warm_db_pool(connections: int) -> int:
+    """Open `connections` pooled connections at once and return them to the pool. Returns how many were opened."""
+    from db.session import get_db_engine
+
+    engine = get_db_engine()
+    opened = []
+    try:
+        for _ in range(min(connections, engine.pool.size())):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+# Agents are built for a template tenant, the agents with a knowledge base need one.
+# Nothing is written for it: knowledge and session tables are only created on first use.
+WARMUP_TENANT_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def warm_agents() -> List[str]:
+    """Build each agent once, with its model client, tools, storage and knowledge base. Returns the ids built."""
+    from agents.operator import AgentType, get_agent
+    from knowledge.uploads import RAG_DATA_DIR
+
+    built = []
+    for agent_type in AgentType:
+        agent = get_agent(phantom_token=f"{WARMUP_TENANT_ID}:warmup", agent_id=agent_type, debug_mode=False)
+        if agent is not None:
+            built.append(agent_type.value)
+    # Sage creates the tenant's rag_data directory, leave none behind for the template tenant
+    with suppress(OSError):
+        (RAG_DATA_DIR / WARMUP_TENANT_ID).rmdir()
+    return built
+
+
+def warm_up() -> None:
+    start = time.perf_counter()
+    if api_settings.warm_db_connections > 0:
+        try:
+            opened = warm_db_pool(api_settings.warm_db_connections)
+            logger.info(f"Opened {opened} database connections")
+        except Exception as e:
+            logger.warning(f"Could not warm the database pool: {e}")
+    if api_settings.warm_agents:
+        try:
+            built = warm_agents()
+            logger.info(f"Built agents: {', '.join(built) or 'none'}")
+        except Exception as e:
+            logger.warning(f"Could not warm the agents: {e}")
+    logger.info(f"Worker warmed up in {time.perf_counter() - start:.2f}s")
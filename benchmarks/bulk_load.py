@@ -0,0 +1,80 @@
+"""Rows per second of the row-level upsert path and the COPY path of TenantPgVector.
+
+Embeddings are random vectors so only the database write is measured.
+
+Usage: python -m benchmarks.bulk_load --rows 5000
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import typer
+from agno.document import Document
+from agno.embedder.base import Embedder
+from rich.console import Console
+from rich.table import Table
+
+from knowledge.vector_db import TenantPgVector
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+SCHEMA = "bench_bulk"
+
+
+@dataclass
+class RandomEmbedder(Embedder):
+    dimensions: Optional[int] = 1536
+
+    def get_embedding(self, text: str) -> List[float]:
+        return [random.random() for _ in range(self.dimensions or 0)]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+def _documents(rows: int, seed: int) -> List[Document]:
+    return [Document(name=f"doc-{i}", content=f"row {i} of load {seed}: " + "lorem ipsum " * 40) for i in range(rows)]
+
+
+def _load(vector_db: TenantPgVector, documents: List[Document]) -> float:
+    start = time.perf_counter()
+    vector_db.upsert(documents)
+    return len(documents) / (time.perf_counter() - start)
+
+
+@app.command()
+def main(
+    rows: int = typer.Option(5000, help="Documents per load."),
+    dimensions: int = typer.Option(1536, help="Embedding dimensions."),
+):
+    from db.session import db_engine
+
+    report = Table("path", "new rows/s", "upsert rows/s")
+    for path, copy_min_rows in (("row upsert", rows + 1), ("copy", 0)):
+        vector_db = TenantPgVector(
+            table_name=f"bulk_{path.replace(' ', '_')}",
+            schema=SCHEMA,
+            db_engine=db_engine,
+            embedder=RandomEmbedder(dimensions=dimensions),
+            copy_min_rows=copy_min_rows,
+            # Indexes are not part of the comparison
+            index_min_rows=rows * 10,
+        )
+        vector_db.drop()
+        vector_db.create()
+        try:
+            documents = _documents(rows, seed=1)
+            inserted = _load(vector_db, documents)
+            # Same ids again, so every row hits ON CONFLICT DO UPDATE
+            updated = _load(vector_db, documents)
+            report.add_row(path, f"{inserted:,.0f}", f"{updated:,.0f}")
+        finally:
+            vector_db.drop()
+    console.print(report)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,121 @@
+"""Cold import time of the API, the Streamlit app and the agent factories.
+
+Each target is imported in a fresh interpreter with `-X importtime`, `--repeat` times, and the
+run with the median wall time is reported: its total and the modules with the largest
+cumulative import time. Nothing connects to the database or to OpenAI.
+
+Usage: python -m benchmarks.import_time --top 15
+"""
+
+import ast
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+ROOT = Path(__file__).resolve().parent.parent
+# ui/Home.py is a Streamlit script: importing it renders the page, so its imports are measured instead
+TARGETS = {
+    "api": ["api.main"],
+    "ui": ["ui/Home.py"],
+    "agents": ["agents.operator", "agents.sage", "agents.scholar"],
+}
+
+
+@dataclass
+class ImportRun:
+    wall_ms: float
+    # Cumulative import time per module, in ms
+    cumulative_ms: Dict[str, float]
+    error: Optional[str] = None
+
+
+def script_imports(path: Path) -> List[str]:
+    """Modules imported at the top level of a script."""
+    modules = []
+    for node in ast.parse(path.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Cumulative time per module from `-X importtime` output."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        cumulative[name.strip()] = int(cumulative_us) / 1000
+    return cumulative
+
+
+def import_once(modules: List[str]) -> ImportRun:
+    code = (
+        "import time, importlib\n"
+        "start = time.perf_counter()\n"
+        f"for name in {modules!r}:\n"
+        "    importlib.import_module(name)\n"
+        "print((time.perf_counter() - start) * 1000)\n"
+    )
+    # Imports must not need secrets, but keep modules that still read them from failing
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        output = [line for line in result.stderr.splitlines() if line.strip() and not line.startswith("import time:")]
+        error = output[-1] if output else f"exit {result.returncode}"
+        return ImportRun(wall_ms=0.0, cumulative_ms={}, error=error)
+    return ImportRun(
+        wall_ms=float(result.stdout.strip().splitlines()[-1]), cumulative_ms=parse_importtime(result.stderr)
+    )
+
+
+def resolve_modules(entries: List[str]) -> List[str]:
+    modules = []
+    for entry in entries:
+        modules.extend(script_imports(ROOT / entry) if entry.endswith(".py") else [entry])
+    return modules
+
+
+@app.command()
+def main(
+    targets: Optional[List[str]] = typer.Option(None, "--target", help=f"Targets to measure: {', '.join(TARGETS)}."),
+    repeat: int = typer.Option(5, help="Fresh interpreters per target, the median run is reported."),
+    top: int = typer.Option(15, help="Modules to list per target."),
+):
+    summary = Table("target", "median ms", "min ms", "max ms")
+    for target in targets or list(TARGETS):
+        modules = resolve_modules(TARGETS[target])
+        runs = [import_once(modules) for _ in range(repeat)]
+        failed = next((run for run in runs if run.error), None)
+        if failed is not None:
+            summary.add_row(target, "-", "-", f"[red]{failed.error}[/red]")
+            continue
+        runs.sort(key=lambda run: run.wall_ms)
+        median = runs[len(runs) // 2]
+        walls = [run.wall_ms for run in runs]
+        summary.add_row(target, f"{statistics.median(walls):.0f}", f"{min(walls):.0f}", f"{max(walls):.0f}")
+
+        report = Table("module", "cumulative ms", title=f"{target}: {', '.join(modules)}")
+        for name, cumulative in sorted(median.cumulative_ms.items(), key=lambda item: -item[1])[:top]:
+            report.add_row(name, f"{cumulative:.1f}")
+        console.print(report)
+    console.print(summary)
+
+
+if __name__ == "__main__":
+    app()
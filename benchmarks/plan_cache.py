@@ -0,0 +1,158 @@
+"""What server-side prepared statements save on TenantPgVector's hybrid search.
+
+Loads a knowledge table with random embeddings, then runs the same hybrid searches on a connection
+that parses and plans every query (`prepare_threshold=0`) and on one that prepares them
+(`DB_PREPARE_THRESHOLD`), and reports the latency of both with the planning time of one search.
+No embedder is called.
+
+Usage: python -m benchmarks.plan_cache --rows 20000 --queries 2000
+"""
+
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import typer
+from agno.document import Document
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.sql.expression import text
+
+from benchmarks.bulk_load import RandomEmbedder
+from db.session import configure_prepared_statements, db_url
+from db.settings import db_settings
+from knowledge.vector_db import TenantPgVector
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+SCHEMA = "bench_plan_cache"
+WORDS = "vector search index plan cache tenant knowledge table query latency postgres prepared statement".split()
+
+
+def _engine(threshold: int) -> Engine:
+    # A single connection, so every search reuses the same prepared statements
+    engine = create_engine(db_url, pool_size=1, max_overflow=0)
+    return configure_prepared_statements(engine, threshold=threshold)
+
+
+def _vector_db(engine: Engine, dimensions: int, rows: int) -> TenantPgVector:
+    return TenantPgVector(
+        table_name="plan_cache_kg",
+        schema=SCHEMA,
+        db_engine=engine,
+        embedder=RandomEmbedder(dimensions=dimensions),
+        index_min_rows=rows * 10,
+    )
+
+
+def load(vector_db: TenantPgVector, rows: int) -> None:
+    vector_db.drop()
+    vector_db.create()
+    documents = [
+        Document(name=f"doc-{i}", content=" ".join(random.choices(WORDS, k=60)), meta_data={"document_id": f"doc-{i}"})
+        for i in range(rows)
+    ]
+    vector_db.upsert(documents, batch_size=1000)
+    # Build the ANN and full-text indexes now that the table is loaded
+    vector_db.index_min_rows = 0
+    vector_db.optimize()
+    with vector_db.db_engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {SCHEMA}.plan_cache_kg"))
+
+
+def measure(vector_db: TenantPgVector, queries: int, limit: int) -> List[float]:
+    timings = []
+    for _ in range(queries):
+        query = " ".join(random.choices(WORDS, k=3))
+        start = time.perf_counter()
+        vector_db.hybrid_search(query, limit=limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def planning_ms(engine: Engine, vector_db: TenantPgVector, limit: int) -> float:
+    """Planning time of one hybrid search, which an unprepared search pays every time."""
+    captured: Dict[str, Tuple[str, object]] = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "hybrid_score" in statement:
+            captured["search"] = (statement, parameters)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        vector_db.hybrid_search("vector search", limit=limit)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    statement, parameters = captured["search"]
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters).scalar()[0]
+    return plan.get("Planning Time", 0.0)
+
+
+def prepared_statements(engine: Engine) -> Tuple[int, int, int]:
+    """(statements, generic plan runs, custom plan runs) prepared on the engine's connection."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(
+                "SELECT count(*), COALESCE(sum(generic_plans), 0), COALESCE(sum(custom_plans), 0) "
+                "FROM pg_prepared_statements"
+            )
+        ).one()
+    return int(row[0]), int(row[1]), int(row[2])
+
+
+def _percentile(values: List[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+@app.command()
+def main(
+    rows: int = typer.Option(20000, help="Knowledge rows."),
+    dimensions: int = typer.Option(256, help="Embedding dimensions."),
+    queries: int = typer.Option(2000, help="Searches per mode."),
+    limit: int = typer.Option(5, help="Documents per search."),
+    keep: bool = typer.Option(False, "--keep", help="Keep the benchmark table afterwards."),
+):
+    modes = {"parse + plan": 0, "prepared": db_settings.db_prepare_threshold or 1}
+    engines = {mode: _engine(threshold) for mode, threshold in modes.items()}
+    loader = _vector_db(engines["prepared"], dimensions, rows)
+    start = time.perf_counter()
+    load(loader, rows)
+    console.print(f"Loaded {rows} rows in {time.perf_counter() - start:.1f}s")
+
+    report = Table("mode", "mean ms", "p50 ms", "p95 ms", "planning ms", "prepared (generic/custom runs)")
+    means = {}
+    try:
+        for mode, engine in engines.items():
+            vector_db = _vector_db(engine, dimensions, rows)
+            # Warm up the connection, the catalog caches and the statement caches
+            measure(vector_db, min(queries, 50), limit)
+            timings = measure(vector_db, queries, limit)
+            means[mode] = statistics.fmean(timings)
+            statements, generic, custom = prepared_statements(engine)
+            report.add_row(
+                mode,
+                f"{means[mode]:.2f}",
+                f"{_percentile(timings, 50):.2f}",
+                f"{_percentile(timings, 95):.2f}",
+                f"{planning_ms(engine, vector_db, limit):.2f}",
+                f"{statements} ({generic}/{custom})",
+            )
+    finally:
+        if not keep:
+            loader.drop()
+            with loader.db_engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        for engine in engines.values():
+            engine.dispose()
+    console.print(report)
+    saved = means["parse + plan"] - means["prepared"]
+    console.print(f"Prepared statements save {saved:.2f} ms per search ({saved / means['parse + plan']:.0%}).")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,157 @@
+"""Recall, latency and size of the ANN index over full, halfvec and binary vectors.
+
+Loads the same clustered random embeddings into one knowledge table per storage, builds its ANN
+index, then runs TenantPgVector.vector_search (quantized candidates re-ranked with the float32
+embeddings) and compares the results with an exact search. No embedder is called.
+
+Usage: python -m benchmarks.quantization --rows 20000 --dimensions 1536 --k 10
+"""
+
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import typer
+from agno.document import Document
+from agno.embedder.base import Embedder
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.expression import select, text
+
+from knowledge.indexes import VECTOR_STORAGES, get_index_coverage, qualified_name
+from knowledge.settings import knowledge_settings
+from knowledge.vector_db import TenantPgVector
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+SCHEMA = "bench_quantization"
+
+
+@dataclass
+class LookupEmbedder(Embedder):
+    """Embeddings of the benchmark documents and queries, keyed by their text."""
+
+    vectors: Dict[str, List[float]] = field(default_factory=dict)
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.vectors[text]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+def clustered_vectors(count: int, centroids: List[List[float]], spread: float) -> List[List[float]]:
+    """Points around random centroids, closer to real embeddings than uniform noise."""
+    vectors = []
+    for _ in range(count):
+        centroid = random.choice(centroids)
+        vectors.append([x + random.gauss(0, spread) for x in centroid])
+    return vectors
+
+
+def load(engine: Engine, storage: str, embedder: LookupEmbedder, names: List[str]) -> TenantPgVector:
+    vector_db = TenantPgVector(
+        table_name=f"quant_{storage}_kg",
+        schema=SCHEMA,
+        db_engine=engine,
+        embedder=embedder,
+        vector_storage=storage,
+        index_min_rows=len(names) * 10,
+    )
+    vector_db.drop()
+    vector_db.create()
+    vector_db.upsert([Document(id=name, name=name, content=name) for name in names], batch_size=1000)
+    # Build the ANN and full-text indexes now that the table is loaded
+    vector_db.index_min_rows = 0
+    vector_db.optimize()
+    with vector_db.db_engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {qualified_name(SCHEMA, vector_db.table_name)}"))
+    return vector_db
+
+
+def exact_neighbours(vector_db: TenantPgVector, query: List[float], k: int) -> Set[str]:
+    """Top-k by full-precision distance without the ANN index."""
+    distance, _ = vector_db._distance(query)
+    stmt = select(vector_db.table.c.id).order_by(distance).limit(k)
+    with vector_db.Session() as sess, sess.begin():
+        sess.execute(text("SET LOCAL enable_indexscan = off"))
+        return {row.id for row in sess.execute(stmt)}
+
+
+def _percentile(values: List[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+@app.command()
+def main(
+    rows: int = typer.Option(20000, help="Knowledge rows per table."),
+    dimensions: int = typer.Option(1536, help="Embedding dimensions."),
+    queries: int = typer.Option(200, help="Searches per storage."),
+    k: int = typer.Option(10, help="Results per search, recall is measured at k."),
+    clusters: int = typer.Option(200, help="Clusters the embeddings are drawn around."),
+    keep: bool = typer.Option(False, "--keep", help="Keep the benchmark tables afterwards."),
+):
+    from db.session import db_engine
+
+    centroids = [[random.gauss(0, 1) for _ in range(dimensions)] for _ in range(clusters)]
+    embedder = LookupEmbedder(dimensions=dimensions)
+    names = [f"doc-{i}" for i in range(rows)]
+    embedder.vectors.update(zip(names, clustered_vectors(rows, centroids, spread=0.3)))
+    query_texts = [f"query-{i}" for i in range(queries)]
+    embedder.vectors.update(zip(query_texts, clustered_vectors(queries, centroids, spread=0.3)))
+
+    report = Table(
+        "storage",
+        f"recall@{k}",
+        "p50 ms",
+        "p95 ms",
+        "ANN index",
+        "table + indexes",
+        title=f"{rows} rows, {dimensions} dimensions, rescoring {knowledge_settings.kg_rescore_multiplier}x",
+    )
+    truth: Dict[str, Set[str]] = {}
+    tables = []
+    try:
+        for storage in VECTOR_STORAGES:
+            start = time.perf_counter()
+            vector_db = load(db_engine, storage, embedder, names)
+            tables.append(vector_db)
+            console.print(f"{storage}: loaded and indexed in {time.perf_counter() - start:.1f}s")
+            if not truth:
+                truth = {q: exact_neighbours(vector_db, embedder.vectors[q], k) for q in query_texts}
+
+            # Warm up the index and the statement caches
+            for query in query_texts[:20]:
+                vector_db.vector_search(query, limit=k)
+            timings, recalls = [], []
+            for query in query_texts:
+                start = time.perf_counter()
+                results = vector_db.vector_search(query, limit=k)
+                timings.append((time.perf_counter() - start) * 1000)
+                recalls.append(len({doc.id for doc in results} & truth[query]) / k)
+
+            coverage = get_index_coverage(vector_db.db_engine, SCHEMA, vector_db.table_name)
+            vector_index = coverage.vector_index_for(storage) if coverage else None
+            report.add_row(
+                storage,
+                f"{statistics.fmean(recalls):.3f}",
+                f"{_percentile(timings, 50):.2f}",
+                f"{_percentile(timings, 95):.2f}",
+                f"{vector_index.size_bytes / 1024 / 1024:.1f} MB" if vector_index else "-",
+                f"{coverage.table_bytes / 1024 / 1024:.1f} MB" if coverage else "-",
+            )
+    finally:
+        if not keep:
+            for vector_db in tables:
+                vector_db.drop()
+            with db_engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    console.print(report)
+
+
+if __name__ == "__main__":
+    app()
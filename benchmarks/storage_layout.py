@@ -0,0 +1,182 @@
+"""Compare the per-user schema layout with the shared, tenant-partitioned layout.
+
+Creates synthetic tenants with random embeddings in both layouts, then reports search latency,
+catalog size, relation size and buffer usage. No embedder is called.
+
+Usage: python -m benchmarks.storage_layout --tenants 500 --rows 200
+"""
+
+import random
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql.expression import text
+
+from db.partitioned import SHARED_KNOWLEDGE_TABLE, ensure_tenant_partition, shared_knowledge_ddl
+from knowledge.indexes import qualified_name, quote_ident
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+SCHEMA_PREFIX = "bench_t_"
+SHARED_SCHEMA = "bench_shared"
+
+
+def _random_rows_sql(target: str, dimensions: int, tenant_column: str = "") -> str:
+    """INSERT of `:rows` rows with random embeddings, generated in the database."""
+    columns = "tenant_id, id, name, content, embedding" if tenant_column else "id, name, content, embedding"
+    tenant = "CAST(:tenant_id AS uuid), " if tenant_column else ""
+    return (
+        f"INSERT INTO {target} ({columns}) "
+        f"SELECT {tenant}md5(g::text), 'doc-' || g, repeat(md5(g::text), 8), "
+        f"(SELECT array_agg(random())::vector FROM generate_series(1, {dimensions}) d WHERE g > 0) "
+        "FROM generate_series(1, :rows) g"
+    )
+
+
+def setup_schema_layout(engine: Engine, tenants: List[str], rows: int, dimensions: int) -> None:
+    for tenant_id in tenants:
+        schema = f"{SCHEMA_PREFIX}{tenant_id[:8]}"
+        table = qualified_name(schema, f"{tenant_id[:8]}_sage_kg")
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {quote_ident(schema)}"))
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {table} (id text PRIMARY KEY, name text, "
+                    f"meta_data jsonb DEFAULT '{{}}'::jsonb, filters jsonb DEFAULT '{{}}'::jsonb, content text, "
+                    f"embedding vector({dimensions}), usage jsonb, created_at timestamptz DEFAULT now(), "
+                    "updated_at timestamptz, content_hash text)"
+                )
+            )
+            conn.execute(text(_random_rows_sql(table, dimensions)), {"rows": rows})
+
+
+def setup_shared_layout(engine: Engine, tenants: List[str], rows: int, dimensions: int) -> None:
+    with engine.begin() as conn:
+        for statement in shared_knowledge_ddl(SHARED_SCHEMA, dimensions):
+            conn.execute(text(statement))
+    table = qualified_name(SHARED_SCHEMA, SHARED_KNOWLEDGE_TABLE)
+    for tenant_id in tenants:
+        ensure_tenant_partition(engine, SHARED_SCHEMA, SHARED_KNOWLEDGE_TABLE, tenant_id)
+        with engine.begin() as conn:
+            conn.execute(text(_random_rows_sql(table, dimensions, "tenant_id")), {"rows": rows, "tenant_id": tenant_id})
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+def _search_sql(layout: str, tenant_id: str) -> Tuple[str, Dict[str, str]]:
+    if layout == "schema":
+        table = qualified_name(f"{SCHEMA_PREFIX}{tenant_id[:8]}", f"{tenant_id[:8]}_sage_kg")
+        return f"SELECT id FROM {table} ORDER BY embedding <=> CAST(:q AS vector) LIMIT 5", {}
+    table = qualified_name(SHARED_SCHEMA, SHARED_KNOWLEDGE_TABLE)
+    return (
+        f"SELECT id FROM {table} WHERE tenant_id = CAST(:tenant_id AS uuid) "
+        "ORDER BY embedding <=> CAST(:q AS vector) LIMIT 5",
+        {"tenant_id": tenant_id},
+    )
+
+
+def _random_vector(dimensions: int) -> str:
+    return "[" + ",".join(f"{random.random():.6f}" for _ in range(dimensions)) + "]"
+
+
+def measure_latency(engine: Engine, layout: str, tenants: List[str], queries: int, dimensions: int) -> List[float]:
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(queries):
+            sql, params = _search_sql(layout, random.choice(tenants))
+            params["q"] = _random_vector(dimensions)
+            start = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def explain_buffers(conn: Connection, layout: str, tenant_id: str, dimensions: int) -> Dict[str, float]:
+    """Planning time and shared buffer hits / reads of one search."""
+    sql, params = _search_sql(layout, tenant_id)
+    params["q"] = _random_vector(dimensions)
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()[0]
+    return {
+        "planning_ms": plan.get("Planning Time", 0.0),
+        "hit": plan["Plan"].get("Shared Hit Blocks", 0),
+        "read": plan["Plan"].get("Shared Read Blocks", 0),
+    }
+
+
+def catalog_stats(conn: Connection, schema_filter: str) -> Tuple[int, int]:
+    """(pg_class entries, total bytes) of the relations in the matching schemas."""
+    row = conn.execute(
+        text(
+            "SELECT count(*), COALESCE(sum(pg_relation_size(c.oid)), 0) FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname LIKE :pattern"
+        ),
+        {"pattern": schema_filter},
+    ).one()
+    return int(row[0]), int(row[1])
+
+
+def cleanup(engine: Engine) -> None:
+    with engine.begin() as conn:
+        schemas = conn.execute(
+            text("SELECT nspname FROM pg_namespace WHERE nspname LIKE :p OR nspname = :shared"),
+            {"p": f"{SCHEMA_PREFIX}%", "shared": SHARED_SCHEMA},
+        ).fetchall()
+        for (schema,) in schemas:
+            conn.execute(text(f"DROP SCHEMA {quote_ident(schema)} CASCADE"))
+
+
+def _percentile(values: List[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+@app.command()
+def main(
+    tenants: int = typer.Option(200, help="Number of synthetic tenants."),
+    rows: int = typer.Option(200, help="Knowledge rows per tenant."),
+    dimensions: int = typer.Option(256, help="Embedding dimensions."),
+    queries: int = typer.Option(500, help="Searches per layout."),
+    keep: bool = typer.Option(False, "--keep", help="Keep the benchmark schemas afterwards."),
+):
+    from db.session import db_engine
+
+    tenant_ids = [str(uuid.uuid4()) for _ in range(tenants)]
+    cleanup(db_engine)
+    setups: Dict[str, Callable[[Engine, List[str], int, int], None]] = {
+        "schema": setup_schema_layout,
+        "shared": setup_shared_layout,
+    }
+    report = Table("layout", "p50 ms", "p95 ms", "planning ms", "buffers hit/read", "relations", "size MB")
+    try:
+        for layout, setup in setups.items():
+            start = time.perf_counter()
+            setup(db_engine, tenant_ids, rows, dimensions)
+            console.print(f"{layout}: loaded {tenants * rows} rows in {time.perf_counter() - start:.1f}s")
+            timings = measure_latency(db_engine, layout, tenant_ids, queries, dimensions)
+            with db_engine.connect() as conn:
+                buffers = explain_buffers(conn, layout, random.choice(tenant_ids), dimensions)
+                pattern = f"{SCHEMA_PREFIX}%" if layout == "schema" else SHARED_SCHEMA
+                relations, size = catalog_stats(conn, pattern)
+            report.add_row(
+                layout,
+                f"{_percentile(timings, 50):.2f}",
+                f"{_percentile(timings, 95):.2f}",
+                f"{buffers['planning_ms']:.2f}",
+                f"{buffers['hit']}/{buffers['read']}",
+                str(relations),
+                f"{size / 1024 / 1024:.1f}",
+            )
+    finally:
+        if not keep:
+            cleanup(db_engine)
+    console.print(report)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,7 +1,7 @@
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, pool, text
 
 from db.session import db_url
 from db.tables import Base
@@ -27,12 +27,20 @@ target_metadata = Base.metadata
 # Only include tables that are in the target_metadata
 # See: https://alembic.sqlalchemy.org/en/latest/autogenerate.html#omitting-table-names-from-the-autogenerate-process
 def include_name(name, type_, parent_names):
+    if type_ == "schema":
+        # None is the default schema (public)
+        return name is None or name in {table.schema for table in target_metadata.tables.values()}
     if type_ == "table":
-        return name in target_metadata.tables
+        schema = parent_names.get("schema_name") or "public"
+        return f"{schema}.{name}" in target_metadata.tables
     else:
         return True
 
 
+# alembic_version lives in the `ai` schema, which has to exist before Alembic creates the version table
+CREATE_VERSION_SCHEMA = f"CREATE SCHEMA IF NOT EXISTS {target_metadata.schema}"
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -49,12 +57,14 @@ def run_migrations_offline() -> None:
         url=url,
         target_metadata=target_metadata,
         include_name=include_name,
+        include_schemas=True,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         version_table_schema=target_metadata.schema,
     )
 
     with context.begin_transaction():
+        context.execute(CREATE_VERSION_SCHEMA)
         context.run_migrations()
 
 
@@ -71,10 +81,14 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        connection.execute(text(CREATE_VERSION_SCHEMA))
+        connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             include_name=include_name,
+            include_schemas=True,
             version_table_schema=target_metadata.schema,
         )
 
@@ -0,0 +1,89 @@
+"""Users, tenant registry and ingestion manifest
+
+Revision ID: 3f2a9c1d7e10
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+import re
+
+import sqlalchemy as sa
+from alembic import context, op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f2a9c1d7e10"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SCHEMA IF NOT EXISTS ai")
+
+    # public.users used to be created by the Streamlit app, adopt it where it exists
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS public.users (
+            user_name TEXT PRIMARY KEY,
+            tenant_id UUID NOT NULL
+        )
+        """
+    )
+    op.execute("ALTER TABLE public.users ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now()")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_tenant_id_key ON public.users (tenant_id)")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_user_name_lower_idx ON public.users (lower(user_name))")
+
+    op.create_table(
+        "tenants",
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column(
+            "user_name",
+            sa.Text(),
+            sa.ForeignKey("public.users.user_name", ondelete="CASCADE", onupdate="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("schema_name", sa.Text(), nullable=False),
+        sa.Column("table_prefix", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        schema="ai",
+    )
+    op.create_index("ix_ai_tenants_user_name", "tenants", ["user_name"], schema="ai")
+
+    op.create_table(
+        "ingestion_manifest",
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column("document_id", sa.Text(), primary_key=True),
+        sa.Column("source", sa.Text(), nullable=False),
+        sa.Column("sha256", sa.Text()),
+        sa.Column("size_bytes", sa.BigInteger()),
+        sa.Column("chunks", sa.Integer(), nullable=False),
+        sa.Column("ingested_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        schema="ai",
+    )
+
+    if context.is_offline_mode():
+        return
+    # Register existing users and create their schemas, which used to happen on their first request
+    users = op.get_bind().execute(sa.text("SELECT user_name, tenant_id::text FROM public.users")).fetchall()
+    for user_name, tenant_id in users:
+        schema_name = re.sub(r"\W+", "_", user_name.lower())
+        op.execute(sa.text(f'CREATE SCHEMA IF NOT EXISTS "{schema_name}"'))
+        op.get_bind().execute(
+            sa.text(
+                "INSERT INTO ai.tenants (tenant_id, user_name, schema_name, table_prefix) "
+                "VALUES (:tenant_id, :user_name, :schema_name, :table_prefix) ON CONFLICT DO NOTHING"
+            ),
+            {"tenant_id": tenant_id, "user_name": user_name, "schema_name": schema_name, "table_prefix": tenant_id[:8]},
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("ingestion_manifest", schema="ai")
+    op.drop_index("ix_ai_tenants_user_name", table_name="tenants", schema="ai")
+    op.drop_table("tenants", schema="ai")
+    # public.users holds the accounts and predates the migrations, only drop what this revision added
+    op.execute("DROP INDEX IF EXISTS public.users_user_name_lower_idx")
+    op.execute("DROP INDEX IF EXISTS public.users_tenant_id_key")
+    op.execute("ALTER TABLE public.users DROP COLUMN IF EXISTS created_at")
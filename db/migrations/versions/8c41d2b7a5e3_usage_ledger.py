@@ -0,0 +1,77 @@
+"""Usage ledger: one row per agent run and hourly rollups
+
+Revision ID: 8c41d2b7a5e3
+Revises: 3f2a9c1d7e10
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "8c41d2b7a5e3"
+down_revision = "3f2a9c1d7e10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "usage_runs",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=False)),
+        sa.Column("agent_id", sa.Text(), nullable=False),
+        sa.Column("model_id", sa.Text(), nullable=False),
+        sa.Column("run_id", sa.Text()),
+        sa.Column("session_id", sa.Text()),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("cached_tokens", sa.Integer(), nullable=False),
+        sa.Column("cost_usd", sa.Float(), nullable=False),
+        sa.Column("duration_ms", sa.Integer(), nullable=False),
+        sa.Column("model_ms", sa.Integer(), nullable=False),
+        sa.Column("first_token_ms", sa.Integer()),
+        sa.Column("tool_ms", sa.Integer(), nullable=False),
+        sa.Column("tool_calls", sa.Integer(), nullable=False),
+        sa.Column("session_cache_hit", sa.Boolean()),
+        schema="ai",
+    )
+    op.create_index("usage_runs_created_at_brin", "usage_runs", ["created_at"], schema="ai", postgresql_using="brin")
+
+    op.create_table(
+        "usage_rollups",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=False)),
+        sa.Column("agent_id", sa.Text(), nullable=False),
+        sa.Column("model_id", sa.Text(), nullable=False),
+        sa.Column("runs", sa.Integer(), nullable=False),
+        sa.Column("cancelled_runs", sa.Integer(), nullable=False),
+        sa.Column("failed_runs", sa.Integer(), nullable=False),
+        sa.Column("input_tokens", sa.BigInteger(), nullable=False),
+        sa.Column("output_tokens", sa.BigInteger(), nullable=False),
+        sa.Column("cached_tokens", sa.BigInteger(), nullable=False),
+        sa.Column("cost_usd", sa.Float(), nullable=False),
+        sa.Column("duration_ms", sa.BigInteger(), nullable=False),
+        sa.Column("model_ms", sa.BigInteger(), nullable=False),
+        sa.Column("tool_ms", sa.BigInteger(), nullable=False),
+        sa.Column("tool_calls", sa.Integer(), nullable=False),
+        sa.Column("session_cache_hits", sa.Integer(), nullable=False),
+        sa.Column("p50_ms", sa.Float(), nullable=False),
+        sa.Column("p95_ms", sa.Float(), nullable=False),
+        sa.Column("p99_ms", sa.Float(), nullable=False),
+        sa.Column("latency_histogram", postgresql.JSONB(), nullable=False),
+        schema="ai",
+    )
+    op.create_index("ix_ai_usage_rollups_bucket", "usage_rollups", ["bucket"], schema="ai")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_usage_rollups_bucket", table_name="usage_rollups", schema="ai")
+    op.drop_table("usage_rollups", schema="ai")
+    op.drop_index("usage_runs_created_at_brin", table_name="usage_runs", schema="ai")
+    op.drop_table("usage_runs", schema="ai")
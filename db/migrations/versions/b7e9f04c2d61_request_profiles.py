@@ -0,0 +1,38 @@
+"""Stored profiles of agent runs
+
+Revision ID: b7e9f04c2d61
+Revises: 8c41d2b7a5e3
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "b7e9f04c2d61"
+down_revision = "8c41d2b7a5e3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "request_profiles",
+        sa.Column("profile_id", postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=False)),
+        sa.Column("agent_id", sa.Text(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("duration_ms", sa.Integer()),
+        sa.Column("codec", sa.Text()),
+        sa.Column("data", sa.LargeBinary()),
+        schema="ai",
+    )
+    op.create_index("ix_ai_request_profiles_created_at", "request_profiles", ["created_at"], schema="ai")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_request_profiles_created_at", table_name="request_profiles", schema="ai")
+    op.drop_table("request_profiles", schema="ai")
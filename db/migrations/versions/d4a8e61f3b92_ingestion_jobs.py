@@ -0,0 +1,40 @@
+"""Background ingestion jobs
+
+Revision ID: d4a8e61f3b92
+Revises: b7e9f04c2d61
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "d4a8e61f3b92"
+down_revision = "b7e9f04c2d61"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("job_id", postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column("tenant_id", postgresql.UUID(as_uuid=False), nullable=False),
+        sa.Column("kind", sa.Text(), nullable=False),
+        sa.Column("source", sa.Text(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("chunks", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("finished_at", sa.DateTime(timezone=True)),
+        schema="ai",
+    )
+    op.create_index("ingestion_jobs_tenant_created_idx", "ingestion_jobs", ["tenant_id", "created_at"], schema="ai")
+
+
+def downgrade() -> None:
+    op.drop_index("ingestion_jobs_tenant_created_idx", table_name="ingestion_jobs", schema="ai")
+    op.drop_table("ingestion_jobs", schema="ai")
@@ -0,0 +1,209 @@
+"""DDL for the shared, tenant-partitioned knowledge and session tables.
+
+With `TENANT_STORAGE_LAYOUT=shared` every tenant's knowledge rows go to one `knowledge`
+table and every session to one `agent_sessions` table, both partitioned by tenant_id.
+This keeps the catalog a fixed size instead of adding a schema, two or three tables and
+their indexes per user.
+
+List partitioning has no default partition: a row whose tenant has no partition fails with
+"no partition of relation ... found for row" instead of landing in a table that the tenant's
+partition could then no longer be created next to. Writers that cache the partitions they
+created catch that error after another process dropped a partition, see is_missing_partition().
+"""
+
+import threading
+import uuid
+from typing import List, Optional, Set
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.expression import text
+
+from db.settings import db_settings
+from knowledge.indexes import quote_ident
+from knowledge.settings import knowledge_settings
+
+SHARED_KNOWLEDGE_TABLE = "knowledge"
+SHARED_SESSIONS_TABLE = "agent_sessions"
+
+_created: Set[str] = set()
+_created_lock = threading.Lock()
+
+
+def _partition_clause() -> str:
+    return (
+        "PARTITION BY LIST (tenant_id)"
+        if db_settings.shared_partitioning == "list"
+        else "PARTITION BY HASH (tenant_id)"
+    )
+
+
+def _partition_statements(schema: str, table: str) -> List[str]:
+    """Child tables created up front: none for list partitioning, where tenants get theirs on first write."""
+    parent = f"{quote_ident(schema)}.{quote_ident(table)}"
+    if db_settings.shared_partitioning == "list":
+        return []
+    modulus = db_settings.shared_partitions
+    return [
+        f"CREATE TABLE IF NOT EXISTS {quote_ident(schema)}.{quote_ident(f'{table}_p{remainder}')} "
+        f"PARTITION OF {parent} FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+        for remainder in range(modulus)
+    ]
+
+
+def shared_knowledge_ddl(schema: str, dimensions: int) -> List[str]:
+    table = f"{quote_ident(schema)}.{quote_ident(SHARED_KNOWLEDGE_TABLE)}"
+    language = knowledge_settings.kg_content_language.replace("'", "''")
+    # Always HNSW: the index is created with the empty parent, and IVFFlat lists trained on no rows
+    # would stay untrained for every tenant
+    vector_index = (
+        "USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {knowledge_settings.kg_hnsw_m}, ef_construction = {knowledge_settings.kg_hnsw_ef_construction})"
+    )
+    return [
+        "CREATE EXTENSION IF NOT EXISTS vector",
+        f"CREATE SCHEMA IF NOT EXISTS {quote_ident(schema)}",
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+            tenant_id uuid NOT NULL,
+            id text NOT NULL,
+            name text,
+            meta_data jsonb DEFAULT '{{}}'::jsonb,
+            filters jsonb DEFAULT '{{}}'::jsonb,
+            content text,
+            embedding vector({dimensions}),
+            usage jsonb,
+            created_at timestamptz DEFAULT now(),
+            updated_at timestamptz,
+            content_hash text,
+            document_id text,
+            PRIMARY KEY (tenant_id, id)
+        ) {_partition_clause()}""",
+        *_partition_statements(schema, SHARED_KNOWLEDGE_TABLE),
+        # Tables created before the column existed
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS document_id text",
+        # Indexes on the parent cascade to every partition
+        f"CREATE INDEX IF NOT EXISTS knowledge_name_idx ON {table} (tenant_id, name)",
+        f"CREATE INDEX IF NOT EXISTS knowledge_content_hash_idx ON {table} (tenant_id, content_hash)",
+        f"CREATE INDEX IF NOT EXISTS knowledge_document_idx ON {table} (tenant_id, document_id)",
+        f"CREATE INDEX IF NOT EXISTS knowledge_hnsw_index ON {table} {vector_index}",
+        f"CREATE INDEX IF NOT EXISTS knowledge_content_gin_index ON {table} "
+        f"USING gin (to_tsvector('{language}'::regconfig, content))",
+    ]
+
+
+def shared_sessions_ddl(schema: str) -> List[str]:
+    table = f"{quote_ident(schema)}.{quote_ident(SHARED_SESSIONS_TABLE)}"
+    return [
+        f"CREATE SCHEMA IF NOT EXISTS {quote_ident(schema)}",
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+            tenant_id uuid NOT NULL,
+            session_id text NOT NULL,
+            agent_id text,
+            user_id text,
+            team_session_id text,
+            memory jsonb,
+            session_data jsonb,
+            extra_data jsonb,
+            agent_data jsonb,
+            created_at bigint DEFAULT (extract(epoch from now()))::bigint,
+            updated_at bigint,
+            PRIMARY KEY (tenant_id, session_id)
+        ) {_partition_clause()}""",
+        *_partition_statements(schema, SHARED_SESSIONS_TABLE),
+        f"CREATE INDEX IF NOT EXISTS agent_sessions_agent_idx ON {table} (tenant_id, agent_id, created_at DESC)",
+    ]
+
+
+def _run_once(engine: Engine, key: str, statements: List[str], recheck: bool = False) -> None:
+    with _created_lock:
+        if key in _created and not recheck:
+            return
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+        _created.add(key)
+
+
+def create_shared_knowledge_table(engine: Engine, schema: str, dimensions: int) -> None:
+    _run_once(engine, f"{schema}.{SHARED_KNOWLEDGE_TABLE}", shared_knowledge_ddl(schema, dimensions))
+
+
+def create_shared_sessions_table(engine: Engine, schema: str) -> None:
+    _run_once(engine, f"{schema}.{SHARED_SESSIONS_TABLE}", shared_sessions_ddl(schema))
+
+
+def tenant_partition_name(table: str, tenant_id: str) -> str:
+    return f"{table}_t_{tenant_id.replace('-', '')}"
+
+
+def is_missing_partition(error: Exception) -> bool:
+    """Whether a write failed because the tenant's partition is gone, e.g. dropped by another process."""
+    return "no partition of relation" in str(error)
+
+
+def ensure_tenant_partition(engine: Engine, schema: str, table: str, tenant_id: str, recheck: bool = False) -> None:
+    """Create the tenant's own partition when using list partitioning. No-op for hash partitioning.
+
+    Partitions are only created once per process; `recheck` runs the DDL again after a write found
+    the partition missing.
+    """
+    if db_settings.shared_partitioning != "list":
+        return
+    # Validates the tenant id before it is inlined into the DDL
+    tenant_id = str(uuid.UUID(str(tenant_id)))
+    partition = tenant_partition_name(table, tenant_id)
+    _run_once(
+        engine,
+        f"{schema}.{partition}",
+        [
+            f"CREATE TABLE IF NOT EXISTS {quote_ident(schema)}.{quote_ident(partition)} "
+            f"PARTITION OF {quote_ident(schema)}.{quote_ident(table)} "
+            f"FOR VALUES IN ('{tenant_id}')"
+        ],
+        recheck=recheck,
+    )
+
+
+def drop_tenant_partition(engine: Engine, schema: str, table: str, tenant_id: str) -> bool:
+    """Drop the tenant's partition with list partitioning, which removes its rows without leaving dead tuples.
+
+    The partition is detached CONCURRENTLY first, so other tenants' queries and writes on the parent
+    are not blocked; the DROP then only locks the detached table. Returns False with hash partitioning,
+    where partitions hold several tenants and rows have to be deleted.
+    """
+    if db_settings.shared_partitioning != "list":
+        return False
+    partition = tenant_partition_name(table, str(uuid.UUID(str(tenant_id))))
+    qualified = f"{quote_ident(schema)}.{quote_ident(partition)}"
+    with _created_lock:
+        # DETACH ... CONCURRENTLY cannot run in a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            detach = _detach_statement(conn, schema, table, qualified)
+            if detach is not None:
+                conn.execute(text(detach))
+            conn.execute(text(f"DROP TABLE IF EXISTS {qualified}"))
+        # Recreated by ensure_tenant_partition() on the next write
+        _created.discard(f"{schema}.{partition}")
+    return True
+
+
+def _detach_statement(conn, schema: str, table: str, qualified: str) -> Optional[str]:
+    """How to detach the partition, None if it is not attached."""
+    row = conn.execute(
+        text(
+            "SELECT i.inhdetachpending, p.partdefid <> 0 FROM pg_inherits i "
+            "JOIN pg_partitioned_table p ON p.partrelid = i.inhparent "
+            "WHERE i.inhrelid = to_regclass(:partition)"
+        ),
+        {"partition": qualified},
+    ).first()
+    if row is None:
+        return None
+    detach_pending, has_default = row
+    parent = f"{quote_ident(schema)}.{quote_ident(table)}"
+    if detach_pending:
+        # A concurrent detach that was interrupted
+        return f"ALTER TABLE {parent} DETACH PARTITION {qualified} FINALIZE"
+    if has_default:
+        # Tables created with a default partition, where Postgres does not allow a concurrent detach
+        return f"ALTER TABLE {parent} DETACH PARTITION {qualified}"
+    return f"ALTER TABLE {parent} DETACH PARTITION {qualified} CONCURRENTLY"
@@ -1,20 +1,69 @@
 from typing import Generator
 
-from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, create_engine, make_url
 from sqlalchemy.orm import Session, sessionmaker
 
 from db.settings import db_settings
-
-
+from utils.log import logger
 
 # Create SQLAlchemy Engine using a database URL
 db_url: str = db_settings.get_db_url()
-db_engine: Engine = create_engine(db_url, pool_pre_ping=True)
 
-# Create a SessionLocal class
-SessionLocal: sessionmaker[Session] = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+# The engine loads the psycopg driver, so `db_engine` and `SessionLocal` are created on first use
+# instead of whenever a module that may need the database is imported
+_db_engine: Engine | None = None
+_session_local: sessionmaker[Session] | None = None
+
+
+def configure_prepared_statements(
+    engine: Engine,
+    threshold: int = db_settings.db_prepare_threshold,
+    prepared_max: int = db_settings.db_prepared_max,
+) -> Engine:
+    """Have psycopg prepare statements server-side on every connection of the engine, see `db_prepare_threshold`."""
+    if engine.dialect.driver != "psycopg":
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def _prepare(dbapi_connection, _connection_record):
+        # psycopg never prepares with None
+        dbapi_connection.prepare_threshold = threshold or None
+        dbapi_connection.prepared_max = prepared_max
+
+    return engine
+
+
+def get_db_engine() -> Engine:
+    global _db_engine
+    if _db_engine is None:
+        _db_engine = configure_prepared_statements(
+            create_engine(
+                db_url,
+                pool_pre_ping=True,
+                pool_size=db_settings.db_pool_size,
+                max_overflow=db_settings.db_max_overflow,
+                pool_timeout=db_settings.db_pool_timeout,
+            )
+        )
+        logger.debug(f"Using DB URL: {make_url(db_url).render_as_string(hide_password=True)}")
+    return _db_engine
+
+
+def get_session_local() -> sessionmaker[Session]:
+    global _session_local
+    if _session_local is None:
+        # Create a SessionLocal class
+        _session_local = sessionmaker(autocommit=False, autoflush=False, bind=get_db_engine())
+    return _session_local
+
 
-print(f"🚨 Using DB URL: {db_url}")
+def __getattr__(name: str):
+    if name == "db_engine":
+        return get_db_engine()
+    if name == "SessionLocal":
+        return get_session_local()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -24,7 +73,7 @@ def get_db() -> Generator[Session, None, None]:
     Yields:
         Session: An SQLAlchemy database session.
     """
-    db: Session = SessionLocal()
+    db: Session = get_session_local()()
     try:
         yield db
     finally:
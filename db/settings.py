@@ -1,6 +1,6 @@
 import os
 from os import getenv
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -20,6 +20,49 @@ class DbSettings(BaseSettings):
     db_database: str = "mydb"   # Changed from Optional[str]
     db_driver: str = "postgresql+psycopg"
     migrate_db: bool = False
+    # Connection pool of each process: persistent connections, extra connections under load,
+    # and seconds a request waits for a connection once all of them are checked out
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    # Server-side prepared statements (psycopg): a pooled connection prepares a statement once it ran it
+    # this many times, so repeated queries skip parsing and planning. 0 disables it, which PgBouncer in
+    # transaction mode needs. `db_prepared_max` statements are kept per connection, one per tenant table
+    # and query shape in the per-schema layout.
+    db_prepare_threshold: int = 1
+    db_prepared_max: int = 200
+
+    # Where tenant knowledge and session rows live:
+    #   "schema": one Postgres schema per user with its own *_sage_kg and *_sessions tables
+    #   "shared": one knowledge table and one session table, partitioned by tenant_id
+    tenant_storage_layout: Literal["schema", "shared"] = "schema"
+    # Schema that holds the shared tables
+    shared_schema: str = "ai"
+    # "hash" keeps a fixed number of partitions, "list" gives every tenant its own partition
+    shared_partitioning: Literal["hash", "list"] = "hash"
+    # Number of partitions when using hash partitioning
+    shared_partitions: int = 16
+    # How sessions are written in the per-schema layout:
+    #   "row": one row per session, rewritten on every turn (PostgresAgentStorage)
+    #   "runlog": a session header plus one appended row per run and message, see db.storage.runlog
+    session_storage: Literal["row", "runlog"] = "row"
+    # Memory for the per-process cache of loaded sessions (pickled size), 0 disables it
+    session_cache_max_bytes: int = 64 * 1024 * 1024
+    # Sessions idle for longer are moved to <table>_archive by `python -m admin sessions-archive`
+    session_archive_idle_days: int = 30
+    # Compression of archived sessions, zstd needs `zstandard` and falls back to gzip without it
+    session_archive_compression: Literal["zstd", "gzip", "none"] = "gzip"
+    # Runs read per query when exporting a session's chat history, see db.storage.export
+    session_export_page_size: int = 50
+
+    # Usage ledger (ai.usage_runs), see db.usage
+    # Records written per INSERT, and the longest a record waits in the writer's queue
+    usage_batch_size: int = 200
+    usage_flush_seconds: float = 2.0
+    # Records queued at most, more are dropped (and counted) instead of slowing runs down
+    usage_queue_max: int = 10000
+    # How often an API worker rebuilds the hourly rollups, 0 leaves it to `python -m admin usage-rollup`
+    usage_rollup_interval_seconds: int = 300
 
     def get_db_url(self) -> str:
         db_url = "{}://{}{}@{}:{}/{}".format(
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from agno.storage.agent.postgres import PostgresAgentStorage
+
+from db.session import db_url
+from db.settings import db_settings
+from db.tenancy import table_prefix
+
+
+def schema_storage_class() -> type:
+    """Storage class of the per-schema `*_sessions` tables, which are archived by `python -m admin sessions-archive`."""
+    from db.storage.archive import archived_storage_class
+
+    storage_class = PostgresAgentStorage
+    if db_settings.session_storage == "runlog":
+        from db.storage.runlog import RunLogPostgresAgentStorage
+
+        storage_class = RunLogPostgresAgentStorage
+    return archived_storage_class(storage_class)
+
+
+def get_agent_storage(agent_id: str, tenant_id: Optional[str] = None, schema: Optional[str] = None):
+    """Session storage for an agent in the configured tenant storage layout.
+
+    - "schema": a `<tenant prefix>_<agent>_sessions` table in the user's schema, written
+      append-only with `SESSION_STORAGE=runlog`, idle sessions archived to `<table>_archive`
+    - "shared": the tenant's rows of the shared `agent_sessions` table
+
+    Loaded sessions are cached in the process unless `SESSION_CACHE_MAX_BYTES=0`, see db.storage.cache.
+    """
+    if tenant_id and db_settings.tenant_storage_layout == "shared":
+        from db.storage.shared import SharedPostgresAgentStorage
+
+        storage_class = SharedPostgresAgentStorage
+        kwargs = dict(tenant_id=tenant_id, agent_id=agent_id, schema=db_settings.shared_schema, db_url=db_url)
+    else:
+        table_name = f"{table_prefix(tenant_id)}_{agent_id}_sessions" if tenant_id else f"{agent_id}_sessions"
+        storage_class = schema_storage_class()
+        kwargs = dict(table_name=table_name, schema=schema or "ai", db_url=db_url)
+    if db_settings.session_cache_max_bytes > 0:
+        from db.storage.cache import cached_storage_class
+
+        storage_class = cached_storage_class(storage_class)
+    return storage_class(**kwargs)
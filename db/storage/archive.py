@@ -0,0 +1,216 @@
+"""Move idle sessions out of the session tables into a compressed archive.
+
+Sessions not updated for `SESSION_ARCHIVE_IDLE_DAYS` are moved by `python -m admin sessions-archive`
+from `<table>` (and its run log) into `<table>_archive`: one row per session holding the whole
+session as compressed JSON (`SESSION_ARCHIVE_COMPRESSION`, gzip by default) and the few
+columns the session selector shows. The session tables keep only active sessions.
+
+Archived sessions are still listed by `get_all_sessions()` and are restored into the session
+table the first time `read()` asks for them, so opening one is transparent to the agent.
+"""
+
+import json
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from agno.storage.session.agent import AgentSession
+from agno.utils.log import log_debug, log_info
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import Column, MetaData, Table
+from sqlalchemy.sql.expression import func, select, text
+from sqlalchemy.types import BigInteger, LargeBinary, String
+
+from db.settings import db_settings
+from knowledge.blobstore import compress_bytes, decompress_bytes, resolve_codec
+
+
+def encode_session(session: AgentSession, codec: str) -> bytes:
+    return compress_bytes(json.dumps(session.to_dict(), separators=(",", ":")).encode("utf-8"), codec)
+
+
+def decode_session(data: bytes, codec: str) -> Optional[AgentSession]:
+    return AgentSession.from_dict(json.loads(decompress_bytes(data, codec)))
+
+
+class ArchivedSessionsMixin:
+    """Adds the `<table>_archive` table to a per-schema agent storage, see `archived_storage_class`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.archive_table: Table = self.get_archive_table()
+
+    def get_archive_table(self) -> Table:
+        return Table(
+            f"{self.table_name}_archive",
+            MetaData(schema=self.schema),
+            Column("session_id", String, primary_key=True),
+            Column("agent_id", String),
+            Column("user_id", String, index=True),
+            Column("session_name", String),
+            Column("created_at", BigInteger),
+            Column("updated_at", BigInteger),
+            Column("archived_at", BigInteger, server_default=text("(extract(epoch from now()))::bigint")),
+            Column("codec", String, nullable=False),
+            # Whole session as JSON, compressed with `codec`
+            Column("data", LargeBinary, nullable=False),
+            schema=self.schema,
+        )
+
+    def _read_archived(self, session_id: str, user_id: Optional[str] = None):
+        stmt = select(self.archive_table).where(self.archive_table.c.session_id == session_id)
+        if user_id:
+            stmt = stmt.where(self.archive_table.c.user_id == user_id)
+        try:
+            with self.Session() as sess:
+                return sess.execute(stmt).first()
+        except Exception as e:
+            # No archive table until sessions of this table are archived
+            log_debug(f"Could not read archived session: {e}")
+            return None
+
+    def read(self, session_id: str, user_id: Optional[str] = None, **kwargs) -> Optional[AgentSession]:
+        session = super().read(session_id, user_id, **kwargs)
+        if session is not None:
+            return session
+        row = self._read_archived(session_id, user_id)
+        if row is None:
+            return None
+        return self.rehydrate(row)
+
+    def rehydrate(self, row) -> Optional[AgentSession]:
+        """Restore an archived session into the session table and drop it from the archive."""
+        session = decode_session(row.data, row.codec)
+        if session is None:
+            return None
+        restored = self.upsert(session)
+        if restored is None:
+            return None
+        with self.Session() as sess, sess.begin():
+            # upsert() stamps a new created_at, keep the session's place in the session list
+            sess.execute(
+                self.table.update()
+                .where(self.table.c.session_id == session.session_id)
+                .values(created_at=row.created_at)
+            )
+            sess.execute(self.archive_table.delete().where(self.archive_table.c.session_id == session.session_id))
+        restored.created_at = row.created_at
+        log_info(f"Restored archived session {session.session_id}")
+        return restored
+
+    def get_all_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[AgentSession]:
+        """Active sessions, followed by the archived ones without their memory."""
+        sessions = super().get_all_sessions(user_id, entity_id)
+        active = {session.session_id for session in sessions}
+        stmt = select(
+            self.archive_table.c.session_id,
+            self.archive_table.c.agent_id,
+            self.archive_table.c.user_id,
+            self.archive_table.c.session_name,
+            self.archive_table.c.created_at,
+            self.archive_table.c.updated_at,
+        )
+        if user_id is not None:
+            stmt = stmt.where(self.archive_table.c.user_id == user_id)
+        if entity_id is not None:
+            stmt = stmt.where(self.archive_table.c.agent_id == entity_id)
+        try:
+            with self.Session() as sess:
+                rows = sess.execute(stmt.order_by(self.archive_table.c.created_at.desc())).fetchall()
+        except Exception as e:
+            log_debug(f"Could not list archived sessions: {e}")
+            return sessions
+        for row in rows:
+            if row.session_id in active:
+                # Restored, but interrupted before it was dropped from the archive
+                continue
+            sessions.append(
+                AgentSession(
+                    session_id=row.session_id,
+                    agent_id=row.agent_id,
+                    user_id=row.user_id,
+                    session_data={"session_name": row.session_name} if row.session_name else None,
+                    created_at=row.created_at,
+                    updated_at=row.updated_at,
+                )
+            )
+        return sessions
+
+    def idle_session_ids(self, idle_seconds: int, limit: Optional[int] = None) -> List[str]:
+        cutoff = int(time.time()) - idle_seconds
+        last_active = func.coalesce(self.table.c.updated_at, self.table.c.created_at)
+        stmt = select(self.table.c.session_id).where(last_active < cutoff).order_by(last_active).limit(limit)
+        with self.Session() as sess:
+            return list(sess.execute(stmt).scalars())
+
+    def archive_session(self, session_id: str, idle_seconds: int, codec: str) -> Optional[int]:
+        """Move one session to the archive if it is still idle. Returns the compressed size."""
+        cutoff = int(time.time()) - idle_seconds
+        last_active = func.coalesce(self.table.c.updated_at, self.table.c.created_at)
+        with self.Session() as sess, sess.begin():
+            locked = sess.execute(
+                select(self.table.c.session_id)
+                .where(self.table.c.session_id == session_id)
+                .where(last_active < cutoff)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if locked is None:
+                # Written to since it was selected, or being written right now
+                return None
+            # Writers wait for the row lock, so this reads the version that is archived
+            session = super().read(session_id)
+            if session is None:
+                return None
+            data = encode_session(session, codec)
+            values = dict(
+                agent_id=session.agent_id,
+                user_id=session.user_id,
+                session_name=(session.session_data or {}).get("session_name"),
+                created_at=session.created_at,
+                updated_at=session.updated_at,
+                archived_at=int(time.time()),
+                codec=codec,
+                data=data,
+            )
+            stmt = postgresql.insert(self.archive_table).values(session_id=session_id, **values)
+            sess.execute(stmt.on_conflict_do_update(index_elements=["session_id"], set_=values))
+            log_table = getattr(self, "log_table", None)
+            if log_table is not None:
+                sess.execute(log_table.delete().where(log_table.c.session_id == session_id))
+            sess.execute(self.table.delete().where(self.table.c.session_id == session_id))
+        return len(data)
+
+    def archive_idle_sessions(
+        self,
+        idle_seconds: int = db_settings.session_archive_idle_days * 86400,
+        limit: Optional[int] = None,
+        codec: str = db_settings.session_archive_compression,
+    ) -> Dict[str, int]:
+        """Archive the sessions idle for more than `idle_seconds`. Returns their compressed sizes by session id."""
+        codec = resolve_codec(codec)
+        self.archive_table.create(self.db_engine, checkfirst=True)
+        archived = {}
+        for session_id in self.idle_session_ids(idle_seconds, limit):
+            size = self.archive_session(session_id, idle_seconds, codec)
+            if size is not None:
+                archived[session_id] = size
+        return archived
+
+    def delete_session(self, session_id: Optional[str] = None):
+        super().delete_session(session_id)
+        if session_id is None:
+            return
+        try:
+            with self.Session() as sess, sess.begin():
+                sess.execute(self.archive_table.delete().where(self.archive_table.c.session_id == session_id))
+        except Exception as e:
+            log_debug(f"Could not delete archived session: {e}")
+
+    def drop(self) -> None:
+        self.archive_table.drop(self.db_engine, checkfirst=True)
+        super().drop()
+
+
+@lru_cache(maxsize=None)
+def archived_storage_class(storage_class: type) -> type:
+    return type(f"Archived{storage_class.__name__}", (ArchivedSessionsMixin, storage_class), {})
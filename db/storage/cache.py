@@ -0,0 +1,189 @@
+"""Process-wide LRU cache of agent sessions.
+
+`Agent.load_session()` reads and decodes the whole session every time an agent is created:
+on every API request and on Streamlit reruns that rebuild the agent. Storages built by
+`get_agent_storage` keep the sessions they read and write in a per-process cache keyed by
+(table, session_id), written through on `upsert`.
+
+A cached session is only served after checking its row's `xmin`, the row version Postgres
+changes on every write. That check is a primary key lookup returning a few bytes, so a session
+updated by another process or worker is read again instead of served stale.
+
+Entries are pickled: a hit returns a copy the agent can change freely, loading it is cheaper
+than decoding JSON, and the pickle size is what `SESSION_CACHE_MAX_BYTES` bounds.
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Hashable, Optional, Tuple
+
+from agno.storage.session.agent import AgentSession
+from agno.utils.log import log_debug
+from sqlalchemy.sql.expression import literal_column, select
+
+from db.settings import db_settings
+
+
+@dataclass
+class SessionCacheStats:
+    hits: int
+    misses: int
+    # Entries found with an outdated version
+    stale: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.stale
+        return self.hits / lookups if lookups else 0.0
+
+
+class SessionCache:
+    """LRU of pickled sessions, each stored with the row version it was read or written at."""
+
+    def __init__(self, max_bytes: int = db_settings.session_cache_max_bytes):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale = self.evictions = 0
+
+    def get(self, key: Hashable, version: str) -> Optional[AgentSession]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                self.stale += 1
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            blob = entry[1]
+        return pickle.loads(blob)
+
+    def put(self, key: Hashable, version: str, session: AgentSession) -> None:
+        blob = pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._pop(key)
+            if len(blob) > self.max_bytes:
+                return
+            self._entries[key] = (version, blob)
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def stats(self) -> SessionCacheStats:
+        with self._lock:
+            return SessionCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                stale=self.stale,
+                evictions=self.evictions,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
+
+
+session_cache = SessionCache()
+
+
+class CachedSessionsMixin:
+    """Serves `read` from `session_cache` when the row version is unchanged.
+
+    Mixed in front of a Postgres agent storage, see `cached_storage_class`.
+    """
+
+    # Whether the latest read was served from the cache, None before the first read
+    last_read_cached: Optional[bool] = None
+
+    def _cache_key(self, session_id: str) -> Hashable:
+        # The shared session table is scoped by tenant and agent
+        return (
+            self.schema,
+            self.table_name,
+            getattr(self, "tenant_id", None),
+            getattr(self, "agent_id", None),
+            session_id,
+        )
+
+    def _read_version(self, session_id: str) -> Optional[str]:
+        stmt = select(literal_column("xmin::text")).select_from(self.table).where(self.table.c.session_id == session_id)
+        scope = getattr(self, "_scope", None)
+        if scope is not None:
+            stmt = scope(stmt)
+        try:
+            with self.Session() as sess:
+                return sess.execute(stmt).scalar()
+        except Exception as e:
+            # Missing table or column, read() creates it
+            log_debug(f"Could not read session version: {e}")
+            return None
+
+    def read(self, session_id: str, user_id: Optional[str] = None, **kwargs) -> Optional[AgentSession]:
+        key = self._cache_key(session_id)
+        # Read before the session, so a write in between leaves an entry that is already outdated
+        version = self._read_version(session_id)
+        if version is None:
+            session_cache.invalidate(key)
+            return super().read(session_id, user_id, **kwargs)
+        session = session_cache.get(key, version)
+        self.last_read_cached = session is not None
+        if session is None:
+            # Cached without the user filter, so the entry serves every caller
+            session = super().read(session_id, **kwargs)
+            if session is None:
+                return None
+            session_cache.put(key, version, session)
+        if user_id and session.user_id != user_id:
+            return None
+        return session
+
+    def upsert(self, session: AgentSession, create_and_retry: bool = True) -> Optional[AgentSession]:
+        key = self._cache_key(session.session_id)
+        session_cache.invalidate(key)
+        upsert_versioned = getattr(super(), "upsert_versioned", None)
+        if upsert_versioned is None:
+            # The storage reads the session back after writing it, and read() caches it
+            return super().upsert(session, create_and_retry)
+        result, version = upsert_versioned(session, create_and_retry)
+        if result is not None and version is not None:
+            session_cache.put(key, version, result)
+        return result
+
+    def delete_session(self, session_id: Optional[str] = None):
+        super().delete_session(session_id)
+        if session_id is not None:
+            session_cache.invalidate(self._cache_key(session_id))
+
+    def drop(self) -> None:
+        super().drop()
+        session_cache.clear()
+
+
+@lru_cache(maxsize=None)
+def cached_storage_class(storage_class: type) -> type:
+    return type(f"Cached{storage_class.__name__}", (CachedSessionsMixin, storage_class), {})
@@ -0,0 +1,144 @@
+"""Chat history export, read from session storage a page of runs at a time.
+
+`iter_session_runs` reads the runs of a stored session with keyset pagination, each page a short
+query that returns `SESSION_EXPORT_PAGE_SIZE` runs, so neither the API worker nor a pooled
+connection holds the whole conversation while a slow client downloads it:
+
+- run log sessions (`SESSION_STORAGE=runlog`): the `runs` rows of the session's log
+- row sessions and the shared layout: a slice of the `memory -> 'runs'` array
+  (`jsonb_path_query_array` with `$[from to to]`), expanded by Postgres with `jsonb_array_elements`
+- archived sessions: decoded from the archive, without restoring them into the session table
+
+`markdown_chunks` and `jsonl_chunks` write the runs out one at a time.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from sqlalchemy.dialects.postgresql import JSONPATH
+from sqlalchemy.sql.expression import Select, cast, func, literal, select, true
+
+from db.settings import db_settings
+from db.storage.archive import decode_session
+
+EXPORT_FORMATS = ("markdown", "jsonl")
+
+
+def _where_session(storage, stmt: Select, session_id: str, user_id: Optional[str] = None) -> Select:
+    stmt = stmt.where(storage.table.c.session_id == session_id)
+    if user_id:
+        stmt = stmt.where(storage.table.c.user_id == user_id)
+    # The shared table is also scoped to the tenant and agent
+    scope = getattr(storage, "_scope", None)
+    return scope(stmt) if scope is not None else stmt
+
+
+def find_session(storage, session_id: str, user_id: Optional[str] = None) -> Optional[str]:
+    """Where the session's runs are stored: "log", "row" or "archive". None if there is no such session."""
+    has_log = getattr(storage, "log_table", None) is not None
+    stmt = select(storage.table.c.log_counts if has_log else literal(None))
+    try:
+        with storage.Session() as sess:
+            row = sess.execute(_where_session(storage, stmt, session_id, user_id)).first()
+    except Exception as e:
+        # No session table until the agent's first session is written
+        if "does not exist" not in str(e):
+            raise
+        row = None
+    if row is not None:
+        return "log" if row[0] is not None else "row"
+    read_archived = getattr(storage, "_read_archived", None)
+    if read_archived is not None and read_archived(session_id, user_id) is not None:
+        return "archive"
+    return None
+
+
+def runs_page_query(storage, source: str, session_id: str, after: int, limit: int) -> Select:
+    """(position, run) of the session's runs after position `after`, in order. Positions count from 0."""
+    if source == "log":
+        log = storage.log_table
+        return (
+            select(log.c.seq, log.c.data)
+            .where(log.c.session_id == session_id)
+            .where(log.c.kind == "runs")
+            .where(log.c.seq > after)
+            .order_by(log.c.seq)
+            .limit(limit)
+        )
+    # Only the page's slice of the array is expanded and returned, not every run of the session per page
+    page = func.jsonb_path_query_array(
+        storage.table.c.memory["runs"], cast(f"$[{after + 1} to {after + limit}]", JSONPATH)
+    )
+    runs = func.jsonb_array_elements(page).table_valued("value", with_ordinality="seq").render_derived().lateral("runs")
+    # Ordinality counts from 1 within the page
+    stmt = select(runs.c.seq + after, runs.c.value).select_from(storage.table).join(runs, true())
+    return _where_session(storage, stmt, session_id).order_by(runs.c.seq)
+
+
+def iter_session_runs(
+    storage,
+    session_id: str,
+    source: str,
+    user_id: Optional[str] = None,
+    page_size: int = db_settings.session_export_page_size,
+) -> Iterator[Dict[str, Any]]:
+    """The stored runs of a session, `source` as returned by `find_session`."""
+    if source == "archive":
+        row = storage._read_archived(session_id, user_id)
+        session = decode_session(row.data, row.codec) if row is not None else None
+        yield from ((session.memory or {}).get("runs") or []) if session is not None else []
+        return
+
+    after = -1
+    while True:
+        with storage.Session() as sess:
+            rows = sess.execute(runs_page_query(storage, source, session_id, after, page_size)).fetchall()
+        for _, run in rows:
+            yield run
+        if len(rows) < page_size:
+            return
+        after = rows[-1][0]
+
+
+def _text(content: Any) -> str:
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, default=str)
+
+
+def run_markdown(run: Dict[str, Any]) -> str:
+    parts = []
+    message = run.get("message") or {}
+    if message.get("content") is not None:
+        parts.append(f"### 👤 User\n{_text(message['content'])}\n\n")
+    response = run.get("response") or {}
+    label = "🤖 Assistant (cancelled)" if response.get("event") == "RunCancelled" else "🤖 Assistant"
+    parts.append(f"### {label}\n{_text(response.get('content'))}\n\n")
+    tools = response.get("tools") or []
+    if tools:
+        parts.append("#### Tool Calls:\n")
+        for i, tool in enumerate(tools):
+            parts.append(f"**{i + 1}. {tool.get('tool_name', 'Unknown Tool')}**\n\n")
+            if tool.get("tool_args"):
+                parts.append(f"Arguments: ```json\n{json.dumps(tool['tool_args'], default=str)}\n```\n\n")
+            if "content" in tool:
+                parts.append(f"Results: ```\n{_text(tool['content'])}\n```\n\n")
+    return "".join(parts)
+
+
+def markdown_chunks(title: str, runs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    yield f"# {title} - Chat History\n\n"
+    empty = True
+    for run in runs:
+        empty = False
+        yield run_markdown(run)
+    if empty:
+        yield "No messages to export.\n"
+
+
+def jsonl_chunks(runs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """One stored run per line, as agno wrote it."""
+    for run in runs:
+        yield json.dumps(run, default=str, ensure_ascii=False) + "\n"
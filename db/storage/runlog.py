@@ -0,0 +1,220 @@
+"""Agent storage that appends each run to a log instead of rewriting the whole session.
+
+PostgresAgentStorage keeps a session in one row whose `memory` holds every run and every
+message sent to the model, so each turn rewrites (and WAL-logs) the whole conversation.
+Here the session row is a compact header, the memory without its runs and messages, and
+runs and messages are appended to a `<table>_log` table, one row per item. A turn writes
+the header and the items added since the last write; a session is read back with a range
+scan over the log's primary key.
+
+Sessions written by PostgresAgentStorage are read as they are and moved to the log on their
+next write, so the storage can replace PostgresAgentStorage on an existing table.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.storage.agent.postgres import PostgresAgentStorage
+from agno.storage.session.agent import AgentSession
+from agno.utils.log import log_debug, log_warning, logger
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import Column, MetaData, Table
+from sqlalchemy.sql.expression import literal_column, select, text
+from sqlalchemy.types import BigInteger, Integer, String
+
+from knowledge.indexes import qualified_name
+
+# Memory lists that only grow during a session and are kept in the log
+LOG_KINDS = ("runs", "messages")
+
+
+def split_memory(memory: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+    """Split a memory dict into the header part and its log lists."""
+    header = {k: v for k, v in (memory or {}).items() if k not in LOG_KINDS}
+    logs = {kind: list((memory or {}).get(kind) or []) for kind in LOG_KINDS}
+    return header, logs
+
+
+def plan_log_writes(stored: Dict[str, int], logs: Dict[str, List[Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Rows to append and the lengths to truncate each log to, given the stored log lengths.
+
+    Items past the stored length are appended. A list that got shorter (a cleared memory)
+    is truncated to its new length.
+    """
+    appends = []
+    truncates = {}
+    for kind, items in logs.items():
+        count = stored.get(kind, 0)
+        if len(items) < count:
+            truncates[kind] = len(items)
+            count = len(items)
+        appends.extend({"kind": kind, "seq": seq, "data": items[seq]} for seq in range(count, len(items)))
+    return appends, truncates
+
+
+class RunLogPostgresAgentStorage(PostgresAgentStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, mode="agent", **kwargs)
+        self.log_table: Table = self.get_log_table()
+
+    def get_table_v1(self) -> Table:
+        table = super().get_table_v1()
+        if "log_counts" not in table.c:
+            # Number of runs and messages in the log, {"runs": n, "messages": m}
+            table.append_column(Column("log_counts", postgresql.JSONB))
+        return table
+
+    def get_log_table(self) -> Table:
+        return Table(
+            f"{self.table_name}_log",
+            MetaData(schema=self.schema),
+            Column("session_id", String, primary_key=True),
+            Column("kind", String, primary_key=True),
+            Column("seq", Integer, primary_key=True),
+            Column("data", postgresql.JSONB),
+            Column("created_at", BigInteger, server_default=text("(extract(epoch from now()))::bigint")),
+            schema=self.schema,
+        )
+
+    def create(self) -> None:
+        super().create()
+        fqtn = qualified_name(self.schema, self.table_name)
+        with self.db_engine.begin() as conn:
+            # Session tables created by PostgresAgentStorage
+            conn.execute(text(f"ALTER TABLE {fqtn} ADD COLUMN IF NOT EXISTS log_counts jsonb"))
+        self.log_table.create(self.db_engine, checkfirst=True)
+
+    def _read_logs(self, sess, session_id: str) -> Dict[str, List[Any]]:
+        stmt = (
+            select(self.log_table.c.kind, self.log_table.c.data)
+            .where(self.log_table.c.session_id == session_id)
+            .order_by(self.log_table.c.kind, self.log_table.c.seq)
+        )
+        logs: Dict[str, List[Any]] = {}
+        for kind, data in sess.execute(stmt):
+            logs.setdefault(kind, []).append(data)
+        return logs
+
+    def _to_session(self, row, logs: Optional[Dict[str, List[Any]]] = None) -> Optional[AgentSession]:
+        data = dict(row._mapping)
+        if logs is not None and data.get("log_counts") is not None:
+            data["memory"] = {**(data.get("memory") or {}), **logs}
+        return AgentSession.from_dict(data)
+
+    def read(
+        self, session_id: str, user_id: Optional[str] = None, create_and_retry: bool = True
+    ) -> Optional[AgentSession]:
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = select(self.table).where(self.table.c.session_id == session_id)
+                if user_id:
+                    stmt = stmt.where(self.table.c.user_id == user_id)
+                row = sess.execute(stmt).fetchone()
+                if row is None:
+                    return None
+                logs = self._read_logs(sess, session_id) if row.log_counts is not None else None
+                return self._to_session(row, logs)
+        except Exception as e:
+            if "does not exist" in str(e) and create_and_retry:
+                # A missing table, or a session table without the log_counts column yet
+                log_debug(f"Table or column does not exist: {self.table.name}, creating it")
+                self.create()
+                return self.read(session_id, user_id, create_and_retry=False)
+            else:
+                log_debug(f"Exception reading from table: {e}")
+        return None
+
+    def get_all_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[AgentSession]:
+        """Session headers, without their runs and messages."""
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = select(self.table)
+                if user_id is not None:
+                    stmt = stmt.where(self.table.c.user_id == user_id)
+                if entity_id is not None:
+                    stmt = stmt.where(self.table.c.agent_id == entity_id)
+                rows = sess.execute(stmt.order_by(self.table.c.created_at.desc())).fetchall()
+                return [session for session in (self._to_session(row) for row in rows) if session is not None]
+        except Exception as e:
+            log_debug(f"Exception reading from table: {e}")
+            self.create()
+        return []
+
+    def upsert(self, session: AgentSession, create_and_retry: bool = True) -> Optional[AgentSession]:
+        return self.upsert_versioned(session, create_and_retry)[0]
+
+    def upsert_versioned(
+        self, session: AgentSession, create_and_retry: bool = True
+    ) -> Tuple[Optional[AgentSession], Optional[str]]:
+        """Write the session and return it with the version (`xmin`) of the header row it wrote."""
+        header_memory, logs = split_memory(session.memory)
+        now = int(time.time())
+        try:
+            with self.Session() as sess, sess.begin():
+                # Locks the session row so concurrent writers append after each other
+                stored = sess.execute(
+                    select(self.table.c.log_counts)
+                    .where(self.table.c.session_id == session.session_id)
+                    .with_for_update()
+                ).scalar()
+                # New sessions and sessions written by PostgresAgentStorage have no log rows yet
+                appends, truncates = plan_log_writes(stored or {}, logs)
+
+                for kind, length in truncates.items():
+                    sess.execute(
+                        self.log_table.delete()
+                        .where(self.log_table.c.session_id == session.session_id)
+                        .where(self.log_table.c.kind == kind)
+                        .where(self.log_table.c.seq >= length)
+                    )
+                if appends:
+                    stmt = postgresql.insert(self.log_table).values(
+                        [{"session_id": session.session_id, **row} for row in appends]
+                    )
+                    # Rows past a truncation point may be left over from an interrupted write
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["session_id", "kind", "seq"], set_={"data": stmt.excluded.data}
+                    )
+                    sess.execute(stmt)
+
+                values = dict(
+                    agent_id=session.agent_id,
+                    team_session_id=session.team_session_id,
+                    user_id=session.user_id,
+                    memory=header_memory,
+                    agent_data=session.agent_data,
+                    session_data=session.session_data,
+                    extra_data=session.extra_data,
+                    log_counts={kind: len(items) for kind, items in logs.items()},
+                )
+                stmt = postgresql.insert(self.table).values(session_id=session.session_id, **values)
+                stmt = stmt.on_conflict_do_update(index_elements=["session_id"], set_=dict(**values, updated_at=now))
+                version = sess.execute(stmt.returning(literal_column("xmin::text"))).scalar()
+        except Exception as e:
+            if create_and_retry:
+                log_debug(f"Exception upserting into table: {e}, creating it and retrying")
+                self.create()
+                return self.upsert_versioned(session, create_and_retry=False)
+            log_warning(f"Exception upserting into table: {e}")
+            return None, None
+        log_debug(f"Appended {len(appends)} log rows to session {session.session_id}")
+        # The caller already holds the full session, reading it back would scan the whole log again
+        session.updated_at = now
+        return session, version
+
+    def delete_session(self, session_id: Optional[str] = None):
+        if session_id is None:
+            logger.warning("No session_id provided for deletion.")
+            return
+        try:
+            with self.Session() as sess, sess.begin():
+                sess.execute(self.log_table.delete().where(self.log_table.c.session_id == session_id))
+                result = sess.execute(self.table.delete().where(self.table.c.session_id == session_id))
+                if result.rowcount == 0:
+                    log_debug(f"No session found with session_id: {session_id}")
+        except Exception as e:
+            logger.error(f"Error deleting session: {e}")
+
+    def drop(self) -> None:
+        self.log_table.drop(self.db_engine, checkfirst=True)
+        super().drop()
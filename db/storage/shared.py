@@ -0,0 +1,152 @@
+import time
+from typing import List, Optional
+
+from agno.storage.agent.postgres import PostgresAgentStorage
+from agno.storage.session.agent import AgentSession
+from agno.utils.log import log_debug, log_warning, logger
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import Column, Table
+from sqlalchemy.sql.expression import select, text
+from sqlalchemy.types import BigInteger, String
+
+from db.partitioned import (
+    SHARED_SESSIONS_TABLE,
+    create_shared_sessions_table,
+    ensure_tenant_partition,
+    is_missing_partition,
+)
+
+
+class SharedPostgresAgentStorage(PostgresAgentStorage):
+    """Agent storage backed by the shared, tenant-partitioned `agent_sessions` table.
+
+    Reads and writes are scoped to (tenant_id, agent_id), so each agent only sees its own
+    sessions, as it did with one session table per agent and tenant.
+    """
+
+    def __init__(self, tenant_id: str, agent_id: str, *args, **kwargs):
+        if not tenant_id:
+            raise ValueError("tenant_id is required for the shared session table.")
+        self.tenant_id: str = str(tenant_id)
+        self.agent_id: str = agent_id
+        kwargs.setdefault("table_name", SHARED_SESSIONS_TABLE)
+        super().__init__(*args, mode="agent", **kwargs)
+
+    def get_table_v1(self) -> Table:
+        return Table(
+            self.table_name,
+            self.metadata,
+            Column("tenant_id", postgresql.UUID(as_uuid=False), primary_key=True),
+            Column("session_id", String, primary_key=True),
+            Column("agent_id", String),
+            Column("user_id", String),
+            Column("team_session_id", String, nullable=True),
+            Column("memory", postgresql.JSONB),
+            Column("session_data", postgresql.JSONB),
+            Column("extra_data", postgresql.JSONB),
+            Column("agent_data", postgresql.JSONB),
+            Column("created_at", BigInteger, server_default=text("(extract(epoch from now()))::bigint")),
+            Column("updated_at", BigInteger),
+            extend_existing=True,
+            schema=self.schema,
+        )
+
+    def create(self, recheck: bool = False) -> None:
+        create_shared_sessions_table(self.db_engine, self.schema)
+        ensure_tenant_partition(self.db_engine, self.schema, self.table_name, self.tenant_id, recheck=recheck)
+
+    def _scope(self, stmt):
+        return stmt.where(self.table.c.tenant_id == self.tenant_id).where(self.table.c.agent_id == self.agent_id)
+
+    def read(self, session_id: str, user_id: Optional[str] = None) -> Optional[AgentSession]:
+        try:
+            with self.Session() as sess:
+                stmt = self._scope(select(self.table)).where(self.table.c.session_id == session_id)
+                if user_id:
+                    stmt = stmt.where(self.table.c.user_id == user_id)
+                result = sess.execute(stmt).fetchone()
+                return AgentSession.from_dict(result._mapping) if result is not None else None
+        except Exception as e:
+            if "does not exist" in str(e):
+                log_debug(f"Table does not exist: {self.table.name}, creating it")
+                self.create()
+            else:
+                log_debug(f"Exception reading from table: {e}")
+        return None
+
+    def get_all_session_ids(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[str]:
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = self._scope(select(self.table.c.session_id))
+                if user_id is not None:
+                    stmt = stmt.where(self.table.c.user_id == user_id)
+                rows = sess.execute(stmt.order_by(self.table.c.created_at.desc())).fetchall()
+                return [row[0] for row in rows]
+        except Exception as e:
+            log_debug(f"Exception reading from table: {e}")
+            self.create()
+        return []
+
+    def get_all_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[AgentSession]:
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = self._scope(select(self.table))
+                if user_id is not None:
+                    stmt = stmt.where(self.table.c.user_id == user_id)
+                rows = sess.execute(stmt.order_by(self.table.c.created_at.desc())).fetchall()
+                return [AgentSession.from_dict(row._mapping) for row in rows]  # type: ignore
+        except Exception as e:
+            log_debug(f"Exception reading from table: {e}")
+            self.create()
+        return []
+
+    def upsert(self, session: AgentSession, create_and_retry: bool = True) -> Optional[AgentSession]:
+        values = dict(
+            agent_id=self.agent_id,
+            team_session_id=session.team_session_id,
+            user_id=session.user_id,
+            memory=session.memory,
+            agent_data=session.agent_data,
+            session_data=session.session_data,
+            extra_data=session.extra_data,
+        )
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = postgresql.insert(self.table).values(
+                    tenant_id=self.tenant_id, session_id=session.session_id, **values
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["tenant_id", "session_id"],
+                    set_=dict(**values, updated_at=int(time.time())),
+                )
+                sess.execute(stmt)
+        except Exception as e:
+            if create_and_retry:
+                log_debug(f"Exception upserting into table: {e}, creating it and retrying")
+                # A partition dropped by another process is still in this one's cache
+                self.create(recheck=is_missing_partition(e))
+                return self.upsert(session, create_and_retry=False)
+            log_warning(f"Exception upserting into table: {e}")
+            return None
+        return self.read(session_id=session.session_id)
+
+    def delete_session(self, session_id: Optional[str] = None):
+        if session_id is None:
+            logger.warning("No session_id provided for deletion.")
+            return
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = self._scope(self.table.delete()).where(self.table.c.session_id == session_id)
+                result = sess.execute(stmt)
+                if result.rowcount == 0:
+                    log_debug(f"No session found with session_id: {session_id}")
+        except Exception as e:
+            logger.error(f"Error deleting session: {e}")
+
+    def drop(self) -> None:
+        """Delete this agent's sessions for the tenant. The shared table itself is never dropped."""
+        try:
+            with self.Session() as sess, sess.begin():
+                sess.execute(self._scope(self.table.delete()))
+        except Exception as e:
+            logger.error(f"Error deleting sessions: {e}")
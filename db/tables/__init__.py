@@ -1 +1,7 @@
 from db.tables.base import Base
+from db.tables.ingestion import IngestionManifest
+from db.tables.ingestion_job import IngestionJob
+from db.tables.profile import RequestProfile
+from db.tables.tenant import Tenant
+from db.tables.usage import UsageRollup, UsageRun
+from db.tables.user import User
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Integer, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class IngestionManifest(Base):
+    """One row per document in a tenant's knowledge base: where it came from and what was ingested."""
+
+    __tablename__ = "ingestion_manifest"
+
+    # The primary key serves listing a tenant's documents as well as single document lookups
+    tenant_id: Mapped[str] = mapped_column(UUID(as_uuid=False), primary_key=True)
+    # File name or url, the `document_id` of the document's chunks
+    document_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    # "upload", "url" or "watch"
+    source: Mapped[str] = mapped_column(Text, nullable=False)
+    # Content hash of files, None for crawled urls
+    sha256: Mapped[Optional[str]] = mapped_column(Text)
+    size_bytes: Mapped[Optional[int]] = mapped_column(BigInteger)
+    chunks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ingested_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class IngestionJob(Base):
+    """A background ingestion job, see knowledge.jobs. Any API worker can answer a poll for it."""
+
+    __tablename__ = "ingestion_jobs"
+    # Listing a tenant's jobs, newest first
+    __table_args__ = (Index("ingestion_jobs_tenant_created_idx", "tenant_id", "created_at"),)
+
+    job_id: Mapped[str] = mapped_column(UUID(as_uuid=False), primary_key=True)
+    tenant_id: Mapped[str] = mapped_column(UUID(as_uuid=False), nullable=False)
+    # "file" or "url"
+    kind: Mapped[str] = mapped_column(Text, nullable=False)
+    # File name or url
+    source: Mapped[str] = mapped_column(Text, nullable=False)
+    # "queued", "running", "succeeded" or "failed"
+    status: Mapped[str] = mapped_column(Text, nullable=False)
+    chunks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, LargeBinary, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class RequestProfile(Base):
+    """A sampling profile of one agent run, requested with the profiling flag, see api.profiling."""
+
+    __tablename__ = "request_profiles"
+
+    profile_id: Mapped[str] = mapped_column(UUID(as_uuid=False), primary_key=True)
+    # Reserved when the request starts, the rate limit counts the rows of the last hour
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+    tenant_id: Mapped[Optional[str]] = mapped_column(UUID(as_uuid=False))
+    agent_id: Mapped[str] = mapped_column(Text, nullable=False)
+    # "running" until the run ends, then "done" or "failed"
+    status: Mapped[str] = mapped_column(Text, nullable=False)
+    duration_ms: Mapped[Optional[int]] = mapped_column(Integer)
+    # Rendered HTML profile, compressed with `codec`
+    codec: Mapped[Optional[str]] = mapped_column(Text)
+    data: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
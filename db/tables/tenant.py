@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class Tenant(Base):
+    """Tenant registry: where a tenant's tables live, recorded when the tenant is provisioned at sign-up."""
+
+    __tablename__ = "tenants"
+
+    tenant_id: Mapped[str] = mapped_column(UUID(as_uuid=False), primary_key=True)
+    user_name: Mapped[str] = mapped_column(
+        Text, ForeignKey("public.users.user_name", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True
+    )
+    # Schema and table name prefix of the per-schema layout, see db.tenancy
+    schema_name: Mapped[str] = mapped_column(Text, nullable=False)
+    table_prefix: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
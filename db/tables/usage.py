@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Identity, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class UsageRun(Base):
+    """One row per agent run: tokens, cost and stage timings, written in batches by db.usage.UsageWriter."""
+
+    __tablename__ = "usage_runs"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    # When the run finished
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # None for runs without a phantom token
+    tenant_id: Mapped[Optional[str]] = mapped_column(UUID(as_uuid=False))
+    agent_id: Mapped[str] = mapped_column(Text, nullable=False)
+    model_id: Mapped[str] = mapped_column(Text, nullable=False)
+    run_id: Mapped[Optional[str]] = mapped_column(Text)
+    session_id: Mapped[Optional[str]] = mapped_column(Text)
+    # "completed", "cancelled" or "failed"
+    status: Mapped[str] = mapped_column(Text, nullable=False)
+    input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Input tokens served from the model API's prompt cache
+    cached_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    # Stage timings: the whole run, the model calls, the first token of a stream and the tool calls
+    duration_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+    model_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_token_ms: Mapped[Optional[int]] = mapped_column(Integer)
+    tool_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tool_calls: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Whether the session was served from the process cache, None when it was not read
+    session_cache_hit: Mapped[Optional[bool]] = mapped_column(Boolean)
+
+
+# Append-only and in time order: a BRIN index covers the rollup's time range scans at a fraction of a btree's size
+Index("usage_runs_created_at_brin", UsageRun.created_at, postgresql_using="brin")
+
+
+class UsageRollup(Base):
+    """Usage per hour, tenant, agent and model, rebuilt from `usage_runs` by db.usage.rollup_usage."""
+
+    __tablename__ = "usage_rollups"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    tenant_id: Mapped[Optional[str]] = mapped_column(UUID(as_uuid=False))
+    agent_id: Mapped[str] = mapped_column(Text, nullable=False)
+    model_id: Mapped[str] = mapped_column(Text, nullable=False)
+    runs: Mapped[int] = mapped_column(Integer, nullable=False)
+    cancelled_runs: Mapped[int] = mapped_column(Integer, nullable=False)
+    failed_runs: Mapped[int] = mapped_column(Integer, nullable=False)
+    input_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    output_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    cached_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False)
+    duration_ms: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    model_ms: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    tool_ms: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    tool_calls: Mapped[int] = mapped_column(Integer, nullable=False)
+    session_cache_hits: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Percentiles of the run duration within the hour
+    p50_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    p95_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    p99_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    # Runs per duration bucket of db.usage.LATENCY_BUCKETS_MS, {"<bucket index>": runs}. Percentiles
+    # do not add up across hours, histograms do.
+    latency_histogram: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class User(Base):
+    """A registered user. `tenant_id` is the tenant in the user's `tenant_id:username` phantom token."""
+
+    # Kept in `public`, where the table was created before it was managed by migrations
+    __tablename__ = "users"
+    __table_args__ = {"schema": "public"}
+
+    # Stored lowercased
+    user_name: Mapped[str] = mapped_column(Text, primary_key=True)
+    tenant_id: Mapped[str] = mapped_column(UUID(as_uuid=False), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+# Reverse lookup when a token or a rag_data directory names a tenant
+Index("users_tenant_id_key", User.tenant_id, unique=True)
+# Login matches user names case-insensitively, and two users may not differ only by case
+Index("users_user_name_lower_idx", func.lower(User.user_name), unique=True)
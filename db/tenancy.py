@@ -0,0 +1,109 @@
+import re
+import threading
+import uuid
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.expression import func, select, text
+
+from db.session import get_db_engine, get_session_local
+from db.settings import db_settings
+from db.tables import Tenant, User
+
+_created_schemas: Set[str] = set()
+_created_lock = threading.Lock()
+
+
+def tenant_schema(username: str) -> str:
+    """Postgres schema that holds a user's tables in the per-schema layout."""
+    if not username:
+        raise ValueError("Username is required for schema assignment.")
+    return re.sub(r"\W+", "_", username.lower())
+
+
+def table_prefix(tenant_id: str) -> str:
+    """Prefix of a tenant's tables in the per-schema layout."""
+    return tenant_id[:8]
+
+
+def parse_phantom_token(phantom_token: str) -> Tuple[str, str]:
+    """Split a `tenant_id:username` phantom token.
+
+    The tenant id must be a UUID: it names directories under rag_data and fills UUID columns.
+    """
+    try:
+        tenant_id, username = phantom_token.split(":")
+    except ValueError:
+        raise ValueError("Invalid phantom token format. Expected 'tenant_id:user_id'")
+    try:
+        tenant_id = str(uuid.UUID(tenant_id))
+    except ValueError:
+        raise ValueError("Invalid phantom token: the tenant id is not a UUID")
+    if not username:
+        raise ValueError("Invalid phantom token: the username is empty")
+    return tenant_id, username
+
+
+def is_registered_tenant(tenant_id: str, username: str) -> bool:
+    """Whether the tenant was provisioned for the user (ai.tenants)."""
+    with get_session_local()() as sess:
+        found = sess.scalar(
+            select(Tenant.tenant_id)
+            .where(Tenant.tenant_id == tenant_id)
+            .where(func.lower(Tenant.user_name) == username.lower())
+        )
+    return found is not None
+
+
+def list_tenants(engine: Engine) -> List[Tuple[str, str]]:
+    """Return (user_name, tenant_id) for every registered user."""
+    with engine.connect() as conn:
+        rows = conn.execute(select(User.user_name, User.tenant_id).order_by(User.user_name)).fetchall()
+    return [(row[0], str(row[1])) for row in rows]
+
+
+def get_user_tenant(username: str) -> Optional[str]:
+    """Tenant id of a user, matching the user name case-insensitively (users_user_name_lower_idx)."""
+    with get_session_local()() as sess:
+        tenant_id = sess.scalar(select(User.tenant_id).where(func.lower(User.user_name) == username.lower()))
+    return str(tenant_id) if tenant_id is not None else None
+
+
+def register_user(username: str) -> str:
+    """Create a user and provision their tenant. Returns the new tenant id.
+
+    The user's schema is created here, once, so serving the user's requests needs no DDL.
+    Raises ValueError if the name is taken.
+    """
+    username = username.lower()
+    tenant_id = str(uuid.uuid4())
+    schema = tenant_schema(username)
+    try:
+        with get_session_local().begin() as sess:
+            sess.add(User(user_name=username, tenant_id=tenant_id))
+            sess.flush()
+            sess.add(
+                Tenant(
+                    tenant_id=tenant_id, user_name=username, schema_name=schema, table_prefix=table_prefix(tenant_id)
+                )
+            )
+    except IntegrityError:
+        raise ValueError(f"User already exists: {username}")
+    ensure_tenant_schema(schema)
+    return tenant_id
+
+
+def ensure_tenant_schema(schema: str) -> None:
+    """Create the user's schema in the per-schema layout. The shared layout keeps every tenant in one schema.
+
+    Called when a user registers; schemas of users registered earlier are created by the migrations.
+    """
+    if db_settings.tenant_storage_layout != "schema":
+        return
+    with _created_lock:
+        if schema in _created_schemas:
+            return
+        with get_db_engine().begin() as conn:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        _created_schemas.add(schema)
@@ -0,0 +1,357 @@
+"""Usage ledger: one compact row per agent run, rolled up per hour and tenant for the admin page.
+
+Runs queue a `UsageRecord` with `usage_writer.record()` (see agents.usage), which never waits on
+the database: a background thread writes the queue in batches of `USAGE_BATCH_SIZE` rows per
+INSERT, at least every `USAGE_FLUSH_SECONDS`. While the database is slow or down, records beyond
+`USAGE_QUEUE_MAX` are dropped and counted instead of slowing runs down.
+
+`rollup_usage` rebuilds `ai.usage_rollups`, one row per hour, tenant, agent and model, from the
+runs of the latest hours. An API worker runs it every `USAGE_ROLLUP_INTERVAL_SECONDS` (an advisory
+lock keeps the other workers out), `python -m admin usage-rollup` runs it on demand. The admin
+page reads the rollups only, never the runs or the session JSON.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.sql.expression import cast, func, insert, select, text, true
+from sqlalchemy.types import BigInteger
+
+from db.settings import db_settings
+from db.tables import Tenant, UsageRollup, UsageRun
+from utils.log import logger
+
+# Upper bounds of the run duration buckets of the rollups' latency histograms, runs above the last
+# bound fall in an overflow bucket
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 3000, 5000, 8000, 12000, 20000, 30000, 60000, 120000)
+# Key of the advisory lock that lets one worker at a time rebuild the rollups
+ROLLUP_LOCK_KEY = 0x75736167
+
+
+@dataclass
+class UsageRecord:
+    created_at: datetime
+    tenant_id: Optional[str]
+    agent_id: str
+    model_id: str
+    status: str
+    duration_ms: int
+    run_id: Optional[str] = None
+    session_id: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+    model_ms: int = 0
+    first_token_ms: Optional[int] = None
+    tool_ms: int = 0
+    tool_calls: int = 0
+    session_cache_hit: Optional[bool] = None
+
+
+@dataclass
+class UsageWriterStats:
+    queued: int
+    written: int
+    # Dropped because the queue was full
+    dropped: int
+    # Lost with a batch that could not be written
+    failed: int
+
+
+class UsageWriter:
+    def __init__(
+        self,
+        batch_size: int = db_settings.usage_batch_size,
+        flush_seconds: float = db_settings.usage_flush_seconds,
+        queue_max: int = db_settings.usage_queue_max,
+        engine: Optional[Engine] = None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._engine = engine
+        self._queue: "queue.Queue[UsageRecord]" = queue.Queue(maxsize=queue_max)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._written = self._dropped = self._failed = 0
+
+    def record(self, record: UsageRecord) -> None:
+        """Queue a record, without blocking. Starts the writer thread on first use."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self) -> List[UsageRecord]:
+        """Up to `batch_size` records, waiting at most `flush_seconds` for them (not at all once closing)."""
+        batch: List[UsageRecord] = []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if self._stop.is_set() or timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, batch: List[UsageRecord]) -> None:
+        with self._engine.begin() as conn:
+            # One multi-row INSERT per batch (SQLAlchemy's insertmanyvalues)
+            conn.execute(insert(UsageRun), [asdict(record) for record in batch])
+
+    def _write(self, batch: List[UsageRecord]) -> None:
+        if self._engine is None:
+            from db.session import get_db_engine
+
+            self._engine = get_db_engine()
+        written = 0
+        try:
+            self._insert(batch)
+            written = len(batch)
+        except (DataError, IntegrityError) as e:
+            # A record the table rejects must not take the rest of the batch with it, write them one by one
+            logger.warning(f"Could not write {len(batch)} usage records, retrying them one by one: {e}")
+            for record in batch:
+                try:
+                    self._insert([record])
+                    written += 1
+                except (DataError, IntegrityError) as e:
+                    logger.warning(f"Dropping usage record of run {record.run_id}: {e}")
+        except Exception as e:
+            logger.warning(f"Could not write {len(batch)} usage records: {e}")
+        with self._lock:
+            self._written += written
+            self._failed += len(batch) - written
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued and stop the thread, called when the worker shuts down."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+
+    def stats(self) -> UsageWriterStats:
+        with self._lock:
+            return UsageWriterStats(
+                queued=self._queue.qsize(), written=self._written, dropped=self._dropped, failed=self._failed
+            )
+
+
+usage_writer = UsageWriter()
+
+
+def _qualified(table) -> str:
+    return f"{table.schema}.{table.name}"
+
+
+def rollup_statement() -> str:
+    """INSERT of the rollups of the runs created since `:start`, per hour, tenant, agent and model."""
+    bounds = ", ".join(str(bound) for bound in LATENCY_BUCKETS_MS)
+    return f"""
+        WITH runs AS (
+            SELECT
+                date_trunc('hour', created_at) AS bucket, tenant_id, agent_id, model_id, status,
+                input_tokens, output_tokens, cached_tokens, cost_usd, duration_ms, model_ms, tool_ms,
+                tool_calls, session_cache_hit, width_bucket(duration_ms, ARRAY[{bounds}]) AS latency_bucket
+            FROM {_qualified(UsageRun.__table__)}
+            WHERE created_at >= :start
+        ),
+        histograms AS (
+            SELECT bucket, tenant_id, agent_id, model_id, jsonb_object_agg(latency_bucket, runs) AS latency_histogram
+            FROM (
+                SELECT bucket, tenant_id, agent_id, model_id, latency_bucket, count(*) AS runs
+                FROM runs
+                GROUP BY bucket, tenant_id, agent_id, model_id, latency_bucket
+            ) counts
+            GROUP BY bucket, tenant_id, agent_id, model_id
+        )
+        INSERT INTO {_qualified(UsageRollup.__table__)} (
+            bucket, tenant_id, agent_id, model_id, runs, cancelled_runs, failed_runs, input_tokens,
+            output_tokens, cached_tokens, cost_usd, duration_ms, model_ms, tool_ms, tool_calls,
+            session_cache_hits, p50_ms, p95_ms, p99_ms, latency_histogram
+        )
+        SELECT
+            r.bucket, r.tenant_id, r.agent_id, r.model_id,
+            count(*),
+            count(*) FILTER (WHERE r.status = 'cancelled'),
+            count(*) FILTER (WHERE r.status = 'failed'),
+            sum(r.input_tokens), sum(r.output_tokens), sum(r.cached_tokens), sum(r.cost_usd),
+            sum(r.duration_ms), sum(r.model_ms), sum(r.tool_ms), sum(r.tool_calls),
+            count(*) FILTER (WHERE r.session_cache_hit),
+            percentile_cont(0.5) WITHIN GROUP (ORDER BY r.duration_ms),
+            percentile_cont(0.95) WITHIN GROUP (ORDER BY r.duration_ms),
+            percentile_cont(0.99) WITHIN GROUP (ORDER BY r.duration_ms),
+            h.latency_histogram
+        FROM runs r
+        JOIN histograms h
+            ON h.bucket = r.bucket AND h.tenant_id IS NOT DISTINCT FROM r.tenant_id
+            AND h.agent_id = r.agent_id AND h.model_id = r.model_id
+        GROUP BY r.bucket, r.tenant_id, r.agent_id, r.model_id, h.latency_histogram
+    """
+
+
+def rollup_start(conn: Connection) -> Optional[datetime]:
+    """First hour to rebuild: the hour before the latest rolled-up one, whose runs may have been
+    written after it was rolled up. The first run's hour when nothing was rolled up yet."""
+    latest = conn.execute(select(func.max(UsageRollup.bucket))).scalar()
+    if latest is not None:
+        return latest - timedelta(hours=1)
+    first = conn.execute(select(UsageRun.created_at).order_by(UsageRun.id).limit(1)).scalar()
+    if first is None:
+        return None
+    return first.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_usage(engine: Engine, since: Optional[datetime] = None) -> Optional[int]:
+    """Rebuild the rollups of the hours from `since` on. Returns the rollup rows written, None if
+    another worker is rebuilding them."""
+    with engine.begin() as conn:
+        if not conn.execute(select(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_KEY))).scalar():
+            return None
+        start = since.replace(minute=0, second=0, microsecond=0) if since is not None else rollup_start(conn)
+        if start is None:
+            return 0
+        conn.execute(UsageRollup.__table__.delete().where(UsageRollup.bucket >= start))
+        return conn.execute(text(rollup_statement()), {"start": start}).rowcount
+
+
+def histogram_percentile(histogram: Dict[int, int], q: float) -> Optional[float]:
+    """Upper bound of the latency bucket holding the `q` quantile, the last bound for the overflow bucket."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank, seen = q * total, 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return float(LATENCY_BUCKETS_MS[min(index, len(LATENCY_BUCKETS_MS) - 1)])
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+@dataclass
+class TenantUsage:
+    tenant_id: Optional[str]
+    user_name: Optional[str] = None
+    runs: int = 0
+    cancelled_runs: int = 0
+    failed_runs: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+    duration_ms: int = 0
+    model_ms: int = 0
+    tool_ms: int = 0
+    tool_calls: int = 0
+    session_cache_hits: int = 0
+    latency_histogram: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def avg_ms(self) -> float:
+        return self.duration_ms / self.runs if self.runs else 0.0
+
+    @property
+    def prompt_cache_rate(self) -> float:
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def percentile_ms(self, q: float) -> Optional[float]:
+        return histogram_percentile(self.latency_histogram, q)
+
+
+SUMMED = (
+    "runs",
+    "cancelled_runs",
+    "failed_runs",
+    "input_tokens",
+    "output_tokens",
+    "cached_tokens",
+    "cost_usd",
+    "duration_ms",
+    "model_ms",
+    "tool_ms",
+    "tool_calls",
+    "session_cache_hits",
+)
+
+
+def usage_by_tenant(engine: Engine, start: datetime) -> List[TenantUsage]:
+    """Usage per tenant of the hours from `start` on, by cost."""
+    rollups = UsageRollup.__table__
+    totals = (
+        select(rollups.c.tenant_id, Tenant.user_name, *(func.sum(rollups.c[name]).label(name) for name in SUMMED))
+        .outerjoin(Tenant, Tenant.tenant_id == rollups.c.tenant_id)
+        .where(rollups.c.bucket >= start)
+        .group_by(rollups.c.tenant_id, Tenant.user_name)
+    )
+    histogram = (
+        func.jsonb_each_text(rollups.c.latency_histogram).table_valued("key", "value").render_derived().lateral()
+    )
+    histograms = (
+        select(rollups.c.tenant_id, histogram.c.key, func.sum(cast(histogram.c.value, BigInteger)))
+        .select_from(rollups.join(histogram, true()))
+        .where(rollups.c.bucket >= start)
+        .group_by(rollups.c.tenant_id, histogram.c.key)
+    )
+    with engine.connect() as conn:
+        usage = {
+            row.tenant_id: TenantUsage(
+                tenant_id=row.tenant_id, user_name=row.user_name, **{name: row._mapping[name] or 0 for name in SUMMED}
+            )
+            for row in conn.execute(totals)
+        }
+        for tenant_id, key, runs in conn.execute(histograms):
+            if tenant_id in usage:
+                usage[tenant_id].latency_histogram[int(key)] = int(runs)
+    return sorted(usage.values(), key=lambda tenant: tenant.cost_usd, reverse=True)
+
+
+def hourly_usage(engine: Engine, start: datetime) -> List[Dict]:
+    """Runs, cost and average duration per hour from `start` on, across tenants."""
+    rollups = UsageRollup.__table__
+    stmt = (
+        select(
+            rollups.c.bucket,
+            func.sum(rollups.c.runs).label("runs"),
+            func.sum(rollups.c.cost_usd).label("cost_usd"),
+            (func.sum(rollups.c.duration_ms) / func.nullif(func.sum(rollups.c.runs), 0)).label("avg_ms"),
+        )
+        .where(rollups.c.bucket >= start)
+        .group_by(rollups.c.bucket)
+        .order_by(rollups.c.bucket)
+    )
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def window_start(hours: int, now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
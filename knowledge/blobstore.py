@@ -0,0 +1,313 @@
+"""Content-addressed store for the raw documents behind the knowledge bases.
+
+Every upload and scraped page is stored once under `rag_data/blobs/<aa>/<sha256>[.zst|.gz]`,
+named by the SHA-256 of its uncompressed content. A tenant only keeps a manifest,
+`rag_data/<tenant_id>/manifest.json`, that maps its file names to blobs, so the same file
+uploaded by several tenants takes the space of one copy. Blobs no manifest refers to are
+removed by `gc()` (`python -m admin blobs-gc`).
+
+Manifests are updated under an exclusive `flock` on `<tenant_id>/.manifest.lock`, as the API
+workers, the watcher and the Streamlit app update them from separate processes.
+
+Blobs are compressed with gzip, or with zstd (`KG_BLOB_COMPRESSION=zstd`) when `zstandard` is installed.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set
+
+from knowledge.settings import knowledge_settings
+from knowledge.uploads import RAG_DATA_DIR, safe_filename
+from utils.log import logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    # Not on Windows, where manifests are only guarded within the process
+    fcntl = None
+
+MANIFEST = "manifest.json"
+MANIFEST_LOCK = ".manifest.lock"
+BLOBS_DIR = "blobs"
+CODEC_SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+
+@dataclass
+class BlobEntry:
+    sha256: str
+    size: int
+    codec: str
+    added_at: float
+
+
+@dataclass
+class GcResult:
+    removed: int
+    freed_bytes: int
+    kept: int
+
+
+_warned_zstd = False
+
+
+def resolve_codec(codec: str) -> str:
+    global _warned_zstd
+    if codec == "zstd" and zstandard is None:
+        # Called for every archive run and stored profile, warn once per process
+        if not _warned_zstd:
+            logger.warning("`zstandard` not installed, compressing with gzip")
+            _warned_zstd = True
+        return "gzip"
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"Unknown blob codec: {codec}")
+    return codec
+
+
+@contextmanager
+def _compressed_writer(path: Path, codec: str) -> Iterator[BinaryIO]:
+    with path.open("wb") as raw:
+        if codec == "zstd":
+            with zstandard.ZstdCompressor(level=knowledge_settings.kg_blob_zstd_level).stream_writer(raw) as out:
+                yield out
+        elif codec == "gzip":
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as out:
+                yield out
+        else:
+            yield raw
+
+
+def compress_bytes(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=knowledge_settings.kg_blob_zstd_level).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+def decompress_bytes(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("`zstandard` not installed. Please install using `pip install zstandard`")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+class BlobStore:
+    def __init__(self, root: Path = RAG_DATA_DIR, codec: str = knowledge_settings.kg_blob_compression):
+        self.root = Path(root)
+        self.codec = resolve_codec(codec)
+        self._lock = threading.Lock()
+
+    @property
+    def blobs_dir(self) -> Path:
+        return self.root / BLOBS_DIR
+
+    def blob_path(self, sha256: str, codec: str) -> Path:
+        return self.blobs_dir / sha256[:2] / f"{sha256}{CODEC_SUFFIXES[codec]}"
+
+    def find_blob(self, sha256: str) -> Optional[Path]:
+        for codec in CODEC_SUFFIXES:
+            path = self.blob_path(sha256, codec)
+            if path.exists():
+                return path
+        return None
+
+    def put_file(self, path: Path, chunk_bytes: int = knowledge_settings.kg_upload_chunk_bytes) -> BlobEntry:
+        """Store the content of `path` unless a blob with the same hash exists. The file is left in place."""
+        path = Path(path)
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(chunk_bytes):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        size = path.stat().st_size
+
+        existing = self.find_blob(sha256)
+        if existing is not None:
+            # Refresh the mtime so a concurrent gc() does not collect it before the manifest is written
+            os.utime(existing)
+            return BlobEntry(sha256=sha256, size=size, codec=_codec_of(existing), added_at=time.time())
+
+        target = self.blob_path(sha256, self.codec)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".blob-")
+        os.close(fd)
+        try:
+            with path.open("rb") as src, _compressed_writer(Path(tmp_name), self.codec) as out:
+                shutil.copyfileobj(src, out, chunk_bytes)
+            os.replace(tmp_name, target)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return BlobEntry(sha256=sha256, size=size, codec=self.codec, added_at=time.time())
+
+    @contextmanager
+    def open(self, sha256: str) -> Iterator[BinaryIO]:
+        """Open a blob for reading its uncompressed content."""
+        path = self.find_blob(sha256)
+        if path is None:
+            raise FileNotFoundError(f"Blob not found: {sha256}")
+        codec = _codec_of(path)
+        with path.open("rb") as raw:
+            if codec == "zstd":
+                if zstandard is None:
+                    raise ImportError("`zstandard` not installed. Please install using `pip install zstandard`")
+                with zstandard.ZstdDecompressor().stream_reader(raw) as f:
+                    yield f
+            elif codec == "gzip":
+                with gzip.GzipFile(fileobj=raw, mode="rb") as f:
+                    yield f
+            else:
+                yield raw
+
+    # Manifests
+
+    def manifest_path(self, tenant_id: str) -> Path:
+        return self.root / str(tenant_id) / MANIFEST
+
+    def read_manifest(self, tenant_id: str) -> Dict[str, BlobEntry]:
+        path = self.manifest_path(tenant_id)
+        if not path.exists():
+            return {}
+        with path.open(encoding="utf-8") as f:
+            return {name: BlobEntry(**entry) for name, entry in json.load(f).items()}
+
+    @contextmanager
+    def _locked_manifest(self, tenant_id: str) -> Iterator[None]:
+        """Hold the tenant's manifest for a read-modify-write, across threads and processes."""
+        directory = self.root / str(tenant_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, (directory / MANIFEST_LOCK).open("a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self, tenant_id: str, manifest: Dict[str, BlobEntry]) -> None:
+        path = self.manifest_path(tenant_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".manifest-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({name: asdict(entry) for name, entry in sorted(manifest.items())}, f, indent=1)
+        os.replace(tmp_name, path)
+
+    def add(self, tenant_id: str, path: Path, name: Optional[str] = None, remove: bool = True) -> BlobEntry:
+        """Store a file and record it in the tenant's manifest under `name` (the file name by default).
+
+        With `remove`, the original file is deleted once it is stored.
+        """
+        path = Path(path)
+        name = safe_filename(name or path.name)
+        entry = self.put_file(path)
+        with self._locked_manifest(tenant_id):
+            manifest = self.read_manifest(tenant_id)
+            manifest[name] = entry
+            self._write_manifest(tenant_id, manifest)
+        if remove:
+            path.unlink(missing_ok=True)
+        return entry
+
+    def add_bytes(self, tenant_id: str, name: str, data: bytes) -> BlobEntry:
+        directory = self.root / str(tenant_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            return self.add(tenant_id, Path(tmp_name), name=name, remove=True)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def remove(self, tenant_id: str, name: str) -> bool:
+        """Drop a file from the tenant's manifest. Its blob is collected by gc() if unreferenced."""
+        with self._locked_manifest(tenant_id):
+            manifest = self.read_manifest(tenant_id)
+            if manifest.pop(name, None) is None:
+                return False
+            self._write_manifest(tenant_id, manifest)
+        return True
+
+    def clear(self, tenant_id: str) -> int:
+        """Empty the tenant's manifest. Returns the number of files dropped."""
+        with self._locked_manifest(tenant_id):
+            manifest = self.read_manifest(tenant_id)
+            if manifest:
+                self._write_manifest(tenant_id, {})
+        return len(manifest)
+
+    def tenants(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and p.name != BLOBS_DIR)
+
+    def referenced(self) -> Set[str]:
+        return {entry.sha256 for tenant_id in self.tenants() for entry in self.read_manifest(tenant_id).values()}
+
+    def gc(self, grace_seconds: int = knowledge_settings.kg_blob_gc_grace_seconds, dry_run: bool = False) -> GcResult:
+        """Remove blobs no manifest refers to.
+
+        Blobs modified in the last `grace_seconds` are kept: they may belong to an upload whose
+        manifest entry is still being written.
+        """
+        referenced = self.referenced()
+        cutoff = time.time() - grace_seconds
+        removed = freed = kept = 0
+        if not self.blobs_dir.exists():
+            return GcResult(removed=0, freed_bytes=0, kept=0)
+        for path in self.blobs_dir.glob("*/*"):
+            stat = path.stat()
+            if path.name.startswith("."):
+                # Left behind by an interrupted write
+                if stat.st_mtime < cutoff and not dry_run:
+                    path.unlink(missing_ok=True)
+                continue
+            if _sha256_of(path) in referenced or stat.st_mtime >= cutoff:
+                kept += 1
+                continue
+            removed += 1
+            freed += stat.st_size
+            if not dry_run:
+                path.unlink(missing_ok=True)
+        return GcResult(removed=removed, freed_bytes=freed, kept=kept)
+
+
+def _sha256_of(path: Path) -> str:
+    return path.name.split(".", 1)[0]
+
+
+def _codec_of(path: Path) -> str:
+    suffix = path.suffix if path.suffix in (".zst", ".gz") else ""
+    return next(codec for codec, codec_suffix in CODEC_SUFFIXES.items() if codec_suffix == suffix)
+
+
+def migrate_tenant_dir(store: BlobStore, tenant_id: str, skip: Iterable[str] = ()) -> List[str]:
+    """Move the plain files of `rag_data/<tenant_id>/`, except `skip`, into the blob store. Returns the names moved."""
+    skip = set(skip)
+    moved = []
+    for path in sorted((store.root / tenant_id).iterdir()):
+        if path.is_file() and not path.name.startswith(".") and path.name not in skip and path.name != MANIFEST:
+            store.add(tenant_id, path)
+            moved.append(path.name)
+    return moved
+
+
+blob_store = BlobStore()
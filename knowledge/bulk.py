@@ -0,0 +1,124 @@
+"""Bulk write path for knowledge tables.
+
+Rows are streamed into a temporary staging table with binary COPY and merged into the
+knowledge table with a single INSERT ... SELECT ... ON CONFLICT. This avoids a round trip
+and an index lookup per row, which dominates row-level upserts for large loads.
+
+The records are built (and embedded) before a connection is taken from the pool, so the
+transaction holding the staging table never waits on the embedding API.
+"""
+
+import uuid
+from typing import Any, Dict, Iterable, List
+
+from psycopg.types import TypeInfo
+from psycopg.types.json import Jsonb
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import Table
+
+from knowledge.indexes import quote_ident
+
+try:
+    from pgvector import Vector
+    from pgvector.psycopg.vector import VectorBinaryDumper
+except ImportError:
+    raise ImportError("`pgvector` not installed. Please install using `pip install pgvector`")
+
+# Postgres types of the columns written by the bulk path, used for binary COPY
+COPY_TYPES: Dict[str, str] = {
+    "tenant_id": "uuid",
+    "id": "text",
+    "name": "text",
+    "meta_data": "jsonb",
+    "filters": "jsonb",
+    "content": "text",
+    "embedding": "vector",
+    "usage": "jsonb",
+    "content_hash": "text",
+    "document_id": "text",
+}
+
+STAGING_TABLE = "_kg_copy_stage"
+# Staging order of the rows, the last staged row of a key is the one merged
+STAGING_SEQ = "_stage_seq"
+
+
+def _copy_value(column: str, value: Any) -> Any:
+    if value is None:
+        return None
+    type_name = COPY_TYPES[column]
+    if type_name == "jsonb":
+        return Jsonb(value)
+    if type_name == "vector":
+        return Vector(value)
+    if type_name == "uuid":
+        return uuid.UUID(str(value))
+    return value
+
+
+def build_merge_sql(target: str, columns: List[str], conflict_columns: List[str], upsert: bool) -> str:
+    """INSERT ... SELECT from the staging table into `target`.
+
+    DISTINCT ON keeps one row per key, the last one staged, as ON CONFLICT cannot update the same
+    row twice in one statement.
+    """
+    column_list = ", ".join(quote_ident(c) for c in columns)
+    conflict_list = ", ".join(quote_ident(c) for c in conflict_columns)
+    sql = (
+        f"INSERT INTO {target} ({column_list}) SELECT DISTINCT ON ({conflict_list}) {column_list} FROM {STAGING_TABLE} "
+        f"ORDER BY {conflict_list}, {STAGING_SEQ} DESC "
+    )
+    if not upsert:
+        return sql
+    updates = [f"{quote_ident(c)} = EXCLUDED.{quote_ident(c)}" for c in columns if c not in conflict_columns]
+    updates.append("updated_at = now()")
+    return sql + f"ON CONFLICT ({conflict_list}) DO UPDATE SET {', '.join(updates)}"
+
+
+def copy_merge(
+    engine: Engine,
+    table: Table,
+    batches: Iterable[List[Dict[str, Any]]],
+    conflict_columns: List[str],
+    upsert: bool = True,
+) -> int:
+    """Stage record batches with binary COPY and merge them into `table` in one transaction.
+
+    `batches` is consumed before the connection is taken, embedding a batch happens outside the
+    transaction. Returns the number of rows written to the table.
+    """
+    batches = [records for records in batches if records]
+    if not batches:
+        return 0
+    columns = list(batches[0][0])
+    column_list = ", ".join(quote_ident(c) for c in columns)
+    target = f"{quote_ident(table.schema)}.{quote_ident(table.name)}" if table.schema else quote_ident(table.name)
+
+    raw_connection = engine.raw_connection()
+    try:
+        connection = raw_connection.driver_connection
+        vector_info = TypeInfo.fetch(connection, "vector")
+        if vector_info is None:
+            raise ValueError("The vector extension is not installed")
+        types = [vector_info.oid if COPY_TYPES[c] == "vector" else COPY_TYPES[c] for c in columns]
+        with connection.cursor() as cur:
+            # Registered on the cursor only, the pooled connection keeps SQLAlchemy's text adaptation
+            cur.adapters.register_dumper(Vector, type("", (VectorBinaryDumper,), {"oid": vector_info.oid}))
+            cur.execute(
+                f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE {target} INCLUDING DEFAULTS, "
+                f"{STAGING_SEQ} bigint GENERATED ALWAYS AS IDENTITY) ON COMMIT DROP"
+            )
+            with cur.copy(f"COPY {STAGING_TABLE} ({column_list}) FROM STDIN (FORMAT BINARY)") as copy:
+                copy.set_types(types)
+                for records in batches:
+                    for record in records:
+                        copy.write_row([_copy_value(c, record.get(c)) for c in columns])
+            cur.execute(build_merge_sql(target, columns, conflict_columns, upsert))
+            written = cur.rowcount
+        raw_connection.commit()
+        return written
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
@@ -0,0 +1,263 @@
+"""Token-aware chunking strategies for knowledge documents.
+
+Readers are run with `chunk=False` and their documents are chunked here instead:
+
+- "token": fixed windows of `kg_chunk_tokens` tokens with `kg_chunk_overlap` tokens of overlap
+- "structure": sections split at headings, paragraphs packed up to `kg_chunk_tokens`
+- "rows": table rows packed in batches of `kg_chunk_rows`, each chunk repeats the header row
+
+The strategy is picked per file type (`kg_chunking`) and can be overridden per tenant
+(`kg_tenant_chunking`). Every strategy tokenizes all of its input in a single batched
+tokenizer call, which tiktoken runs across threads.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+
+from agno.document.base import Document
+from agno.document.chunking.strategy import ChunkingStrategy
+
+from knowledge.settings import knowledge_settings
+
+
+class Tokenizer(Protocol):
+    def encode_batch(self, texts: List[str]) -> List[List[int]]: ...
+
+    def decode(self, tokens: Sequence[int]) -> str: ...
+
+
+class TiktokenTokenizer:
+    """tiktoken encoding with a multi-threaded batch encoder."""
+
+    def __init__(self, encoding: str = "cl100k_base", num_threads: int = 8):
+        try:
+            import tiktoken
+        except ImportError:
+            raise ImportError("`tiktoken` not installed. Please install using `pip install tiktoken`")
+
+        self.encoding = tiktoken.get_encoding(encoding)
+        self.num_threads = num_threads
+
+    def encode_batch(self, texts: List[str]) -> List[List[int]]:
+        return self.encoding.encode_ordinary_batch(texts, num_threads=self.num_threads)
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        return self.encoding.decode(list(tokens))
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding: str = knowledge_settings.kg_tokenizer_encoding) -> TiktokenTokenizer:
+    return TiktokenTokenizer(encoding)
+
+
+class TokenAwareChunking(ChunkingStrategy):
+    """Base class for strategies that chunk many documents with one tokenizer pass."""
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None):
+        self._tokenizer = tokenizer
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer()
+        return self._tokenizer
+
+    def chunk(self, document: Document) -> List[Document]:
+        return self.chunk_many([document])
+
+    def chunk_many(self, documents: List[Document]) -> List[Document]:
+        raise NotImplementedError
+
+    def _windows(self, tokens: List[int], size: int, overlap: int = 0) -> List[List[int]]:
+        step = max(size - overlap, 1)
+        return [tokens[start : start + size] for start in range(0, max(len(tokens) - overlap, 1), step)]
+
+    def _make_chunk(self, document: Document, content: str, number: int, token_count: int, **meta) -> Document:
+        # Same ids as agno's chunkers so re-loading a document replaces its chunks
+        chunk_id = None
+        if document.id:
+            chunk_id = f"{document.id}_{number}"
+        elif document.name:
+            chunk_id = f"{document.name}_{number}"
+        meta_data = dict(document.meta_data)
+        meta_data.update(chunk=number, chunk_size=len(content), chunk_tokens=token_count, **meta)
+        return Document(id=chunk_id, name=document.name, meta_data=meta_data, content=content)
+
+
+class TokenChunking(TokenAwareChunking):
+    """Fixed-size token windows with overlap."""
+
+    def __init__(
+        self,
+        chunk_tokens: int = knowledge_settings.kg_chunk_tokens,
+        overlap: int = knowledge_settings.kg_chunk_overlap,
+        tokenizer: Optional[Tokenizer] = None,
+    ):
+        if overlap >= chunk_tokens:
+            raise ValueError(f"Invalid parameters: overlap ({overlap}) must be less than chunk size ({chunk_tokens}).")
+        super().__init__(tokenizer)
+        self.chunk_tokens = chunk_tokens
+        self.overlap = overlap
+
+    def chunk_many(self, documents: List[Document]) -> List[Document]:
+        chunks: List[Document] = []
+        encoded = self.tokenizer.encode_batch([document.content for document in documents])
+        for document, tokens in zip(documents, encoded):
+            number = 0
+            for window in self._windows(tokens, self.chunk_tokens, self.overlap):
+                content = self.tokenizer.decode(window).strip()
+                if content:
+                    number += 1
+                    chunks.append(self._make_chunk(document, content, number, len(window)))
+        return chunks
+
+
+HEADING = re.compile(r"^\s{0,3}#{1,6}\s+\S|^[A-Z0-9][A-Z0-9 .,:&()'/-]{2,80}$")
+
+
+def split_sections(content: str) -> List[Tuple[str, List[str]]]:
+    """Split text into (heading, paragraphs) sections.
+
+    Headings are markdown headings or short all-caps lines. Paragraphs are separated by blank
+    lines, or by line breaks if the text has no blank lines (e.g. text extracted from a PDF page).
+    """
+    paragraph_break = r"\n\s*\n" if re.search(r"\n\s*\n", content) else r"\n"
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    for block in re.split(paragraph_break, content):
+        lines = [line for line in block.strip().splitlines() if line.strip()]
+        if not lines:
+            continue
+        if HEADING.match(lines[0]):
+            sections.append((lines[0].strip(), []))
+            lines = lines[1:]
+        if lines:
+            sections[-1][1].append("\n".join(lines))
+    return [section for section in sections if section[0] or section[1]]
+
+
+class StructureChunking(TokenAwareChunking):
+    """Chunks that follow headings and paragraphs.
+
+    Paragraphs of one section are packed into a chunk until `chunk_tokens` is reached; each chunk
+    starts with its section heading. Paragraphs longer than `chunk_tokens` are split into token windows.
+    """
+
+    def __init__(self, chunk_tokens: int = knowledge_settings.kg_chunk_tokens, tokenizer: Optional[Tokenizer] = None):
+        super().__init__(tokenizer)
+        self.chunk_tokens = chunk_tokens
+
+    def chunk_many(self, documents: List[Document]) -> List[Document]:
+        sections = [split_sections(document.content) for document in documents]
+        texts = [
+            text for doc_sections in sections for heading, paragraphs in doc_sections for text in (heading, *paragraphs)
+        ]
+        encoded = iter(self.tokenizer.encode_batch(texts))
+
+        chunks: List[Document] = []
+        for document, doc_sections in zip(documents, sections):
+            number = 0
+
+            def emit(parts: List[str], token_count: int, heading: str) -> None:
+                nonlocal number
+                content = "\n\n".join(part for part in parts if part).strip()
+                if content:
+                    number += 1
+                    chunks.append(self._make_chunk(document, content, number, token_count, section=heading or None))
+
+            for heading, paragraphs in doc_sections:
+                heading_tokens = len(next(encoded))
+                parts, used = [heading], heading_tokens
+                for paragraph in paragraphs:
+                    tokens = next(encoded)
+                    if used + len(tokens) <= self.chunk_tokens:
+                        parts.append(paragraph)
+                        used += len(tokens)
+                        continue
+                    if len(parts) > 1:
+                        emit(parts, used, heading)
+                        parts, used = [heading], heading_tokens
+                    if used + len(tokens) <= self.chunk_tokens:
+                        parts.append(paragraph)
+                        used += len(tokens)
+                        continue
+                    for window in self._windows(tokens, max(self.chunk_tokens - heading_tokens, 1)):
+                        emit([heading, self.tokenizer.decode(window)], heading_tokens + len(window), heading)
+                if len(parts) > 1:
+                    emit(parts, used, heading)
+            if number == 0 and document.content.strip():
+                # Only headings, keep them as a single chunk
+                emit([document.content], len(self.tokenizer.encode_batch([document.content])[0]), "")
+        return chunks
+
+
+class RowBatchChunking(TokenAwareChunking):
+    """Batches of table rows (one row per line) with the header row repeated in every chunk."""
+
+    def __init__(
+        self,
+        rows_per_chunk: int = knowledge_settings.kg_chunk_rows,
+        chunk_tokens: int = knowledge_settings.kg_chunk_tokens,
+        header: bool = True,
+        tokenizer: Optional[Tokenizer] = None,
+    ):
+        super().__init__(tokenizer)
+        self.rows_per_chunk = rows_per_chunk
+        self.chunk_tokens = chunk_tokens
+        self.header = header
+
+    def chunk_many(self, documents: List[Document]) -> List[Document]:
+        tables = []
+        for document in documents:
+            lines = [line for line in document.content.splitlines() if line.strip()]
+            if self.header and lines:
+                tables.append((lines[0], lines[1:]))
+            else:
+                tables.append(("", lines))
+        encoded = iter(self.tokenizer.encode_batch([line for header, rows in tables for line in (header, *rows)]))
+
+        chunks: List[Document] = []
+        for document, (header, rows) in zip(documents, tables):
+            header_tokens = len(next(encoded))
+            number, batch, used, first_row = 0, [], header_tokens, 1
+            for index, row in enumerate(rows, start=1):
+                row_tokens = len(next(encoded))
+                if batch and (len(batch) >= self.rows_per_chunk or used + row_tokens > self.chunk_tokens):
+                    number += 1
+                    content = "\n".join([header, *batch] if header else batch)
+                    chunks.append(self._make_chunk(document, content, number, used, rows=f"{first_row}-{index - 1}"))
+                    batch, used, first_row = [], header_tokens, index
+                batch.append(row)
+                used += row_tokens
+            if batch:
+                number += 1
+                content = "\n".join([header, *batch] if header else batch)
+                chunks.append(self._make_chunk(document, content, number, used, rows=f"{first_row}-{len(rows)}"))
+        return chunks
+
+
+CHUNKING_STRATEGIES = {
+    "token": TokenChunking,
+    "structure": StructureChunking,
+    "rows": RowBatchChunking,
+}
+
+
+def get_chunking_strategy(
+    file_type: str, tenant_id: Optional[str] = None, tokenizer: Optional[Tokenizer] = None
+) -> TokenAwareChunking:
+    """Chunking strategy for a file type, honouring the tenant's overrides."""
+    file_type = file_type.lower().lstrip(".")
+    strategies: Dict[str, str] = dict(knowledge_settings.kg_chunking)
+    if tenant_id:
+        strategies.update(knowledge_settings.kg_tenant_chunking.get(str(tenant_id), {}))
+    name = strategies.get(file_type, strategies.get("default", "token"))
+    if name not in CHUNKING_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy '{name}' for file type '{file_type}'")
+    return CHUNKING_STRATEGIES[name](tokenizer=tokenizer)
+
+
+def chunk_documents(documents: List[Document], strategy: ChunkingStrategy) -> List[Document]:
+    if isinstance(strategy, TokenAwareChunking):
+        return strategy.chunk_many(documents)
+    return [chunk for document in documents for chunk in strategy.chunk(document)]
@@ -0,0 +1,439 @@
+"""Lifecycle management for the ANN and full-text indexes on knowledge tables.
+
+Indexes are built with CREATE INDEX CONCURRENTLY so ingestion and search keep running while
+a large tenant table is being indexed. Tables below `kg_index_min_rows` are left alone.
+
+The ANN index covers the float32 embeddings ("full") or a quantized copy of them computed in the
+index expression, `embedding::halfvec(n)` ("halfvec") or `binary_quantize(embedding)::bit(n)`
+("binary"), see `kg_vector_storage`. Searches only use the index over the configured storage;
+`convert_vector_index` builds it next to the old one and drops the old one once asked to.
+"""
+
+from dataclasses import dataclass, field
+from math import sqrt
+from typing import List, Optional, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql.expression import text
+
+from knowledge.settings import knowledge_settings
+from utils.log import logger
+
+VECTOR_INDEX_METHODS = ("hnsw", "ivfflat")
+VECTOR_STORAGES = ("full", "halfvec", "binary")
+
+# Operator classes for each distance metric, keyed by agno's Distance values
+DISTANCE_OPS = {
+    "cosine": "vector_cosine_ops",
+    "l2": "vector_l2_ops",
+    "max_inner_product": "vector_ip_ops",
+}
+HALFVEC_DISTANCE_OPS = {
+    "cosine": "halfvec_cosine_ops",
+    "l2": "halfvec_l2_ops",
+    "max_inner_product": "halfvec_ip_ops",
+}
+
+
+def quote_ident(name: str) -> str:
+    """Quote a Postgres identifier. Tenant table names start with a digit, so they always need quoting."""
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def qualified_name(schema: str, table: str) -> str:
+    return f"{quote_ident(schema)}.{quote_ident(table)}"
+
+
+def vector_index_name(table: str, method: str, storage: str = "full") -> str:
+    # Same naming as agno's PgVector.optimize() so indexes built by either are recognised
+    if storage == "full":
+        return f"{table}_{method}_index"
+    return f"{table}_{method}_{storage}_index"
+
+
+def vector_index_expression(storage: str, dimensions: Optional[int] = None) -> str:
+    """Indexed expression of the embedding column, the searches order by the same expression."""
+    if storage == "full":
+        return "embedding"
+    if storage not in VECTOR_STORAGES:
+        raise ValueError(f"Unknown vector storage: {storage}")
+    if not dimensions:
+        raise ValueError(f"The {storage} vector storage needs the embedding dimensions")
+    if storage == "halfvec":
+        return f"(embedding::halfvec({int(dimensions)}))"
+    return f"(binary_quantize(embedding)::bit({int(dimensions)}))"
+
+
+def vector_index_storage(definition: str) -> str:
+    """Storage of an ANN index, from its pg_get_indexdef() definition."""
+    if "binary_quantize(" in definition:
+        return "binary"
+    if "halfvec" in definition:
+        return "halfvec"
+    return "full"
+
+
+def gin_index_name(table: str) -> str:
+    return f"{table}_content_gin_index"
+
+
+def document_index_name(table: str) -> str:
+    return f"{table}_document_id_index"
+
+
+def build_document_id_sql(schema: str, table: str) -> List[str]:
+    """Add the indexed `document_id` column to a knowledge table created before it existed."""
+    fqtn = qualified_name(schema, table)
+    return [
+        f"ALTER TABLE {fqtn} ADD COLUMN IF NOT EXISTS document_id text",
+        f"CREATE INDEX IF NOT EXISTS {quote_ident(document_index_name(table))} ON {fqtn} (document_id)",
+    ]
+
+
+def ivfflat_lists(row_count: int) -> int:
+    """Number of IVFFlat lists recommended by pgvector: rows / 1000 up to 1M rows, sqrt(rows) after."""
+    if row_count < 1_000_000:
+        return max(row_count // 1000, 1)
+    return max(int(sqrt(row_count)), 1)
+
+
+def build_vector_index_sql(
+    schema: str,
+    table: str,
+    method: str = knowledge_settings.kg_vector_index,
+    distance: str = "cosine",
+    row_count: int = 0,
+    concurrently: bool = True,
+    storage: str = "full",
+    dimensions: Optional[int] = None,
+) -> str:
+    """Build the CREATE INDEX statement for the embedding column, or its quantized copy."""
+    if method not in VECTOR_INDEX_METHODS:
+        raise ValueError(f"Unknown vector index method: {method}")
+    expression = vector_index_expression(storage, dimensions)
+    if storage == "binary":
+        # Sign bits compared by hamming distance, whatever the metric of the full vectors
+        ops = "bit_hamming_ops"
+    elif storage == "halfvec":
+        ops = HALFVEC_DISTANCE_OPS.get(distance, "halfvec_cosine_ops")
+    else:
+        ops = DISTANCE_OPS.get(distance, "vector_cosine_ops")
+    if method == "hnsw":
+        params = f"m = {knowledge_settings.kg_hnsw_m}, ef_construction = {knowledge_settings.kg_hnsw_ef_construction}"
+    else:
+        params = f"lists = {ivfflat_lists(row_count)}"
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS "
+        f"{quote_ident(vector_index_name(table, method, storage))} ON {qualified_name(schema, table)} "
+        f"USING {method} ({expression} {ops}) WITH ({params})"
+    )
+
+
+def build_gin_index_sql(
+    schema: str,
+    table: str,
+    language: str = knowledge_settings.kg_content_language,
+    concurrently: bool = True,
+) -> str:
+    """Build the CREATE INDEX statement for the full-text side of hybrid search.
+
+    The indexed expression must match the one used at query time, `to_tsvector('<language>'::regconfig, content)`.
+    """
+    language = language.replace("'", "''")
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS "
+        f"{quote_ident(gin_index_name(table))} ON {qualified_name(schema, table)} "
+        f"USING gin (to_tsvector('{language}'::regconfig, content))"
+    )
+
+
+@dataclass
+class IndexInfo:
+    name: str
+    method: str
+    valid: bool
+    size_bytes: int
+    # Vectors the ANN index covers, "full" for other indexes
+    storage: str = "full"
+
+
+@dataclass
+class IndexCoverage:
+    """Index state of a single knowledge table."""
+
+    schema: str
+    table: str
+    row_estimate: int = 0
+    table_bytes: int = 0
+    # Dimensions of the embedding column
+    dimensions: Optional[int] = None
+    indexes: List[IndexInfo] = field(default_factory=list)
+
+    @property
+    def vector_index(self) -> Optional[IndexInfo]:
+        return next((i for i in self.indexes if i.method in VECTOR_INDEX_METHODS and i.valid), None)
+
+    def vector_index_for(self, storage: str) -> Optional[IndexInfo]:
+        return next(
+            (i for i in self.indexes if i.method in VECTOR_INDEX_METHODS and i.valid and i.storage == storage), None
+        )
+
+    def stale_vector_indexes(self, storage: str) -> List[IndexInfo]:
+        """Valid ANN indexes over another storage, which searches no longer use."""
+        return [i for i in self.indexes if i.method in VECTOR_INDEX_METHODS and i.valid and i.storage != storage]
+
+    @property
+    def gin_index(self) -> Optional[IndexInfo]:
+        return next((i for i in self.indexes if i.method == "gin" and i.valid), None)
+
+    @property
+    def invalid_indexes(self) -> List[IndexInfo]:
+        """Indexes left behind by an interrupted CREATE INDEX CONCURRENTLY."""
+        return [i for i in self.indexes if not i.valid]
+
+    @property
+    def covered(self) -> bool:
+        return self.vector_index is not None and self.gin_index is not None
+
+    def covered_for(self, storage: str) -> bool:
+        return self.vector_index_for(storage) is not None and self.gin_index is not None
+
+
+def list_knowledge_tables(engine: Engine, suffix: str = "_sage_kg") -> List[Tuple[str, str]]:
+    """Return (schema, table) for every tenant knowledge table in the database."""
+    pattern = "%" + suffix.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%")
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT table_schema, table_name FROM information_schema.tables "
+                "WHERE table_type = 'BASE TABLE' AND table_name LIKE :pattern "
+                "ORDER BY table_schema, table_name"
+            ),
+            {"pattern": pattern},
+        ).fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
+def _row_estimate(conn: Connection, fqtn: str, cap: int) -> int:
+    """Planner row estimate, falling back to a bounded count for tables that were never analyzed."""
+    estimate = conn.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:fqtn)"), {"fqtn": fqtn}
+    ).scalar()
+    if estimate is not None and estimate >= 0:
+        return int(estimate)
+    count = int(conn.execute(text(f"SELECT count(*) FROM (SELECT 1 FROM {fqtn} LIMIT :cap) s"), {"cap": cap}).scalar())
+    if count < cap:
+        return count
+    # Large enough to index: analyze so IVFFlat list sizing sees the real row count
+    conn.execute(text(f"ANALYZE {fqtn}"))
+    estimate = conn.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:fqtn)"), {"fqtn": fqtn}
+    ).scalar()
+    return max(int(estimate or 0), count)
+
+
+def get_index_coverage(engine: Engine, schema: str, table: str) -> Optional[IndexCoverage]:
+    """Inspect a knowledge table. Returns None if the table does not exist."""
+    fqtn = qualified_name(schema, table)
+    with engine.connect() as conn:
+        table_bytes = conn.execute(
+            text("SELECT pg_total_relation_size(oid) FROM pg_class WHERE oid = to_regclass(:fqtn)"), {"fqtn": fqtn}
+        ).scalar()
+        if table_bytes is None:
+            return None
+        coverage = IndexCoverage(
+            schema=schema,
+            table=table,
+            row_estimate=_row_estimate(conn, fqtn, cap=knowledge_settings.kg_index_min_rows),
+            table_bytes=int(table_bytes),
+        )
+        # The typmod of a vector column is its number of dimensions
+        dimensions = conn.execute(
+            text(
+                "SELECT atttypmod FROM pg_attribute "
+                "WHERE attrelid = to_regclass(:fqtn) AND attname = 'embedding' AND NOT attisdropped"
+            ),
+            {"fqtn": fqtn},
+        ).scalar()
+        coverage.dimensions = int(dimensions) if dimensions is not None and dimensions > 0 else None
+        rows = conn.execute(
+            text(
+                "SELECT i.relname, am.amname, ix.indisvalid, pg_relation_size(i.oid), pg_get_indexdef(i.oid) "
+                "FROM pg_index ix "
+                "JOIN pg_class i ON i.oid = ix.indexrelid "
+                "JOIN pg_am am ON am.oid = i.relam "
+                "WHERE ix.indrelid = to_regclass(:fqtn)"
+            ),
+            {"fqtn": fqtn},
+        ).fetchall()
+    coverage.indexes = [
+        IndexInfo(
+            name=r[0],
+            method=r[1],
+            valid=bool(r[2]),
+            size_bytes=int(r[3]),
+            storage=vector_index_storage(r[4]) if r[1] in VECTOR_INDEX_METHODS else "full",
+        )
+        for r in rows
+    ]
+    return coverage
+
+
+def _run_ddl(engine: Engine, schema: str, table: str, statements: List[str]) -> List[str]:
+    """Run index DDL outside a transaction (required by CONCURRENTLY) under a per-table advisory lock.
+
+    Returns the statements that were executed. If another worker holds the lock it is already
+    building the indexes for this table and nothing is done.
+    """
+    if not statements:
+        return []
+    fqtn = qualified_name(schema, table)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:fqtn))"), {"fqtn": fqtn}).scalar()
+        if not locked:
+            logger.info(f"Index build already running for {fqtn}, skipping")
+            return []
+        try:
+            conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :mem, false)"),
+                {"mem": knowledge_settings.kg_index_maintenance_work_mem},
+            )
+            for statement in statements:
+                logger.info(f"Running: {statement}")
+                conn.execute(text(statement))
+        finally:
+            conn.execute(text("RESET maintenance_work_mem"))
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext(:fqtn))"), {"fqtn": fqtn})
+    return statements
+
+
+def ensure_indexes(
+    engine: Engine,
+    schema: str,
+    table: str,
+    method: str = knowledge_settings.kg_vector_index,
+    distance: str = "cosine",
+    language: str = knowledge_settings.kg_content_language,
+    min_rows: int = knowledge_settings.kg_index_min_rows,
+    storage: str = knowledge_settings.kg_vector_storage,
+) -> List[str]:
+    """Create any missing ANN / full-text index once the table has passed `min_rows`.
+
+    Invalid leftovers of an interrupted concurrent build are dropped and rebuilt. An ANN index
+    over another storage is kept, see convert_vector_index(). Returns the DDL statements that were executed.
+    """
+    coverage = get_index_coverage(engine, schema, table)
+    if coverage is None or coverage.row_estimate < min_rows:
+        return []
+
+    statements = [
+        f"DROP INDEX CONCURRENTLY IF EXISTS {qualified_name(schema, i.name)}" for i in coverage.invalid_indexes
+    ]
+    statements.extend(_vector_index_statements(coverage, method, distance, storage, drop_stale=False))
+    if coverage.gin_index is None:
+        statements.append(build_gin_index_sql(schema, table, language))
+    return _run_ddl(engine, schema, table, statements)
+
+
+def _vector_index_statements(
+    coverage: IndexCoverage, method: str, distance: str, storage: str, drop_stale: bool
+) -> List[str]:
+    """Build the ANN index over `storage` if it is missing, then drop the ones over another storage if asked to."""
+    statements = []
+    if coverage.vector_index_for(storage) is None:
+        statements.append(
+            build_vector_index_sql(
+                coverage.schema,
+                coverage.table,
+                method,
+                distance,
+                coverage.row_estimate,
+                storage=storage,
+                dimensions=coverage.dimensions,
+            )
+        )
+    if drop_stale:
+        statements.extend(
+            f"DROP INDEX CONCURRENTLY IF EXISTS {qualified_name(coverage.schema, index.name)}"
+            for index in coverage.stale_vector_indexes(storage)
+        )
+    return statements
+
+
+def convert_vector_index(
+    engine: Engine,
+    schema: str,
+    table: str,
+    storage: str = knowledge_settings.kg_vector_storage,
+    method: str = knowledge_settings.kg_vector_index,
+    distance: str = "cosine",
+    drop_old: bool = False,
+    dry_run: bool = False,
+) -> List[str]:
+    """Build a table's ANN index over `storage` concurrently, next to its current one.
+
+    The current index keeps serving searches until `kg_vector_storage` is switched; `drop_old`
+    drops it afterwards. Tables without an ANN index are left to ensure_indexes(). Returns the
+    DDL statements, only listed with `dry_run`.
+    """
+    coverage = get_index_coverage(engine, schema, table)
+    if coverage is None or coverage.vector_index is None:
+        return []
+    statements = _vector_index_statements(coverage, method, distance, storage, drop_stale=drop_old)
+    return statements if dry_run else _run_ddl(engine, schema, table, statements)
+
+
+def drop_trained_indexes(engine: Engine, schema: str, table: str) -> List[str]:
+    """Drop IVFFlat indexes after the table was emptied.
+
+    Their lists were trained on the deleted rows; ensure_indexes() builds a new one once the
+    table passes the threshold again. HNSW and GIN indexes stay valid on an empty table.
+    """
+    coverage = get_index_coverage(engine, schema, table)
+    if coverage is None:
+        return []
+    statements = [
+        f"DROP INDEX CONCURRENTLY IF EXISTS {qualified_name(schema, index.name)}"
+        for index in coverage.indexes
+        if index.method == "ivfflat"
+    ]
+    return _run_ddl(engine, schema, table, statements)
+
+
+def rebuild_indexes(
+    engine: Engine,
+    schema: str,
+    table: str,
+    method: str = knowledge_settings.kg_vector_index,
+    distance: str = "cosine",
+    language: str = knowledge_settings.kg_content_language,
+    storage: str = knowledge_settings.kg_vector_storage,
+) -> List[str]:
+    """Rebuild a table's indexes regardless of its size.
+
+    Valid indexes are rebuilt with REINDEX CONCURRENTLY, invalid ones are dropped and missing
+    ones are created. IVFFlat indexes are recreated instead so the number of lists tracks the
+    current row count. ANN indexes over another storage are left to convert_vector_index().
+    """
+    coverage = get_index_coverage(engine, schema, table)
+    if coverage is None:
+        return []
+
+    statements: List[str] = []
+    for index in coverage.indexes:
+        if index.valid and index.method in VECTOR_INDEX_METHODS and index.storage != storage:
+            continue
+        if not index.valid or index.method == "ivfflat":
+            statements.append(f"DROP INDEX CONCURRENTLY IF EXISTS {qualified_name(schema, index.name)}")
+        elif index.method in ("hnsw", "gin"):
+            statements.append(f"REINDEX INDEX CONCURRENTLY {qualified_name(schema, index.name)}")
+    vector_index = coverage.vector_index_for(storage)
+    if vector_index is None or vector_index.method == "ivfflat":
+        statements.append(
+            build_vector_index_sql(
+                schema, table, method, distance, coverage.row_estimate, storage=storage, dimensions=coverage.dimensions
+            )
+        )
+    if coverage.gin_index is None:
+        statements.append(build_gin_index_sql(schema, table, language))
+    return _run_ddl(engine, schema, table, statements)
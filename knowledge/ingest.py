@@ -0,0 +1,101 @@
+"""Batched ingestion of a file into a tenant's knowledge base."""
+
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from agno.document import Document
+from agno.knowledge.agent import AgentKnowledge
+
+from knowledge.blobstore import blob_store
+from knowledge.chunking import TokenAwareChunking, chunk_documents, get_chunking_strategy
+from knowledge.manifest import record_ingestion
+from knowledge.readers import iter_documents
+from knowledge.settings import knowledge_settings
+from utils.log import logger
+
+
+def iter_chunk_batches(
+    documents: Iterator[Document], strategy: TokenAwareChunking, batch_size: int
+) -> Iterator[List[Document]]:
+    """Chunk a stream of documents and group the chunks into batches of about `batch_size`."""
+    batch: List[Document] = []
+    for document in documents:
+        batch.extend(chunk_documents([document], strategy))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def with_document_id(documents: Iterator[Document], document_id: str) -> Iterator[Document]:
+    """Tag documents with the id of their source, which their chunks inherit (see TenantPgVector)."""
+    for document in documents:
+        document.meta_data["document_id"] = document_id
+        yield document
+
+
+def ingest_file(
+    knowledge: AgentKnowledge,
+    path: Path,
+    tenant_id: str,
+    batch_size: int = knowledge_settings.kg_ingest_batch,
+    strategy: Optional[TokenAwareChunking] = None,
+    document_id: Optional[str] = None,
+) -> int:
+    """Read, chunk, embed and write a file in batches. Returns the number of chunks written.
+
+    Only one batch of chunks and their embeddings is in memory at a time. The chunks are
+    tagged with `document_id`, the file name by default, and their ids and names are built from
+    it, so a staged upload is named after the uploaded file and re-ingesting it upserts its chunks.
+    """
+    path = Path(path)
+    if strategy is None:
+        strategy = get_chunking_strategy(path.suffix, tenant_id)
+    document_id = document_id or path.name
+    documents = with_document_id(iter_documents(path, name=Path(document_id).name), document_id)
+    total = 0
+    for batch in iter_chunk_batches(documents, strategy, batch_size):
+        knowledge.load_documents(batch, upsert=True, filters={"tenant_id": str(tenant_id)})
+        total += len(batch)
+        logger.debug(f"Ingested {total} chunks of {path.name}")
+    if total == 0:
+        logger.warning(f"No content extracted from: {path}")
+    return total
+
+
+def ingest_upload(knowledge: AgentKnowledge, path: Path, tenant_id: str, name: Optional[str] = None) -> int:
+    """Ingest a saved upload, then move it into the tenant's blob store (also when ingestion fails)."""
+    document_id = name or Path(path).name
+    try:
+        chunks = ingest_file(knowledge, path, tenant_id, document_id=document_id)
+    finally:
+        entry = blob_store.add(str(tenant_id), Path(path), name=name)
+    record_ingestion(tenant_id, document_id, "upload", chunks, sha256=entry.sha256, size_bytes=entry.size)
+    return chunks
+
+
+def ingest_url(
+    knowledge: AgentKnowledge,
+    url: str,
+    tenant_id: str,
+    batch_size: int = knowledge_settings.kg_ingest_batch,
+    max_links: int = 2,
+    max_depth: int = 1,
+) -> int:
+    """Crawl a website and ingest its pages. Returns the number of chunks written.
+
+    The chunks of every crawled page are tagged with `url` as their document id.
+    """
+    from agno.document.reader.website_reader import WebsiteReader
+
+    scraper = WebsiteReader(max_links=max_links, max_depth=max_depth, chunk=False)
+    strategy = get_chunking_strategy("html", tenant_id)
+    total = 0
+    for batch in iter_chunk_batches(with_document_id(iter(scraper.read(url)), url), strategy, batch_size):
+        knowledge.load_documents(batch, upsert=True, filters={"tenant_id": str(tenant_id)})
+        total += len(batch)
+    if total == 0:
+        logger.warning(f"No content extracted from: {url}")
+    record_ingestion(tenant_id, url, "url", total)
+    return total
@@ -0,0 +1,151 @@
+"""Background ingestion jobs.
+
+Jobs run on a small thread pool of the API process that accepted them, so embedding a large
+document never blocks the API's event loop. Their state is kept in `ai.ingestion_jobs`, so with
+several workers any of them answers a poll. A job whose worker stops before it finishes stays
+"queued" or "running".
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.sql.expression import delete, insert, select, update
+
+from db.tables import IngestionJob
+from knowledge.settings import knowledge_settings
+from utils.log import logger
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+@dataclass
+class Job:
+    job_id: str
+    tenant_id: str
+    kind: str
+    source: str
+    status: JobStatus = JobStatus.queued
+    chunks: int = 0
+    error: Optional[str] = None
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    # Timestamps are written in UTC, drivers without time zones return them naive
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _job(row: Row) -> Job:
+    return Job(
+        job_id=str(row.job_id),
+        tenant_id=str(row.tenant_id),
+        kind=row.kind,
+        source=row.source,
+        status=JobStatus(row.status),
+        chunks=row.chunks,
+        error=row.error,
+        created_at=_epoch(row.created_at),
+        started_at=_epoch(row.started_at),
+        finished_at=_epoch(row.finished_at),
+    )
+
+
+class JobRegistry:
+    def __init__(self, max_workers: int, max_jobs: int, engine: Optional[Engine] = None):
+        self.max_jobs = max_jobs
+        self._engine = engine
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from db.session import get_db_engine
+
+            self._engine = get_db_engine()
+        return self._engine
+
+    def submit(self, tenant_id: str, kind: str, source: str, fn: Callable[..., int], *args, **kwargs) -> Job:
+        """Queue `fn(*args, **kwargs)`, which returns the number of chunks ingested."""
+        jobs = IngestionJob.__table__
+        job_id, created_at = str(uuid.uuid4()), _now()
+        with self.engine.begin() as conn:
+            conn.execute(
+                insert(jobs).values(
+                    job_id=job_id,
+                    tenant_id=tenant_id,
+                    kind=kind,
+                    source=source,
+                    status=JobStatus.queued.value,
+                    chunks=0,
+                    created_at=created_at,
+                )
+            )
+            self._prune(conn)
+        self._executor.submit(self._run, job_id, source, fn, args, kwargs)
+        return Job(job_id=job_id, tenant_id=tenant_id, kind=kind, source=source, created_at=_epoch(created_at))
+
+    def _update(self, job_id: str, **values) -> None:
+        jobs = IngestionJob.__table__
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(update(jobs).where(jobs.c.job_id == job_id).values(**values))
+        except Exception as e:
+            logger.error(f"Could not record the state of ingestion job {job_id}: {e}")
+
+    def _run(self, job_id: str, source: str, fn: Callable[..., int], args, kwargs) -> None:
+        self._update(job_id, status=JobStatus.running.value, started_at=_now())
+        try:
+            chunks = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} ({source}) failed: {e}")
+            self._update(job_id, status=JobStatus.failed.value, error=str(e), finished_at=_now())
+        else:
+            self._update(job_id, status=JobStatus.succeeded.value, chunks=chunks, finished_at=_now())
+
+    def _prune(self, conn) -> None:
+        # Drop the oldest finished jobs once the table is full
+        jobs = IngestionJob.__table__
+        newest = select(jobs.c.job_id).order_by(jobs.c.created_at.desc()).limit(self.max_jobs)
+        conn.execute(delete(jobs).where(jobs.c.finished_at.is_not(None)).where(jobs.c.job_id.not_in(newest)))
+
+    def get(self, tenant_id: str, job_id: str) -> Optional[Job]:
+        try:
+            uuid.UUID(job_id)
+        except ValueError:
+            return None
+        jobs = IngestionJob.__table__
+        with self.engine.connect() as conn:
+            row = conn.execute(select(jobs).where(jobs.c.job_id == job_id).where(jobs.c.tenant_id == tenant_id)).first()
+        return _job(row) if row is not None else None
+
+    def list(self, tenant_id: str) -> List[Job]:
+        jobs = IngestionJob.__table__
+        stmt = select(jobs).where(jobs.c.tenant_id == tenant_id).order_by(jobs.c.created_at.desc())
+        with self.engine.connect() as conn:
+            return [_job(row) for row in conn.execute(stmt.limit(self.max_jobs))]
+
+
+ingestion_jobs = JobRegistry(
+    max_workers=knowledge_settings.kg_ingest_workers, max_jobs=knowledge_settings.kg_ingest_max_jobs
+)
@@ -0,0 +1,44 @@
+"""Record of the documents ingested into each tenant's knowledge base (`ai.ingestion_manifest`)."""
+
+from typing import Optional
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.expression import delete, func
+
+from db.session import get_session_local
+from db.tables import IngestionManifest
+from utils.log import logger
+
+
+def record_ingestion(
+    tenant_id: str,
+    document_id: str,
+    source: str,
+    chunks: int,
+    sha256: Optional[str] = None,
+    size_bytes: Optional[int] = None,
+) -> None:
+    """Insert or update a document's manifest row. Failures are logged, the chunks are already written."""
+    values = dict(source=source, chunks=chunks, sha256=sha256, size_bytes=size_bytes)
+    stmt = postgresql.insert(IngestionManifest).values(tenant_id=str(tenant_id), document_id=document_id, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["tenant_id", "document_id"], set_=dict(**values, ingested_at=func.now())
+    )
+    try:
+        with get_session_local().begin() as sess:
+            sess.execute(stmt)
+    except SQLAlchemyError as e:
+        logger.warning(f"Could not record {document_id} in the ingestion manifest: {e}")
+
+
+def forget_ingestion(tenant_id: str, document_id: Optional[str] = None) -> None:
+    """Drop a document's manifest row, or every row of the tenant without `document_id`."""
+    stmt = delete(IngestionManifest).where(IngestionManifest.tenant_id == str(tenant_id))
+    if document_id is not None:
+        stmt = stmt.where(IngestionManifest.document_id == document_id)
+    try:
+        with get_session_local().begin() as sess:
+            sess.execute(stmt)
+    except SQLAlchemyError as e:
+        logger.warning(f"Could not update the ingestion manifest of tenant {tenant_id}: {e}")
@@ -0,0 +1,137 @@
+"""Streaming readers that yield a file's content piece by piece.
+
+Unlike agno's readers, which return every document of a file at once, these are generators:
+a PDF is read page by page, a CSV in batches of rows, text and DOCX files in blocks of
+paragraphs. Only the current piece is held in memory, so ingestion memory is bounded by
+the piece size and not by the file size.
+"""
+
+import csv
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from agno.document import Document
+
+from knowledge.settings import knowledge_settings
+
+SUPPORTED_FILE_TYPES = ("pdf", "csv", "txt", "md", "docx")
+
+
+def _names(path: Path, name: Optional[str]) -> Tuple[str, str]:
+    """The file name documents are identified by and the stem they are named after.
+
+    Both come from the file's own name, not the name it was staged under. Ids keep the extension,
+    so `report.pdf` and `report.docx` do not write over each other's chunks.
+    """
+    file_name = Path(name or path.name).name
+    return file_name, Path(file_name).stem
+
+
+def iter_pdf(path: Path, name: Optional[str] = None) -> Iterator[Document]:
+    """One document per page. pypdf parses a page's content only when it is extracted."""
+    from pypdf import PdfReader
+
+    file_name, stem = _names(path, name)
+    reader = PdfReader(str(path))
+    for page_number, page in enumerate(reader.pages, start=1):
+        content = page.extract_text() or ""
+        if content.strip():
+            yield Document(
+                id=f"{file_name}_{page_number}",
+                name=stem,
+                meta_data={"page": page_number},
+                content=content,
+            )
+
+
+def iter_csv(
+    path: Path, rows_per_document: int = knowledge_settings.kg_reader_csv_rows, name: Optional[str] = None
+) -> Iterator[Document]:
+    """Documents of `rows_per_document` rows, each starting with the header row."""
+    file_name, stem = _names(path, name)
+    with path.open(newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        rows: List[str] = []
+        part = 0
+        for row in reader:
+            rows.append(", ".join(row))
+            if len(rows) >= rows_per_document:
+                part += 1
+                yield _csv_document(file_name, stem, header, rows, part)
+                rows = []
+        if rows or part == 0:
+            yield _csv_document(file_name, stem, header, rows, part + 1)
+
+
+def _csv_document(file_name: str, stem: str, header: List[str], rows: List[str], part: int) -> Document:
+    return Document(
+        id=f"{file_name}_{part}",
+        name=stem,
+        meta_data={"part": part},
+        content="\n".join([", ".join(header), *rows]),
+    )
+
+
+def iter_text(
+    path: Path, block_chars: int = knowledge_settings.kg_reader_block_chars, name: Optional[str] = None
+) -> Iterator[Document]:
+    """Blocks of about `block_chars` characters, split at blank lines where possible."""
+    with path.open(encoding="utf-8", errors="replace") as f:
+        yield from _blocks(*_names(path, name), f, block_chars)
+
+
+def iter_docx(
+    path: Path, block_chars: int = knowledge_settings.kg_reader_block_chars, name: Optional[str] = None
+) -> Iterator[Document]:
+    """Blocks of paragraphs. Heading styles become markdown headings so structure-aware chunking can use them."""
+    from docx import Document as DocxDocument
+
+    def lines() -> Iterator[str]:
+        for paragraph in DocxDocument(str(path)).paragraphs:
+            text = paragraph.text.strip()
+            if not text:
+                continue
+            style = paragraph.style.name if paragraph.style is not None else ""
+            if style.startswith("Heading") and style[-1:].isdigit():
+                text = "#" * int(style[-1]) + " " + text
+            yield text + "\n"
+            yield "\n"
+
+    yield from _blocks(*_names(path, name), lines(), block_chars)
+
+
+def _blocks(file_name: str, stem: str, lines: Iterator[str], block_chars: int) -> Iterator[Document]:
+    block: List[str] = []
+    size = 0
+    part = 0
+    for line in lines:
+        # Break at a paragraph boundary once the block is full, or anywhere once it is twice the size
+        if size >= block_chars and (not line.strip() or size >= 2 * block_chars):
+            part += 1
+            yield Document(id=f"{file_name}_{part}", name=stem, meta_data={"part": part}, content="".join(block))
+            block, size = [], 0
+        block.append(line)
+        size += len(line)
+    if "".join(block).strip():
+        part += 1
+        yield Document(id=f"{file_name}_{part}", name=stem, meta_data={"part": part}, content="".join(block))
+
+
+def iter_documents(path: Path, name: Optional[str] = None) -> Iterator[Document]:
+    """Stream the documents of a file, picking the reader by file extension.
+
+    Documents are named after `name`, the file's own name, which defaults to `path`'s.
+    """
+    file_type = path.suffix.lower().lstrip(".")
+    if file_type == "pdf":
+        return iter_pdf(path, name=name)
+    if file_type == "csv":
+        return iter_csv(path, name=name)
+    if file_type in ("txt", "md"):
+        return iter_text(path, name=name)
+    if file_type == "docx":
+        return iter_docx(path, name=name)
+    raise ValueError(f"Unsupported file type: {file_type}")
@@ -0,0 +1,88 @@
+from typing import Dict, Literal
+
+from pydantic_settings import BaseSettings
+
+
+class KnowledgeSettings(BaseSettings):
+    """Knowledge base settings that can be set using environment variables.
+
+    Reference: https://docs.pydantic.dev/latest/usage/pydantic_settings/
+    """
+
+    # Language used for the full-text side of hybrid search
+    kg_content_language: str = "english"
+
+    # Create the ANN and full-text indexes once a knowledge table holds this many rows.
+    # Below this size a sequential scan is as fast as an index scan.
+    kg_index_min_rows: int = 1000
+    # ANN index type: "hnsw" or "ivfflat"
+    kg_vector_index: Literal["hnsw", "ivfflat"] = "hnsw"
+    # HNSW build and query parameters
+    kg_hnsw_m: int = 16
+    kg_hnsw_ef_construction: int = 64
+    kg_hnsw_ef_search: int = 40
+    # IVFFlat query parameter, the number of lists is derived from the row count
+    kg_ivfflat_probes: int = 10
+    # Per-tenant overrides of the query parameters, as JSON: {"<tenant_id>": {"ef_search": 100, "probes": 20}}
+    kg_tenant_search: Dict[str, Dict[str, int]] = {}
+    # Vectors in the ANN index: "full" (float32), "halfvec" (float16, half the index size) or "binary"
+    # (sign bits, 1/32 of it). Quantized indexes return `kg_rescore_multiplier` times the wanted rows,
+    # which are re-ranked with the float32 embeddings kept in the table. Applies to the per-schema layout,
+    # existing tables are converted with `python -m admin kg-quantize`.
+    kg_vector_storage: Literal["full", "halfvec", "binary"] = "full"
+    kg_rescore_multiplier: int = 4
+    # maintenance_work_mem used while building indexes
+    kg_index_maintenance_work_mem: str = "512MB"
+
+    # Loads of at least this many documents are written with COPY into a staging table
+    # and merged in one statement, smaller loads use row-level upserts
+    kg_copy_min_rows: int = 500
+
+    # Chunking, see knowledge.chunking. Sizes are in tokens of `kg_tokenizer_encoding`.
+    kg_tokenizer_encoding: str = "cl100k_base"
+    kg_chunk_tokens: int = 512
+    kg_chunk_overlap: int = 64
+    kg_chunk_rows: int = 50
+    # Strategy per file type: "token", "structure" or "rows". "default" applies to other types.
+    kg_chunking: Dict[str, str] = {
+        "pdf": "structure",
+        "docx": "structure",
+        "txt": "structure",
+        "md": "structure",
+        "csv": "rows",
+        "html": "token",
+        "default": "token",
+    }
+    # Per-tenant overrides of kg_chunking, as JSON: {"<tenant_id>": {"csv": "token"}}
+    kg_tenant_chunking: Dict[str, Dict[str, str]] = {}
+
+    # Streaming ingestion, see knowledge.readers and knowledge.ingest
+    # CSV rows and text characters per document yielded by the readers
+    kg_reader_csv_rows: int = 1000
+    kg_reader_block_chars: int = 20_000
+    # Chunks embedded and written per batch
+    kg_ingest_batch: int = 500
+    # Background ingestion threads per API process and finished jobs kept for polling
+    kg_ingest_workers: int = 2
+    kg_ingest_max_jobs: int = 1000
+    # Bytes read per write when saving an upload, and the largest upload accepted
+    kg_upload_chunk_bytes: int = 1024 * 1024
+    kg_upload_max_bytes: int = 200 * 1024 * 1024
+    # Raw documents are kept in a content-addressed store, see knowledge.blobstore.
+    # Compression is "gzip", "zstd" (needs `zstandard`, gzip without it) or "none".
+    kg_blob_compression: Literal["zstd", "gzip", "none"] = "gzip"
+    kg_blob_zstd_level: int = 10
+    # gc() keeps unreferenced blobs younger than this, they may belong to an upload in progress
+    kg_blob_gc_grace_seconds: int = 3600
+    # rag_data watcher, see knowledge.watcher. Bursts of changes are batched until no change
+    # happened for kg_watch_debounce_ms; the polling fallback rescans every kg_watch_poll_interval seconds.
+    kg_watch_debounce_ms: int = 2000
+    kg_watch_poll_interval: float = 30.0
+    kg_watch_force_polling: bool = False
+
+    # Hybrid search ranks (limit * multiplier) candidates from each index before re-scoring
+    kg_hybrid_candidate_multiplier: int = 4
+
+
+# Create KnowledgeSettings object
+knowledge_settings = KnowledgeSettings()
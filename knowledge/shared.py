@@ -0,0 +1,125 @@
+from typing import Any, Dict, List, Optional
+
+from agno.document import Document
+from agno.utils.log import log_info, logger
+from agno.vectordb.pgvector.index import HNSW
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import Column, Table
+from sqlalchemy.sql.expression import func, text
+from sqlalchemy.types import DateTime, String
+
+from db.partitioned import (
+    SHARED_KNOWLEDGE_TABLE,
+    create_shared_knowledge_table,
+    drop_tenant_partition,
+    ensure_tenant_partition,
+    is_missing_partition,
+)
+from knowledge.vector_db import TenantPgVector, get_vector_index
+
+try:
+    from pgvector.sqlalchemy import Vector
+except ImportError:
+    raise ImportError("`pgvector` not installed. Please install using `pip install pgvector`")
+
+
+class SharedPgVector(TenantPgVector):
+    """Tenant view of the shared, tenant-partitioned knowledge table.
+
+    Every statement is scoped to `tenant_id`, which is also the partition key, so Postgres
+    prunes the other tenants' partitions. The indexes are created on the partitioned parent
+    together with the table, so there is no per-table index build.
+    """
+
+    def __init__(self, tenant_id: str, *args, **kwargs):
+        if not tenant_id:
+            raise ValueError("tenant_id is required for the shared knowledge table.")
+        # get_table() is called by PgVector.__init__ and needs the tenant_id column
+        self.tenant_id: str = str(tenant_id)
+        kwargs.setdefault("table_name", SHARED_KNOWLEDGE_TABLE)
+        # The ANN index of the partitioned parent is created with the table over the float32 vectors
+        kwargs["vector_storage"] = "full"
+        # That index is always HNSW, see shared_knowledge_ddl
+        if not isinstance(kwargs.get("vector_index"), HNSW):
+            kwargs["vector_index"] = get_vector_index(self.tenant_id, method="hnsw")
+        super().__init__(*args, **kwargs)
+        self._indexes_ready = True
+
+    def get_table_v1(self) -> Table:
+        return Table(
+            self.table_name,
+            self.metadata,
+            Column("tenant_id", postgresql.UUID(as_uuid=False), primary_key=True),
+            Column("id", String, primary_key=True),
+            Column("name", String),
+            Column("meta_data", postgresql.JSONB, server_default=text("'{}'::jsonb")),
+            Column("filters", postgresql.JSONB, server_default=text("'{}'::jsonb"), nullable=True),
+            Column("content", postgresql.TEXT),
+            Column("embedding", Vector(self.dimensions)),
+            Column("usage", postgresql.JSONB),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+            Column("updated_at", DateTime(timezone=True), onupdate=func.now()),
+            Column("content_hash", String),
+            Column("document_id", String),
+            extend_existing=True,
+        )
+
+    def create(self) -> None:
+        create_shared_knowledge_table(self.db_engine, self.schema, self.dimensions)
+        ensure_tenant_partition(self.db_engine, self.schema, self.table_name, self.tenant_id)
+
+    def _write(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]], batch_size: int, upsert: bool
+    ) -> None:
+        try:
+            super()._write(documents, filters, batch_size, upsert)
+        except Exception as e:
+            if not is_missing_partition(e):
+                raise
+            # The partition was dropped by another process since this one created it
+            ensure_tenant_partition(self.db_engine, self.schema, self.table_name, self.tenant_id, recheck=True)
+            super()._write(documents, filters, batch_size, upsert)
+
+    def ensure_indexes(self, background: bool = True) -> None:
+        # Indexes live on the partitioned parent and cascade to new partitions
+        return
+
+    def optimize(self, force_recreate: bool = False) -> None:
+        return
+
+    def _scope(self, stmt):
+        return stmt.where(self.table.c.tenant_id == self.tenant_id)
+
+    def _conflict_columns(self) -> List[str]:
+        return ["tenant_id", "id"]
+
+    def _build_records(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        records = super()._build_records(documents, filters)
+        for record in records:
+            record["tenant_id"] = self.tenant_id
+        return records
+
+    def delete(self) -> bool:
+        """Delete the tenant's rows, other tenants are untouched.
+
+        With list partitioning the tenant's partition is dropped; with hash partitioning the
+        rows are deleted through the partition key.
+        """
+        try:
+            dropped = drop_tenant_partition(self.db_engine, self.schema, self.table_name, self.tenant_id)
+            # Every row with hash partitioning, or rows in the default partition of tables created with one
+            with self.Session() as sess, sess.begin():
+                sess.execute(delete(self.table).where(self.table.c.tenant_id == self.tenant_id))
+            action = "Dropped the partition" if dropped else "Deleted all records"
+            log_info(f"{action} of tenant '{self.tenant_id}' in '{self.table.fullname}'.")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting rows from table '{self.table.fullname}': {e}")
+            return False
+
+    def drop(self) -> None:
+        # The table is shared, dropping it would remove every tenant's knowledge
+        self.delete()
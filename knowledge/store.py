@@ -0,0 +1,69 @@
+from typing import Optional
+
+from agno.knowledge.agent import AgentKnowledge
+from agno.vectordb.pgvector import SearchType
+
+from db.session import db_url, get_db_engine
+from db.settings import db_settings
+from db.tenancy import table_prefix, tenant_schema
+from knowledge.blobstore import blob_store
+from knowledge.manifest import forget_ingestion
+from knowledge.vector_db import TenantPgVector, get_vector_index
+from utils.log import logger
+
+
+def get_vector_db(tenant_id: str, schema: Optional[str] = None, agent_id: str = "sage") -> TenantPgVector:
+    """Knowledge table for a tenant in the configured tenant storage layout.
+
+    - "schema": a `<tenant prefix>_<agent>_kg` table in the user's schema
+    - "shared": the tenant's rows of the shared `knowledge` table
+
+    Searches run on the process-wide engine, whose pooled connections keep their prepared
+    statements, with the tenant's ANN query parameters (`kg_tenant_search`).
+    """
+    if db_settings.tenant_storage_layout == "shared":
+        from knowledge.shared import SharedPgVector
+
+        return SharedPgVector(
+            tenant_id=tenant_id,
+            schema=db_settings.shared_schema,
+            db_url=db_url,
+            db_engine=get_db_engine(),
+            search_type=SearchType.hybrid,
+            vector_index=get_vector_index(tenant_id),
+        )
+    return TenantPgVector(
+        table_name=f"{table_prefix(tenant_id)}_{agent_id}_kg",
+        schema=schema,
+        db_url=db_url,
+        db_engine=get_db_engine(),
+        search_type=SearchType.hybrid,
+        vector_index=get_vector_index(tenant_id),
+    )
+
+
+def get_tenant_knowledge(tenant_id: str, username: str) -> AgentKnowledge:
+    """Sage's knowledge base for a tenant, for use outside an agent run (e.g. ingestion)."""
+    return AgentKnowledge(vector_db=get_vector_db(tenant_id, schema=tenant_schema(username)))
+
+
+def delete_document(knowledge: AgentKnowledge, tenant_id: str, document_id: str) -> int:
+    """Delete a document's chunks and drop it from the tenant's raw document and ingestion manifests.
+
+    Returns the number of chunks deleted. The raw blob is removed by the next blob gc if no other tenant has it.
+    """
+    deleted = knowledge.vector_db.delete_document(document_id)
+    blob_store.remove(str(tenant_id), document_id)
+    forget_ingestion(tenant_id, document_id)
+    return deleted
+
+
+def delete_tenant_knowledge(knowledge: AgentKnowledge, tenant_id: str) -> bool:
+    """Wipe a tenant's knowledge base: TRUNCATE in the per-schema layout, partition drop or
+    tenant-scoped delete in the shared layout (see SharedPgVector.delete)."""
+    if not knowledge.vector_db.delete():
+        return False
+    dropped = blob_store.clear(str(tenant_id))
+    forget_ingestion(tenant_id)
+    logger.info(f"Deleted the knowledge base of tenant {tenant_id} ({dropped} raw documents released)")
+    return True
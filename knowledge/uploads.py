@@ -0,0 +1,70 @@
+"""Save uploaded files to the tenant's rag_data directory without buffering them in memory."""
+
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from knowledge.settings import knowledge_settings
+
+RAG_DATA_DIR = Path("rag_data")
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def tenant_upload_dir(tenant_id: str) -> Path:
+    """Staging directory of a tenant's uploads until they are moved to the blob store.
+
+    Hidden, so the rag_data watcher does not ingest the uploads a second time. Uploads are staged
+    under a unique name (see `staging_name`), concurrent uploads of the same file never replace each other.
+    """
+    path = RAG_DATA_DIR / str(tenant_id) / ".uploads"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def safe_filename(filename: str) -> str:
+    """Strip any directory part so an upload cannot be written outside the tenant directory."""
+    name = os.path.basename(filename.replace("\\", "/")).strip()
+    if not name or name in (".", ".."):
+        raise ValueError(f"Invalid file name: {filename!r}")
+    return name
+
+
+def staging_name(filename: str) -> str:
+    """`<random id>-<file name>`, the name an upload is staged under. Ingest it with `name=safe_filename(filename)`."""
+    return f"{uuid.uuid4().hex}-{safe_filename(filename)}"
+
+
+def save_upload(
+    source: BinaryIO,
+    directory: Path,
+    filename: str,
+    chunk_bytes: int = knowledge_settings.kg_upload_chunk_bytes,
+    max_bytes: Optional[int] = knowledge_settings.kg_upload_max_bytes,
+) -> Path:
+    """Copy `source` to `directory/filename` in chunks of `chunk_bytes`.
+
+    The file is written to a temporary name and renamed once complete, so readers never see a
+    partial upload. Raises UploadTooLarge once more than `max_bytes` have been read.
+    """
+    target = directory / safe_filename(filename)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=target.suffix)
+    try:
+        written = 0
+        with os.fdopen(fd, "wb") as out:
+            while chunk := source.read(chunk_bytes):
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+                out.write(chunk)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return target
@@ -0,0 +1,569 @@
+import threading
+from hashlib import md5
+from typing import Any, Dict, List, Optional, Set, Union
+
+from agno.document import Document
+from agno.utils.log import log_debug, log_info, logger
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import PgVector
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import Column, Index, Table
+from sqlalchemy.sql.expression import and_, bindparam, cast, desc, func, literal_column, or_, select, text, union
+from sqlalchemy.types import String
+
+from knowledge.bulk import copy_merge
+from knowledge.indexes import (
+    build_document_id_sql,
+    document_index_name,
+    drop_trained_indexes,
+    ensure_indexes,
+    get_index_coverage,
+    qualified_name,
+    rebuild_indexes,
+)
+from knowledge.settings import knowledge_settings
+
+try:
+    from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+except ImportError:
+    raise ImportError("`pgvector` not installed. Please install using `pip install pgvector`")
+
+# Tables with an index build in flight, shared by every TenantPgVector in the process
+_index_builds: Set[str] = set()
+_index_builds_lock = threading.Lock()
+# Tables known to have the document_id column
+_document_id_tables: Set[str] = set()
+# SET LOCAL of an ANN query parameter
+SET_ANN_PARAMETER = text("SELECT set_config(:name, :value, true)")
+
+
+def get_vector_index(tenant_id: Optional[str] = None, method: Optional[str] = None) -> Union[HNSW, Ivfflat]:
+    """Build the vector index configuration from the knowledge settings and the tenant's overrides.
+
+    `method` overrides the configured index type.
+    """
+    overrides = knowledge_settings.kg_tenant_search.get(str(tenant_id), {}) if tenant_id else {}
+    if (method or knowledge_settings.kg_vector_index) == "ivfflat":
+        return Ivfflat(probes=overrides.get("probes", knowledge_settings.kg_ivfflat_probes))
+    return HNSW(
+        m=knowledge_settings.kg_hnsw_m,
+        ef_construction=knowledge_settings.kg_hnsw_ef_construction,
+        ef_search=overrides.get("ef_search", knowledge_settings.kg_hnsw_ef_search),
+    )
+
+
+def _limit(rows: int):
+    """LIMIT rendered in the SQL: the generic plan of a prepared statement assumes a LIMIT parameter keeps
+    10% of the table and may then sort the whole table instead of walking the ANN index."""
+    return literal_column(str(int(rows)))
+
+
+class TenantPgVector(PgVector):
+    """PgVector for a tenant knowledge table that manages its own indexes.
+
+    - After every write the table is checked against `kg_index_min_rows` and any missing
+      ANN / full-text index is built concurrently in a background thread.
+    - Large loads are staged with binary COPY and merged in one statement (see knowledge.bulk).
+    - Hybrid search draws candidates from the ANN index and the full-text index and only
+      re-scores those, instead of scoring every row in the table.
+    - Chunks carry the `document_id` of their source (file name or URL) in an indexed column,
+      so a single document is deleted with an index scan and a whole table with TRUNCATE.
+    - Searches keep the same SQL text from one call to the next (query values are bound, the ANN
+      parameters are set with a bound `set_config`), so pooled connections prepare them once and
+      reuse the plan, see `db_prepare_threshold`.
+    - With a quantized `vector_storage` ("halfvec" or "binary") the ANN index covers a quantized
+      copy of the embeddings; its candidates are re-ranked with the float32 embeddings.
+    """
+
+    def __init__(
+        self,
+        *args,
+        index_min_rows: Optional[int] = None,
+        copy_min_rows: Optional[int] = None,
+        vector_storage: Optional[str] = None,
+        **kwargs,
+    ):
+        kwargs.setdefault("vector_index", get_vector_index())
+        kwargs.setdefault("content_language", knowledge_settings.kg_content_language)
+        super().__init__(*args, **kwargs)
+        self.index_min_rows: int = (
+            index_min_rows if index_min_rows is not None else knowledge_settings.kg_index_min_rows
+        )
+        self.copy_min_rows: int = copy_min_rows if copy_min_rows is not None else knowledge_settings.kg_copy_min_rows
+        self.vector_storage: str = vector_storage or knowledge_settings.kg_vector_storage
+        # Set once both indexes exist so later writes skip the catalog lookups
+        self._indexes_ready: bool = False
+
+    def get_table_v1(self) -> Table:
+        table = super().get_table_v1()
+        if "document_id" not in table.c:
+            table.append_column(Column("document_id", String))
+            Index(document_index_name(self.table_name), table.c.document_id)
+        return table
+
+    def create(self) -> None:
+        super().create()
+        key = self.table.fullname
+        with _index_builds_lock:
+            if key in _document_id_tables:
+                return
+        # Tables created before the column existed
+        with self.db_engine.begin() as conn:
+            for statement in build_document_id_sql(self.schema, self.table_name):
+                conn.execute(text(statement))
+        with _index_builds_lock:
+            _document_id_tables.add(key)
+
+    @property
+    def index_method(self) -> str:
+        return "ivfflat" if isinstance(self.vector_index, Ivfflat) else "hnsw"
+
+    def ensure_indexes(self, background: bool = True) -> None:
+        """Create the ANN and full-text indexes if the table has grown past the threshold."""
+        if self._indexes_ready:
+            return
+        key = self.table.fullname
+        with _index_builds_lock:
+            if key in _index_builds:
+                return
+            _index_builds.add(key)
+
+        def _build() -> None:
+            try:
+                ensure_indexes(
+                    self.db_engine,
+                    self.schema,
+                    self.table_name,
+                    method=self.index_method,
+                    distance=self.distance.value,
+                    language=self.content_language,
+                    min_rows=self.index_min_rows,
+                    storage=self.vector_storage,
+                )
+                coverage = get_index_coverage(self.db_engine, self.schema, self.table_name)
+                self._indexes_ready = coverage is not None and coverage.covered_for(self.vector_storage)
+            except Exception as e:
+                logger.error(f"Error building indexes for '{key}': {e}")
+            finally:
+                with _index_builds_lock:
+                    _index_builds.discard(key)
+
+        if background:
+            threading.Thread(target=_build, name=f"index-build-{self.table_name}", daemon=True).start()
+        else:
+            _build()
+
+    def optimize(self, force_recreate: bool = False) -> None:
+        if force_recreate:
+            rebuild_indexes(
+                self.db_engine,
+                self.schema,
+                self.table_name,
+                method=self.index_method,
+                distance=self.distance.value,
+                language=self.content_language,
+                storage=self.vector_storage,
+            )
+        else:
+            self.ensure_indexes(background=False)
+
+    def _scope(self, stmt):
+        """Restrict a statement to the rows this instance may see. Per-tenant tables see every row."""
+        return stmt
+
+    def _conflict_columns(self) -> List[str]:
+        return ["id"]
+
+    def _record_exists(self, column, value) -> bool:
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = self._scope(select(1).select_from(self.table).where(column == value)).limit(1)
+                return sess.execute(stmt).first() is not None
+        except Exception as e:
+            logger.error(f"Error checking if record exists: {e}")
+            return False
+
+    def get_count(self) -> int:
+        try:
+            with self.Session() as sess, sess.begin():
+                stmt = self._scope(select(func.count()).select_from(self.table))
+                result = sess.execute(stmt).scalar()
+                return int(result) if result is not None else 0
+        except Exception as e:
+            logger.error(f"Error getting count from table '{self.table.fullname}': {e}")
+            return 0
+
+    def _document_filter(self, document_id: str):
+        # Chunks written before the document_id column existed are matched by name
+        return or_(
+            self.table.c.document_id == document_id,
+            and_(self.table.c.document_id.is_(None), self.table.c.name == document_id),
+        )
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """Source documents in the table with their number of chunks."""
+        if not self.table_exists():
+            return []
+        document_id = func.coalesce(self.table.c.document_id, self.table.c.name)
+        stmt = self._scope(
+            select(
+                document_id.label("document_id"),
+                func.min(self.table.c.name).label("name"),
+                func.count().label("chunks"),
+                func.min(self.table.c.created_at).label("created_at"),
+            )
+        )
+        stmt = stmt.group_by(document_id).order_by(document_id)
+        with self.Session() as sess, sess.begin():
+            return [dict(row._mapping) for row in sess.execute(stmt)]
+
+    def delete_document(self, document_id: str) -> int:
+        """Delete every chunk of a source document. Returns the number of rows deleted."""
+        if not self.table_exists():
+            return 0
+        stmt = self._scope(self.table.delete()).where(self._document_filter(document_id))
+        with self.Session() as sess, sess.begin():
+            deleted = sess.execute(stmt).rowcount
+        log_info(f"Deleted {deleted} chunks of '{document_id}' from '{self.table.fullname}'.")
+        return deleted
+
+    def delete(self) -> bool:
+        """Empty the table with TRUNCATE, which frees its space at once instead of leaving dead rows behind."""
+        if not self.table_exists():
+            return True
+        try:
+            with self.db_engine.begin() as conn:
+                conn.execute(text(f"TRUNCATE TABLE {qualified_name(self.schema, self.table_name)}"))
+            log_info(f"Truncated table '{self.table.fullname}'.")
+        except Exception as e:
+            logger.error(f"Error truncating table '{self.table.fullname}': {e}")
+            return False
+        self._indexes_ready = False
+        try:
+            drop_trained_indexes(self.db_engine, self.schema, self.table_name)
+        except Exception as e:
+            logger.error(f"Error dropping IVFFlat index of '{self.table.fullname}': {e}")
+        return True
+
+    def _build_records(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Embed the documents and turn them into table rows."""
+        records = []
+        for doc in documents:
+            try:
+                doc.embed(embedder=self.embedder)
+                cleaned_content = self._clean_content(doc.content)
+                content_hash = md5(cleaned_content.encode()).hexdigest()
+                records.append(
+                    {
+                        "id": doc.id or content_hash,
+                        "name": doc.name,
+                        "meta_data": doc.meta_data,
+                        "filters": filters,
+                        "content": cleaned_content,
+                        "embedding": doc.embedding,
+                        "usage": doc.usage,
+                        "content_hash": content_hash,
+                        "document_id": (doc.meta_data or {}).get("document_id"),
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error processing document '{doc.name}': {e}")
+        return records
+
+    def _write(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]], batch_size: int, upsert: bool
+    ) -> None:
+        if len(documents) >= self.copy_min_rows:
+            self._copy_write(documents, filters, batch_size, upsert)
+        else:
+            self._row_write(documents, filters, batch_size, upsert)
+        self.ensure_indexes()
+
+    def _copy_write(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]], batch_size: int, upsert: bool
+    ) -> None:
+        batches = (
+            self._build_records(documents[i : i + batch_size], filters) for i in range(0, len(documents), batch_size)
+        )
+        written = copy_merge(self.db_engine, self.table, batches, self._conflict_columns(), upsert=upsert)
+        log_info(f"{'Upserted' if upsert else 'Inserted'} {written} documents with COPY.")
+
+    def _row_write(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]], batch_size: int, upsert: bool
+    ) -> None:
+        with self.Session() as sess:
+            for i in range(0, len(documents), batch_size):
+                records = self._build_records(documents[i : i + batch_size], filters)
+                if not records:
+                    continue
+                try:
+                    stmt = postgresql.insert(self.table).values(records)
+                    if upsert:
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=self._conflict_columns(),
+                            set_={
+                                column: stmt.excluded[column]
+                                for column in records[0]
+                                if column not in self._conflict_columns()
+                            },
+                        )
+                    sess.execute(stmt)
+                    sess.commit()
+                    log_info(f"{'Upserted' if upsert else 'Inserted'} batch of {len(records)} documents.")
+                except Exception as e:
+                    logger.error(f"Error with batch starting at index {i}: {e}")
+                    sess.rollback()
+                    raise
+
+    def insert(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]] = None, batch_size: int = 100
+    ) -> None:
+        self._write(documents, filters, batch_size, upsert=False)
+
+    def upsert(
+        self, documents: List[Document], filters: Optional[Dict[str, Any]] = None, batch_size: int = 100
+    ) -> None:
+        self._write(documents, filters, batch_size, upsert=True)
+
+    def _set_ann_parameters(self, sess: Session, candidates: int) -> None:
+        """Set the per-query ANN search parameters for the current transaction.
+
+        HNSW returns at most ef_search rows, so it is raised to the candidate count when needed.
+        The value is bound rather than written into a SET, so one prepared statement serves every value.
+        """
+        if isinstance(self.vector_index, Ivfflat):
+            sess.execute(SET_ANN_PARAMETER, {"name": "ivfflat.probes", "value": str(int(self.vector_index.probes))})
+        elif isinstance(self.vector_index, HNSW):
+            ef_search = max(int(self.vector_index.ef_search), candidates)
+            sess.execute(SET_ANN_PARAMETER, {"name": "hnsw.ef_search", "value": str(ef_search)})
+
+    def _ts_vector(self):
+        # Must match the expression of the GIN index built by knowledge.indexes
+        language = self.content_language.replace("'", "''")
+        return func.to_tsvector(literal_column(f"'{language}'::regconfig"), self.table.c.content)
+
+    def _ts_query(self, query: str):
+        language = self.content_language.replace("'", "''")
+        processed_query = self.enable_prefix_matching(query) if self.prefix_match else query
+        return func.websearch_to_tsquery(
+            literal_column(f"'{language}'::regconfig"), bindparam("query", value=processed_query)
+        )
+
+    def _distance(self, query_embedding: List[float]):
+        """Return the (distance, similarity score) expressions for the configured metric."""
+        if self.distance == Distance.l2:
+            vector_distance = self.table.c.embedding.l2_distance(query_embedding)
+            return vector_distance, 1 / (1 + vector_distance)
+        if self.distance == Distance.max_inner_product:
+            # <#> is the negative inner product, normalise it to [0, 1]
+            vector_distance = self.table.c.embedding.max_inner_product(query_embedding)
+            return vector_distance, (vector_distance * -1 + 1) / 2
+        vector_distance = self.table.c.embedding.cosine_distance(query_embedding)
+        return vector_distance, 1 / (1 + vector_distance)
+
+    def _ann_distance(self, query_embedding: List[float]):
+        """Distance the ANN index orders by: the full-precision one, or the one between quantized vectors.
+
+        Must match the expression of the index built by knowledge.indexes for `vector_storage`.
+        """
+        if self.vector_storage == "halfvec":
+            embedding = cast(self.table.c.embedding, HALFVEC(self.dimensions))
+            query = cast(query_embedding, HALFVEC(self.dimensions))
+            if self.distance == Distance.l2:
+                return embedding.l2_distance(query)
+            if self.distance == Distance.max_inner_product:
+                return embedding.max_inner_product(query)
+            return embedding.cosine_distance(query)
+        if self.vector_storage == "binary":
+            embedding = cast(func.binary_quantize(self.table.c.embedding), BIT(self.dimensions))
+            return embedding.hamming_distance(func.binary_quantize(cast(query_embedding, Vector(self.dimensions))))
+        return self._distance(query_embedding)[0]
+
+    def _ann_candidates(self, limit: int) -> int:
+        """Rows taken from the ANN index, more than wanted when they are re-ranked at full precision."""
+        if self.vector_storage == "full":
+            return limit
+        return max(limit * knowledge_settings.kg_rescore_multiplier, limit)
+
+    def _result_columns(self):
+        return [
+            self.table.c.id,
+            self.table.c.name,
+            self.table.c.meta_data,
+            self.table.c.content,
+            self.table.c.embedding,
+            self.table.c.usage,
+        ]
+
+    def _to_documents(self, results) -> List[Document]:
+        return [
+            Document(
+                id=result.id,
+                name=result.name,
+                meta_data=result.meta_data,
+                content=result.content,
+                embedder=self.embedder,
+                embedding=result.embedding,
+                usage=result.usage,
+            )
+            for result in results
+        ]
+
+    def vector_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Perform a vector similarity search served by the ANN index.
+
+        Args:
+            query (str): The search query.
+            limit (int): Maximum number of results to return.
+            filters (Optional[Dict[str, Any]]): Filters to apply to the search.
+
+        Returns:
+            List[Document]: List of matching documents.
+        """
+        try:
+            query_embedding = self.embedder.get_embedding(query)
+            if query_embedding is None:
+                logger.error(f"Error getting embedding for Query: {query}")
+                return []
+
+            vector_distance, _ = self._distance(query_embedding)
+            candidates = self._ann_candidates(limit)
+            if self.vector_storage == "full":
+                stmt = self._scope(select(*self._result_columns()))
+                if filters is not None:
+                    stmt = stmt.where(self.table.c.filters.contains(filters))
+            else:
+                # Candidates from the quantized index, re-ranked with the full-precision distance below
+                candidate_ids = self._scope(select(self.table.c.id))
+                if filters is not None:
+                    candidate_ids = candidate_ids.where(self.table.c.filters.contains(filters))
+                candidate_ids = candidate_ids.order_by(self._ann_distance(query_embedding)).limit(_limit(candidates))
+                stmt = self._scope(select(*self._result_columns())).where(self.table.c.id.in_(candidate_ids))
+            stmt = stmt.order_by(vector_distance).limit(_limit(limit))
+            log_debug(f"Vector search query: {stmt}")
+
+            try:
+                with self.Session() as sess, sess.begin():
+                    self._set_ann_parameters(sess, candidates)
+                    results = sess.execute(stmt).fetchall()
+            except Exception as e:
+                logger.error(f"Error performing semantic search: {e}")
+                return []
+
+            search_results = self._to_documents(results)
+            if self.reranker:
+                search_results = self.reranker.rerank(query=query, documents=search_results)
+            return search_results
+        except Exception as e:
+            logger.error(f"Error during vector search: {e}")
+            return []
+
+    def keyword_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Perform a keyword search served by the full-text GIN index.
+
+        Args:
+            query (str): The search query.
+            limit (int): Maximum number of results to return.
+            filters (Optional[Dict[str, Any]]): Filters to apply to the search.
+
+        Returns:
+            List[Document]: List of matching documents.
+        """
+        try:
+            ts_vector = self._ts_vector()
+            ts_query = self._ts_query(query)
+            stmt = self._scope(select(*self._result_columns())).where(ts_vector.op("@@")(ts_query))
+            if filters is not None:
+                stmt = stmt.where(self.table.c.filters.contains(filters))
+            stmt = stmt.order_by(func.ts_rank_cd(ts_vector, ts_query).desc()).limit(_limit(limit))
+            log_debug(f"Keyword search query: {stmt}")
+
+            try:
+                with self.Session() as sess, sess.begin():
+                    results = sess.execute(stmt).fetchall()
+            except Exception as e:
+                logger.error(f"Error performing keyword search: {e}")
+                return []
+            return self._to_documents(results)
+        except Exception as e:
+            logger.error(f"Error during keyword search: {e}")
+            return []
+
+    def hybrid_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Hybrid search that only scores candidates returned by the ANN and full-text indexes.
+
+        Args:
+            query (str): The search query.
+            limit (int): Maximum number of results to return.
+            filters (Optional[Dict[str, Any]]): Filters to apply to the search.
+
+        Returns:
+            List[Document]: List of matching documents.
+        """
+        try:
+            query_embedding = self.embedder.get_embedding(query)
+            if query_embedding is None:
+                logger.error(f"Error getting embedding for Query: {query}")
+                return []
+
+            if not 0 <= self.vector_score_weight <= 1:
+                raise ValueError("vector_score_weight must be between 0 and 1")
+
+            vector_distance, vector_score = self._distance(query_embedding)
+            ts_vector = self._ts_vector()
+            ts_query = self._ts_query(query)
+            text_rank = func.ts_rank_cd(ts_vector, ts_query)
+            hybrid_score = (self.vector_score_weight * vector_score) + ((1 - self.vector_score_weight) * text_rank)
+
+            candidates = max(limit * knowledge_settings.kg_hybrid_candidate_multiplier, limit)
+            # The hybrid score below uses the full-precision distance, so quantized candidates are re-ranked
+            ann_candidates = self._ann_candidates(candidates)
+
+            # Nearest neighbours, served by the HNSW / IVFFlat index
+            vector_candidates = (
+                self._scope(select(self.table.c.id))
+                .order_by(self._ann_distance(query_embedding))
+                .limit(_limit(ann_candidates))
+            )
+            # Keyword matches, served by the GIN index
+            text_candidates = (
+                self._scope(select(self.table.c.id))
+                .where(ts_vector.op("@@")(ts_query))
+                .order_by(text_rank.desc())
+                .limit(_limit(candidates))
+            )
+            if filters is not None:
+                vector_candidates = vector_candidates.where(self.table.c.filters.contains(filters))
+                text_candidates = text_candidates.where(self.table.c.filters.contains(filters))
+            candidate_ids = union(vector_candidates, text_candidates).subquery()
+
+            stmt = (
+                self._scope(select(*self._result_columns(), hybrid_score.label("hybrid_score")))
+                .where(self.table.c.id.in_(select(candidate_ids.c.id)))
+                .order_by(desc("hybrid_score"))
+                .limit(_limit(limit))
+            )
+            log_debug(f"Hybrid search query: {stmt}")
+
+            try:
+                with self.Session() as sess, sess.begin():
+                    self._set_ann_parameters(sess, ann_candidates)
+                    results = sess.execute(stmt).fetchall()
+            except Exception as e:
+                logger.error(f"Error performing hybrid search: {e}")
+                return []
+
+            search_results = self._to_documents(results)
+            if self.reranker:
+                search_results = self.reranker.rerank(query=query, documents=search_results)
+            return search_results
+        except Exception as e:
+            logger.error(f"Error during hybrid search: {e}")
+            return []
@@ -0,0 +1,239 @@
+"""Keep tenant knowledge in sync with files dropped into `rag_data/<tenant_id>/`.
+
+Files copied into a tenant directory by rsync, scripts or restores are ingested, re-ingested
+when their content changes and deleted from the knowledge table when they are removed. Each
+tenant directory keeps a `.watch-state.json` with the size, mtime and hash of the files the
+watcher ingested, so only the delta is processed, also after a restart. A file the state does
+not know may already be in the knowledge table (uploaded, loaded by the old readers, or ingested
+by a run that stopped before saving its state), so its chunks are deleted before it is ingested.
+
+Changes are picked up with inotify (through `watchfiles`) and debounced, so a burst of writes
+triggers one sync per tenant. Without `watchfiles`, or with `force_polling`, the directories
+are polled instead.
+
+Run it with `python -m admin watch`.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from agno.knowledge.agent import AgentKnowledge
+
+from knowledge.blobstore import BLOBS_DIR, MANIFEST
+from knowledge.ingest import ingest_file
+from knowledge.manifest import forget_ingestion, record_ingestion
+from knowledge.readers import SUPPORTED_FILE_TYPES
+from knowledge.settings import knowledge_settings
+from knowledge.uploads import RAG_DATA_DIR
+from utils.log import logger
+
+STATE_FILE = ".watch-state.json"
+
+
+@dataclass
+class FileState:
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass
+class Delta:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # Same content with a new mtime, only the recorded state is updated
+    touched: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+def is_watched_file(path: Path) -> bool:
+    """Supported documents in a tenant directory. Hidden files (staged uploads, rsync temp files) are skipped."""
+    return (
+        not path.name.startswith(".")
+        and path.name != MANIFEST
+        and path.suffix.lower().lstrip(".") in SUPPORTED_FILE_TYPES
+    )
+
+
+def file_sha256(path: Path, chunk_bytes: int = knowledge_settings.kg_upload_chunk_bytes) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(chunk_bytes):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state(directory: Path) -> Dict[str, FileState]:
+    path = directory / STATE_FILE
+    if not path.exists():
+        return {}
+    with path.open(encoding="utf-8") as f:
+        return {name: FileState(**state) for name, state in json.load(f).items()}
+
+
+def save_state(directory: Path, state: Dict[str, FileState]) -> None:
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".watch-state-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({name: asdict(file_state) for name, file_state in sorted(state.items())}, f, indent=1)
+    os.replace(tmp_name, directory / STATE_FILE)
+
+
+def compute_delta(directory: Path, state: Dict[str, FileState]) -> Delta:
+    """Compare a tenant directory with the recorded state.
+
+    Files whose size and mtime are unchanged are skipped without reading them. A file that was
+    only touched (same hash) is not reported, its recorded mtime is refreshed.
+    """
+    delta = Delta()
+    present: Set[str] = set()
+    for path in sorted(directory.iterdir()):
+        if not path.is_file() or not is_watched_file(path):
+            continue
+        present.add(path.name)
+        stat = path.stat()
+        previous = state.get(path.name)
+        if previous is None:
+            delta.added.append(path.name)
+        elif (previous.size, previous.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            if file_sha256(path) != previous.sha256:
+                delta.changed.append(path.name)
+            else:
+                previous.size, previous.mtime_ns = stat.st_size, stat.st_mtime_ns
+                delta.touched.append(path.name)
+    delta.removed = sorted(set(state) - present)
+    return delta
+
+
+def sync_tenant(directory: Path, tenant_id: str, knowledge: AgentKnowledge) -> Delta:
+    """Apply the delta of one tenant directory to its knowledge base.
+
+    The state is saved after every file, so an interrupted sync resumes where it stopped.
+    """
+    first_run = not (directory / STATE_FILE).exists()
+    state = load_state(directory)
+    delta = compute_delta(directory, state)
+    if delta.touched:
+        save_state(directory, state)
+    for name in delta.removed:
+        knowledge.vector_db.delete_document(name)
+        forget_ingestion(tenant_id, name)
+        del state[name]
+        save_state(directory, state)
+    for name in delta.changed + delta.added:
+        path = directory / name
+        try:
+            stat = path.stat()
+            sha256 = file_sha256(path)
+            # Drop the old chunks, the new version may have fewer
+            knowledge.vector_db.delete_document(name)
+            if first_run:
+                # The old readers named chunks after the stem and left document_id empty
+                knowledge.vector_db.delete_document(path.stem)
+            chunks = ingest_file(knowledge, path, tenant_id, document_id=name)
+        except FileNotFoundError:
+            # Removed while the sync was running, picked up by the next one
+            continue
+        except Exception as e:
+            logger.error(f"Could not ingest {path}: {e}")
+            continue
+        state[name] = FileState(size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=sha256)
+        save_state(directory, state)
+        record_ingestion(tenant_id, name, "watch", chunks, sha256=sha256, size_bytes=stat.st_size)
+        logger.info(f"Ingested {path} ({chunks} chunks)")
+    if delta:
+        logger.info(
+            f"Tenant {tenant_id}: {len(delta.added)} added, {len(delta.changed)} changed, {len(delta.removed)} removed"
+        )
+    return delta
+
+
+class RagDataWatcher:
+    """Watch every tenant directory under `root` and sync the ones that changed.
+
+    `get_knowledge(tenant_id)` returns the tenant's knowledge base, or None for an unknown tenant.
+    """
+
+    def __init__(
+        self,
+        get_knowledge: Callable[[str], Optional[AgentKnowledge]],
+        root: Path = RAG_DATA_DIR,
+        tenant_ids: Optional[Iterable[str]] = None,
+        debounce_ms: int = knowledge_settings.kg_watch_debounce_ms,
+        poll_interval: float = knowledge_settings.kg_watch_poll_interval,
+        force_polling: bool = knowledge_settings.kg_watch_force_polling,
+    ):
+        self.get_knowledge = get_knowledge
+        self.root = Path(root)
+        self.tenant_ids = set(tenant_ids) if tenant_ids else None
+        self.debounce_ms = debounce_ms
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+
+    def tenant_dirs(self) -> List[Path]:
+        if not self.root.exists():
+            return []
+        return [
+            path
+            for path in sorted(self.root.iterdir())
+            if path.is_dir()
+            and path.name != BLOBS_DIR
+            and not path.name.startswith(".")
+            and (self.tenant_ids is None or path.name in self.tenant_ids)
+        ]
+
+    def sync(self, directories: Iterable[Path]) -> None:
+        for directory in directories:
+            tenant_id = directory.name
+            knowledge = self.get_knowledge(tenant_id)
+            if knowledge is None:
+                logger.warning(f"Skipping {directory}: unknown tenant")
+                continue
+            try:
+                sync_tenant(directory, tenant_id, knowledge)
+            except Exception as e:
+                logger.error(f"Could not sync {directory}: {e}")
+
+    def _changed_dirs(self, paths: Iterable[str]) -> List[Path]:
+        """Tenant directories that contain one of the changed paths."""
+        root = self.root.resolve()
+        names = set()
+        for changed in paths:
+            try:
+                relative = Path(changed).resolve().relative_to(root)
+            except ValueError:
+                continue
+            if len(relative.parts) == 2 and is_watched_file(relative):
+                names.add(relative.parts[0])
+        return [directory for directory in self.tenant_dirs() if directory.name in names]
+
+    def run(self) -> None:
+        # Catch up with changes made while the watcher was not running
+        self.sync(self.tenant_dirs())
+        try:
+            from watchfiles import watch
+        except ImportError:
+            logger.warning("`watchfiles` not installed, polling for changes")
+            self.poll()
+            return
+        if self.force_polling:
+            self.poll()
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Events are batched until no change happened for `debounce_ms`
+        for changes in watch(self.root, debounce=self.debounce_ms, recursive=True):
+            self.sync(self._changed_dirs(path for _, path in changes))
+
+    def poll(self) -> None:
+        """Rescan every tenant directory each `poll_interval` seconds. Unchanged files are only stat'ed."""
+        while True:
+            time.sleep(self.poll_interval)
+            self.sync(self.tenant_dirs())
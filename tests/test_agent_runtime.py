@@ -0,0 +1,56 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.models.message import Message, MessageMetrics
+from agno.tools.function import Function, FunctionCall
+
+from agents.models import AgentOpenAIChat
+from agents.runtime import ToolMetricsAgent
+
+
+def test_tool_calls_run_concurrently_up_to_the_cap_in_call_order():
+    running, peak = 0, 0
+
+    async def search(query: str, delay: float) -> str:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        running -= 1
+        return query
+
+    function = Function.from_callable(search)
+    calls = [
+        FunctionCall(function=function, arguments={"query": f"q{n}", "delay": delay}, call_id=f"c{n}")
+        for n, delay in enumerate([0.05, 0.01, 0.01, 0.01])
+    ]
+    model = AgentOpenAIChat(id="gpt-4o", api_key="test")
+    model.max_parallel_tool_calls = 2
+
+    async def run():
+        results = []
+        async for _ in model.arun_function_calls(calls, results):
+            pass
+        return results
+
+    results = asyncio.run(run())
+    assert peak == 2
+    assert [m.content for m in results] == ["q0", "q1", "q2", "q3"]
+    assert [m.tool_call_id for m in results] == ["c0", "c1", "c2", "c3"]
+    assert model._tool_call_slots is None
+
+
+def test_tool_call_times_in_run_metrics():
+    agent = ToolMetricsAgent(model=AgentOpenAIChat(id="gpt-4o", api_key="test"))
+    messages = [
+        Message(role="assistant", content="", metrics=MessageMetrics(input_tokens=10, time=1.0)),
+        Message(role="tool", tool_name="duckduckgo_search", content="a", metrics=MessageMetrics(time=0.5)),
+        Message(role="tool", tool_name="duckduckgo_search", content="b", metrics=MessageMetrics(time=0.25)),
+        Message(role="tool", tool_name="search_knowledge_base", content="c", metrics=MessageMetrics(time=0.1)),
+    ]
+    metrics = agent.aggregate_metrics_from_messages(messages)
+    assert metrics["input_tokens"] == [10]
+    assert metrics["tool_call_times"] == {"duckduckgo_search": [0.5, 0.25], "search_knowledge_base": [0.1]}
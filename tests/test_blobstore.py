@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from knowledge import blobstore
+from knowledge.blobstore import BlobStore, migrate_tenant_dir, resolve_codec
+
+
+def test_identical_uploads_share_one_blob(tmp_path):
+    store = BlobStore(root=tmp_path, codec="gzip")
+    for tenant_id in ("t1", "t2"):
+        upload = tmp_path / tenant_id / "agent.docx"
+        upload.parent.mkdir()
+        upload.write_bytes(b"same content" * 100)
+        store.add(tenant_id, upload)
+        assert not upload.exists()
+
+    blobs = list(store.blobs_dir.glob("*/*"))
+    assert len(blobs) == 1 and blobs[0].suffix == ".gz"
+    entry = store.read_manifest("t1")["agent.docx"]
+    assert store.read_manifest("t2")["agent.docx"].sha256 == entry.sha256
+    with store.open(entry.sha256) as f:
+        assert f.read() == b"same content" * 100
+
+
+def test_gc_removes_unreferenced_blobs(tmp_path):
+    store = BlobStore(root=tmp_path, codec="none")
+    store.add_bytes("t1", "a.html", b"<html>a</html>")
+    store.add_bytes("t1", "b.html", b"<html>b</html>")
+    store.add_bytes("t2", "a.html", b"<html>a</html>")
+    store.remove("t1", "a.html")
+    store.remove("t1", "b.html")
+
+    assert store.gc(grace_seconds=3600).removed == 0
+    result = store.gc(grace_seconds=0)
+    assert (result.removed, result.kept) == (1, 1)
+    assert store.find_blob(store.read_manifest("t2")["a.html"].sha256) is not None
+
+
+def test_migrate_tenant_dir(tmp_path):
+    store = BlobStore(root=tmp_path, codec="gzip")
+    (tmp_path / "t1").mkdir()
+    (tmp_path / "t1" / "notes.txt").write_text("hello")
+    (tmp_path / "t1" / ".upload-partial").write_text("x")
+
+    assert migrate_tenant_dir(store, "t1") == ["notes.txt"]
+    assert list(store.read_manifest("t1")) == ["notes.txt"]
+    assert sorted(p.name for p in (tmp_path / "t1").iterdir()) == [".manifest.lock", ".upload-partial", "manifest.json"]
+
+
+def test_missing_zstandard_falls_back_to_gzip_with_one_warning(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(blobstore, "zstandard", None)
+    monkeypatch.setattr(blobstore, "_warned_zstd", False)
+    monkeypatch.setattr(blobstore.logger, "warning", warnings.append)
+    assert [resolve_codec("zstd") for _ in range(3)] == ["gzip"] * 3
+    assert len(warnings) == 1
+    assert resolve_codec("none") == "none"
+
+
+def _add_files(root, worker):
+    store = BlobStore(root=root, codec="none")
+    for n in range(20):
+        store.add_bytes("t1", f"{worker}-{n}.txt", f"{worker}-{n}".encode())
+
+
+def test_manifest_updates_from_several_processes_are_not_lost(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_add_files, args=(tmp_path, worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert len(BlobStore(root=tmp_path, codec="none").read_manifest("t1")) == 80
@@ -0,0 +1,81 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.document import Document
+
+from knowledge.chunking import (
+    RowBatchChunking,
+    StructureChunking,
+    TokenChunking,
+    get_chunking_strategy,
+    split_sections,
+)
+from knowledge.settings import knowledge_settings
+
+
+class WordTokenizer:
+    """One token per word, so chunk sizes are easy to reason about."""
+
+    def __init__(self):
+        self.vocab = []
+
+    def encode_batch(self, texts):
+        encoded = []
+        for text in texts:
+            tokens = []
+            for word in text.split():
+                self.vocab.append(word)
+                tokens.append(len(self.vocab) - 1)
+            encoded.append(tokens)
+        return encoded
+
+    def decode(self, tokens):
+        return " ".join(self.vocab[t] for t in tokens)
+
+
+def test_token_chunking_overlap():
+    document = Document(name="doc", content=" ".join(f"w{i}" for i in range(25)))
+    chunks = TokenChunking(chunk_tokens=10, overlap=2, tokenizer=WordTokenizer()).chunk(document)
+    assert [c.content.split()[0] for c in chunks] == ["w0", "w8", "w16"]
+    assert chunks[1].content.split()[:2] == ["w8", "w9"]
+    assert [c.id for c in chunks] == ["doc_1", "doc_2", "doc_3"]
+
+
+def test_split_sections():
+    content = "# Intro\n\nFirst paragraph.\n\nSecond paragraph.\n\n## Usage\nRun it."
+    assert split_sections(content) == [
+        ("# Intro", ["First paragraph.", "Second paragraph."]),
+        ("## Usage", ["Run it."]),
+    ]
+
+
+def test_structure_chunking_packs_paragraphs_per_section():
+    content = "# Intro\n\none two three\n\nfour five six\n\nseven eight nine\n\n# Next\n\nten"
+    chunks = StructureChunking(chunk_tokens=8, tokenizer=WordTokenizer()).chunk(Document(name="guide", content=content))
+    assert [c.content for c in chunks] == [
+        "# Intro\n\none two three\n\nfour five six",
+        "# Intro\n\nseven eight nine",
+        "# Next\n\nten",
+    ]
+    assert chunks[0].meta_data["section"] == "# Intro"
+
+
+def test_row_batching_repeats_header():
+    content = "Title, Year\n" + "\n".join(f"Movie {i}, 2000" for i in range(5))
+    chunks = RowBatchChunking(rows_per_chunk=2, tokenizer=WordTokenizer()).chunk(
+        Document(name="movies", content=content)
+    )
+    assert len(chunks) == 3
+    assert all(c.content.startswith("Title, Year\n") for c in chunks)
+    assert [c.meta_data["rows"] for c in chunks] == ["1-2", "3-4", "5-5"]
+
+
+def test_strategy_per_file_type_and_tenant(monkeypatch):
+    assert isinstance(get_chunking_strategy("csv"), RowBatchChunking)
+    assert isinstance(get_chunking_strategy(".PDF"), StructureChunking)
+    assert isinstance(get_chunking_strategy("unknown"), TokenChunking)
+    monkeypatch.setattr(knowledge_settings, "kg_tenant_chunking", {"tenant-a": {"csv": "token"}})
+    assert isinstance(get_chunking_strategy("csv", tenant_id="tenant-a"), TokenChunking)
+    assert isinstance(get_chunking_strategy("csv", tenant_id="tenant-b"), RowBatchChunking)
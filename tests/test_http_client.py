@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents import http_client
+from agents.http_client import client_metrics, shared_async_http_client, shared_http_client
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client_metrics.reset()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+def test_sync_client_is_shared_and_reuses_connections(server_url, monkeypatch):
+    monkeypatch.setattr(http_client, "_sync_client", None)
+    assert shared_http_client() is shared_http_client()
+    for _ in range(4):
+        assert shared_http_client().get(server_url).text == "ok"
+
+    stats = client_metrics.stats()
+    assert (stats.requests, stats.connections) == (4, 1)
+    assert stats.reuse_rate == 0.75
+
+
+def test_async_client_per_event_loop(server_url):
+    async def run():
+        client = shared_async_http_client()
+        assert shared_async_http_client() is client
+        for _ in range(3):
+            await client.get(server_url)
+        return client
+
+    first, second = asyncio.run(run()), asyncio.run(run())
+    assert first is not second
+    stats = client_metrics.stats()
+    assert (stats.requests, stats.connections) == (6, 2)
@@ -0,0 +1,141 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from agno.embedder.base import Embedder
+
+from knowledge.indexes import (
+    IndexCoverage,
+    IndexInfo,
+    build_document_id_sql,
+    build_gin_index_sql,
+    build_vector_index_sql,
+    ivfflat_lists,
+    qualified_name,
+    vector_index_storage,
+)
+from knowledge.vector_db import TenantPgVector
+
+
+def test_tenant_tables_are_quoted():
+    # Tenant tables start with the first 8 chars of a UUID, which may be digits
+    assert qualified_name("user_a", "177e3ac4_sage_kg") == '"user_a"."177e3ac4_sage_kg"'
+
+
+def test_vector_index_sql():
+    hnsw = build_vector_index_sql("user_a", "177e3ac4_sage_kg", method="hnsw", distance="cosine")
+    assert hnsw.startswith('CREATE INDEX CONCURRENTLY IF NOT EXISTS "177e3ac4_sage_kg_hnsw_index"')
+    assert "USING hnsw (embedding vector_cosine_ops)" in hnsw
+
+    ivfflat = build_vector_index_sql(
+        "user_a", "177e3ac4_sage_kg", method="ivfflat", distance="l2", row_count=50_000, concurrently=False
+    )
+    assert "CONCURRENTLY" not in ivfflat
+    assert "USING ivfflat (embedding vector_l2_ops) WITH (lists = 50)" in ivfflat
+
+
+def test_quantized_vector_index_sql():
+    halfvec = build_vector_index_sql("user_a", "177e3ac4_sage_kg", method="hnsw", storage="halfvec", dimensions=1536)
+    assert '"177e3ac4_sage_kg_hnsw_halfvec_index"' in halfvec
+    assert "USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)" in halfvec
+    binary = build_vector_index_sql("user_a", "177e3ac4_sage_kg", method="hnsw", storage="binary", dimensions=1536)
+    assert "USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)" in binary
+    # The storage of an index is read back from its definition
+    assert vector_index_storage(binary) == "binary"
+    assert vector_index_storage(halfvec) == "halfvec"
+    assert vector_index_storage(build_vector_index_sql("user_a", "177e3ac4_sage_kg")) == "full"
+
+
+def test_coverage_per_storage():
+    coverage = IndexCoverage(
+        schema="user_a",
+        table="177e3ac4_sage_kg",
+        row_estimate=5000,
+        dimensions=1536,
+        indexes=[
+            IndexInfo(name="177e3ac4_sage_kg_hnsw_index", method="hnsw", valid=True, size_bytes=6 << 20),
+            IndexInfo(name="177e3ac4_sage_kg_content_gin_index", method="gin", valid=True, size_bytes=8192),
+        ],
+    )
+    assert coverage.covered_for("full")
+    assert not coverage.covered_for("halfvec")
+    assert [i.name for i in coverage.stale_vector_indexes("halfvec")] == ["177e3ac4_sage_kg_hnsw_index"]
+
+
+def test_gin_index_matches_query_expression():
+    sql = build_gin_index_sql("user_a", "177e3ac4_sage_kg", language="english")
+    assert "USING gin (to_tsvector('english'::regconfig, content))" in sql
+
+
+def test_ivfflat_lists():
+    assert ivfflat_lists(10) == 1
+    assert ivfflat_lists(250_000) == 250
+    assert ivfflat_lists(4_000_000) == 2000
+
+
+def test_coverage_ignores_invalid_indexes():
+    coverage = IndexCoverage(
+        schema="user_a",
+        table="177e3ac4_sage_kg",
+        row_estimate=5000,
+        indexes=[
+            IndexInfo(name="177e3ac4_sage_kg_hnsw_index", method="hnsw", valid=False, size_bytes=0),
+            IndexInfo(name="177e3ac4_sage_kg_content_gin_index", method="gin", valid=True, size_bytes=8192),
+        ],
+    )
+    assert coverage.vector_index is None
+    assert coverage.gin_index is not None
+    assert not coverage.covered
+    assert [i.name for i in coverage.invalid_indexes] == ["177e3ac4_sage_kg_hnsw_index"]
+
+
+def test_copy_merge_sql():
+    from knowledge.bulk import build_merge_sql
+
+    sql = build_merge_sql('"ai"."knowledge"', ["tenant_id", "id", "content"], ["tenant_id", "id"], upsert=True)
+    assert 'SELECT DISTINCT ON ("tenant_id", "id") "tenant_id", "id", "content" FROM _kg_copy_stage' in sql
+    # The last staged row of a key wins
+    assert 'ORDER BY "tenant_id", "id", _stage_seq DESC' in sql
+    assert 'ON CONFLICT ("tenant_id", "id") DO UPDATE SET "content" = EXCLUDED."content", updated_at = now()' in sql
+    assert "ON CONFLICT" not in build_merge_sql('"ai"."knowledge"', ["id"], ["id"], upsert=False)
+
+
+def test_copy_merge_embeds_before_taking_a_connection():
+    from knowledge.bulk import copy_merge
+
+    events = []
+
+    def batches():
+        for n in range(2):
+            events.append("embed")
+            yield [{"id": str(n)}]
+
+    def raw_connection():
+        events.append("connect")
+        raise RuntimeError("stop here")
+
+    engine = SimpleNamespace(raw_connection=raw_connection)
+    table = SimpleNamespace(schema="ai", name="knowledge")
+    with pytest.raises(RuntimeError):
+        copy_merge(engine, table, batches(), ["id"])
+    assert events == ["embed", "embed", "connect"]
+
+
+def test_document_id_column_is_indexed():
+    vector_db = TenantPgVector(
+        table_name="177e3ac4_sage_kg",
+        schema="user_a",
+        db_url="postgresql+psycopg://ai:ai@localhost:5432/ai",
+        embedder=Embedder(dimensions=8),
+    )
+    assert "document_id" in vector_db.table.c
+    assert any(index.name == "177e3ac4_sage_kg_document_id_index" for index in vector_db.table.indexes)
+    stmt = vector_db._scope(vector_db.table.delete()).where(vector_db._document_filter("report.pdf"))
+    assert "document_id = " in str(stmt) and "document_id IS NULL" in str(stmt)
+    assert build_document_id_sql("user_a", "177e3ac4_sage_kg") == [
+        'ALTER TABLE "user_a"."177e3ac4_sage_kg" ADD COLUMN IF NOT EXISTS document_id text',
+        'CREATE INDEX IF NOT EXISTS "177e3ac4_sage_kg_document_id_index" ON "user_a"."177e3ac4_sage_kg" (document_id)',
+    ]
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+
+from api.routes import knowledge as knowledge_routes
+from api.routes.knowledge import get_tenant
+from db.tables import IngestionJob
+from db.tenancy import parse_phantom_token
+from knowledge.jobs import JobRegistry, JobStatus
+
+T1 = "5f0c6a2e-8d1b-4c3a-9e7f-1a2b3c4d5e6f"
+T2 = "9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d"
+
+
+def _registry(tmp_path, max_jobs):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+
+    @event.listens_for(engine, "connect")
+    def attach_ai_schema(connection, record):
+        connection.execute(f"ATTACH DATABASE '{tmp_path / 'ai.db'}' AS ai")
+
+    IngestionJob.__table__.create(engine)
+    return JobRegistry(max_workers=1, max_jobs=max_jobs, engine=engine)
+
+
+def _wait(registry, tenant_id, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = registry.get(tenant_id, job_id)
+        if job.finished_at is not None:
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+def test_jobs_run_in_background_and_record_the_result(tmp_path):
+    registry = _registry(tmp_path, max_jobs=10)
+    ok = registry.submit(T1, "file", "a.pdf", lambda n: n, 7)
+    failed = registry.submit(T1, "url", "https://example.com", lambda: 1 / 0)
+
+    ok = _wait(registry, T1, ok.job_id)
+    assert ok.status == JobStatus.succeeded and ok.chunks == 7
+    assert ok.created_at <= ok.started_at <= ok.finished_at
+    failed = _wait(registry, T1, failed.job_id)
+    assert failed.status == JobStatus.failed
+    assert "division by zero" in failed.error
+
+
+def test_jobs_are_visible_to_every_worker(tmp_path):
+    registry = _registry(tmp_path, max_jobs=10)
+    job = registry.submit(T1, "file", "a.pdf", lambda: 3)
+    _wait(registry, T1, job.job_id)
+    # Another API process reads the same table
+    other_worker = JobRegistry(max_workers=1, max_jobs=10, engine=registry.engine)
+    assert other_worker.get(T1, job.job_id).chunks == 3
+    assert other_worker.get(T1, "not-a-uuid") is None
+
+
+def test_jobs_are_scoped_to_their_tenant_and_pruned(tmp_path):
+    registry = _registry(tmp_path, max_jobs=2)
+    jobs = [registry.submit(T1, "file", f"{i}.txt", lambda: 0) for i in range(2)]
+    for job in jobs:
+        _wait(registry, T1, job.job_id)
+    other = registry.submit(T2, "file", "c.txt", lambda: 0)
+
+    assert registry.get(T1, other.job_id) is None
+    assert [job.source for job in registry.list(T2)] == ["c.txt"]
+    # The oldest finished job made room for the new one
+    assert [job.source for job in registry.list(T1)] == ["1.txt"]
+
+
+def test_parse_phantom_token():
+    assert parse_phantom_token(f"{T1.upper()}:alice") == (T1, "alice")
+    for token in ("alice", "1234:alice", "../../tmp/x:alice", f"{T1}:"):
+        with pytest.raises(ValueError):
+            parse_phantom_token(token)
+
+
+def test_unknown_tenants_are_rejected_before_touching_disk(monkeypatch):
+    registered = {(T1, "alice")}
+    monkeypatch.setattr(
+        knowledge_routes, "is_registered_tenant", lambda tenant_id, username: (tenant_id, username) in registered
+    )
+    assert get_tenant(f"{T1}:alice").tenant_id == T1
+    for token in ("../../tmp/x:alice", f"{T2}:alice", f"{T1}:bob"):
+        with pytest.raises(HTTPException) as error:
+            get_tenant(token)
+        assert error.value.status_code == 401
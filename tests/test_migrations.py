@@ -0,0 +1,42 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+from db.tables import Base
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def alembic_config(output=None) -> Config:
+    config = Config(os.path.join(ROOT, "db", "alembic.ini"), output_buffer=output)
+    config.set_main_option("script_location", os.path.join(ROOT, "db", "migrations"))
+    return config
+
+
+def test_migrations_have_a_single_head():
+    assert len(ScriptDirectory.from_config(alembic_config()).get_heads()) == 1
+
+
+def test_migrations_create_the_modelled_tables():
+    output = io.StringIO()
+    command.upgrade(alembic_config(output), "head", sql=True)
+    sql = output.getvalue()
+    for name in Base.metadata.tables:
+        assert f"{name} (" in sql, f"no migration creates {name}"
+    # Login and token lookups
+    assert "users_user_name_lower_idx ON public.users (lower(user_name))" in sql
+    assert "users_tenant_id_key ON public.users (tenant_id)" in sql
+    assert "PRIMARY KEY (tenant_id, document_id)" in sql
+
+
+def test_the_version_schema_is_created_before_the_version_table():
+    output = io.StringIO()
+    command.upgrade(alembic_config(output), "head", sql=True)
+    sql = output.getvalue()
+    assert sql.index("CREATE SCHEMA IF NOT EXISTS ai") < sql.index("CREATE TABLE ai.alembic_version")
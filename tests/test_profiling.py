@@ -0,0 +1,126 @@
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from api import profiling
+from api.profiling import profile_stream, profiling_requested, reserve_profile
+from api.settings import api_settings
+
+
+class ReservationEngine:
+    def __init__(self, started: int):
+        self.started = started
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        def execute(stmt):
+            self.statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+            return SimpleNamespace(scalar=lambda: self.started)
+
+        yield SimpleNamespace(execute=execute)
+
+
+class FakeProfile:
+    profile_id = "profile-1"
+
+    def __init__(self):
+        self.events = []
+
+    def start(self):
+        self.events.append("start")
+
+    async def finish(self, failed: bool = False):
+        self.events.append(("finish", failed))
+
+
+def test_profiling_needs_the_token(monkeypatch):
+    monkeypatch.setattr(api_settings, "profile_token", "secret")
+    monkeypatch.setattr(profiling, "find_spec", lambda name: object())
+    assert profiling_requested(None) is False
+    assert profiling_requested("") is False
+    assert profiling_requested("secret") is True
+    with pytest.raises(HTTPException) as error:
+        profiling_requested("guess")
+    assert error.value.status_code == 403
+
+    # Without a token configured profiling is off
+    monkeypatch.setattr(api_settings, "profile_token", None)
+    with pytest.raises(HTTPException) as error:
+        profiling_requested("secret")
+    assert error.value.status_code == 403
+
+
+def test_profiling_without_pyinstrument(monkeypatch):
+    monkeypatch.setattr(api_settings, "profile_token", "secret")
+    monkeypatch.setattr(profiling, "find_spec", lambda name: None)
+    with pytest.raises(HTTPException) as error:
+        profiling_requested("secret")
+    assert error.value.status_code == 501
+
+
+def test_reserve_profile_is_rate_limited():
+    engine = ReservationEngine(started=2)
+    profile_id = reserve_profile(engine, "tenant", "sage", max_per_hour=3)
+    assert profile_id is not None
+    lock, cleanup, count, insert = engine.statements
+    assert "pg_advisory_xact_lock" in lock
+    assert cleanup.startswith("DELETE FROM ai.request_profiles")
+    assert "count(*)" in count
+    assert insert.startswith("INSERT INTO ai.request_profiles")
+
+    engine = ReservationEngine(started=3)
+    assert reserve_profile(engine, "tenant", "sage", max_per_hour=3) is None
+    # Nothing is inserted once the limit is reached
+    assert len(engine.statements) == 3
+
+
+def test_profile_stream_covers_the_whole_stream():
+    closed = []
+
+    async def chunks():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append(True)
+
+    async def consume(limit=None):
+        profile = FakeProfile()
+        stream = profile_stream(chunks(), profile)
+        received = []
+        async for chunk in stream:
+            received.append(chunk)
+            if limit and len(received) == limit:
+                break
+        await stream.aclose()
+        return received, profile.events
+
+    received, events = asyncio.run(consume())
+    assert received == ["a", "b"]
+    assert events == ["start", ("finish", False)]
+
+    # A client that goes away mid-stream closes the run's stream and stores a failed profile
+    received, events = asyncio.run(consume(limit=1))
+    assert received == ["a"]
+    assert events == ["start", ("finish", True)]
+    assert closed == [True, True]
+
+
+def test_run_with_an_invalid_tenant_is_refused_before_profiling(monkeypatch):
+    from api.routes import agents
+
+    monkeypatch.setattr(agents, "get_agent", lambda **kwargs: pytest.fail("the agent is built after the token check"))
+    monkeypatch.setattr(agents, "start_run_profile", lambda *args: pytest.fail("no profile for an invalid tenant"))
+    body = agents.RunRequest(message="hi", stream=False)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(agents.run_agent(agents.AgentType.SAGE, body, None, phantom_token="not-a-uuid:jane", x_profile="x"))
+    assert error.value.status_code == 401
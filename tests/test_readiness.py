@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from api import readiness
+from api.readiness import Check, DependencyProbes, check_pool, probe_database
+
+
+def make_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'ready.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0)
+
+
+def test_pool_saturation_and_exhausted_pool_is_not_waited_for(tmp_path):
+    engine = make_engine(tmp_path)
+    assert check_pool(engine, max_saturation=0.9).ok
+
+    with engine.connect():
+        check = check_pool(engine, max_saturation=0.9)
+        assert not check.ok and check.detail == "1/1 connections checked out"
+        # pool_timeout is 30s, the probe must not queue for a connection
+        checks = probe_database(engine, timeout_ms=100)
+        assert checks["database"].detail == "no free connection in the pool"
+
+
+def test_failed_probe_reports_the_error(tmp_path):
+    # SQLite has no set_config(), which fails the probe like an unreachable database would
+    checks = probe_database(make_engine(tmp_path), timeout_ms=100)
+    assert not checks["database"].ok and not checks["pgvector"].ok
+    assert "set_config" in checks["database"].detail
+
+
+def test_probes_are_cached_for_the_ttl(monkeypatch):
+    calls = []
+
+    def probe(engine, timeout_ms):
+        calls.append(engine)
+        return {"database": Check(ok=True, latency_ms=1.0)}
+
+    monkeypatch.setattr(readiness, "probe_database", probe)
+    probes = DependencyProbes(ttl=60)
+    assert probes.fresh() is None
+    first = probes.get("engine")
+    assert probes.get("engine") is first and probes.fresh() is first and first.ready
+    assert len(calls) == 1
+
+    expired = DependencyProbes(ttl=0)
+    expired.get("engine")
+    expired.get("engine")
+    assert len(calls) == 3
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.agent import Agent
+
+from agents.models import get_openai_chat
+from agents.routing import record_route_latency, route_agent, route_model
+from agents.run_metrics import run_metrics
+
+
+def test_simple_lookup_goes_to_the_fast_model():
+    decision = route_model("auto", "What is the capital of Australia?")
+    assert decision.routed
+    assert decision.model_id == "gpt-4o"
+    assert "lookup question" in decision.reasons
+
+
+def test_multi_part_analysis_goes_to_the_strong_model():
+    message = (
+        "Compare PostgreSQL and MySQL for a write-heavy workload. "
+        "Why would one scale better, and what are the trade-offs of each?"
+    )
+    decision = route_model("auto", message)
+    assert decision.model_id == "o3-mini"
+    assert decision.score >= 2
+
+
+def test_explicit_model_is_not_routed():
+    decision = route_model("gpt-4o", "Explain step by step how to prove this theorem, and compare both proofs?")
+    assert not decision.routed
+    assert decision.model_id == "gpt-4o"
+
+
+def test_route_agent_switches_the_model_and_its_tools():
+    agent = Agent(model=get_openai_chat("auto"))
+    assert agent.model.id == "gpt-4o"
+    agent._functions_for_model = {}
+    agent._tools_for_model = []
+
+    decision = route_agent(agent, "auto", "Analyze step by step: 1. the costs 2. the risks")
+    assert agent.model.id == decision.model_id == "o3-mini"
+    assert agent._functions_for_model is None and agent._tools_for_model is None
+
+    run_metrics.reset()
+    record_route_latency(decision, 2.0)
+    record_route_latency(route_model("gpt-4o", "hi"), 1.0)
+    assert run_metrics.routes() == {"o3-mini": {"runs": 1, "avg_seconds": 2.0}}
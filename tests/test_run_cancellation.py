@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.agent import RunResponse
+from agno.models.message import Message
+from agno.run.messages import RunMessages
+
+from agents import runtime
+from agents.models import AgentOpenAIChat
+from agents.run_metrics import run_metrics
+from agents.runtime import ToolMetricsAgent, in_flight_tool_calls, save_cancelled_run
+from api.routes.agents import CancellableStreamingResponse, chat_response_streamer
+
+
+class SlowAgent:
+    """Streams a chunk every 10ms, far longer than the client stays connected."""
+
+    run_id = "run-1"
+
+    def __init__(self):
+        self.run_response = RunResponse(content="", tools=[{"tool_call_id": "t1", "tool_name": "search"}])
+        self.closed = False
+
+    async def arun(self, message, stream=True):
+        async def stream_run():
+            try:
+                for n in range(1000):
+                    await asyncio.sleep(0.01)
+                    self.run_response.content += f"{n} "
+                    yield SimpleNamespace(content=f"{n} ")
+            finally:
+                self.closed = True
+
+        return stream_run()
+
+
+def test_disconnect_cancels_and_saves_the_run(monkeypatch):
+    saved = []
+    monkeypatch.setattr(runtime, "save_cancelled_run", saved.append)
+    run_metrics.reset()
+    agent = SlowAgent()
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(0.1)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    async def serve():
+        response = CancellableStreamingResponse(chat_response_streamer(agent, "hi"), media_type="text/event-stream")
+        await response({"type": "http", "asgi": {"spec_version": "2.3"}}, receive, send)
+
+    asyncio.run(asyncio.wait_for(serve(), timeout=5))
+
+    assert agent.closed
+    assert saved == [agent]
+    assert 0 < len(sent) < 100
+    stats = run_metrics.stats()
+    assert (stats.cancelled_runs, stats.cancelled_tool_calls, stats.completed_runs) == (1, 1, 0)
+    assert stats.cancelled_output_chars == len(agent.run_response.content)
+
+
+def test_cancelled_run_is_kept_in_memory():
+    agent = ToolMetricsAgent(model=AgentOpenAIChat(id="gpt-4o", api_key="test"))
+    agent.initialize_agent()
+    user_message = Message(role="user", content="What is HNSW?")
+    agent.run_messages = RunMessages(messages=[user_message], user_message=user_message)
+    agent.run_response = RunResponse(
+        run_id="run-1",
+        content="HNSW is a graph",
+        tools=[{"tool_call_id": "t1", "tool_name": "search", "content": "done"}, {"tool_call_id": "t2"}],
+    )
+    assert in_flight_tool_calls(agent.run_response) == 1
+
+    save_cancelled_run(agent)
+
+    run = agent.memory.runs[-1]
+    assert run.response.event == "RunCancelled"
+    assert run.message.content == "What is HNSW?"
+    assert [(m.role, m.content) for m in run.response.messages] == [
+        ("user", "What is HNSW?"),
+        ("assistant", "HNSW is a graph"),
+    ]
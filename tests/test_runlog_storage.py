@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db.storage.runlog import plan_log_writes, split_memory
+
+
+def test_memory_is_split_into_header_and_logs():
+    memory = {"runs": [{"n": 1}], "messages": [{"role": "user"}, {"role": "assistant"}], "summary": {"topics": []}}
+    header, logs = split_memory(memory)
+    assert header == {"summary": {"topics": []}}
+    assert logs == {"runs": [{"n": 1}], "messages": [{"role": "user"}, {"role": "assistant"}]}
+    assert split_memory(None) == ({}, {"runs": [], "messages": []})
+
+
+def test_only_new_items_are_appended():
+    logs = {"runs": [{"n": 1}, {"n": 2}, {"n": 3}], "messages": [{"m": 1}]}
+    appends, truncates = plan_log_writes({"runs": 2, "messages": 1}, logs)
+    assert appends == [{"kind": "runs", "seq": 2, "data": {"n": 3}}]
+    assert truncates == {}
+
+    # Sessions without log rows (new, or written by PostgresAgentStorage) write everything
+    appends, _ = plan_log_writes({}, logs)
+    assert [(row["kind"], row["seq"]) for row in appends] == [("runs", 0), ("runs", 1), ("runs", 2), ("messages", 0)]
+
+
+def test_shorter_lists_truncate_the_log():
+    appends, truncates = plan_log_writes({"runs": 3, "messages": 4}, {"runs": [], "messages": [{"m": 1}]})
+    assert appends == []
+    assert truncates == {"runs": 0, "messages": 1}
@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents import sage, scholar
+from api.server import cpu_quota, worker_count
+from api.warmup import WARMUP_TENANT_ID, warm_agents
+
+
+def test_cpu_quota_from_cgroup_v2_and_v1(tmp_path):
+    assert cpu_quota(tmp_path) is None
+
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cpu_quota(tmp_path) == 1.5
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cpu_quota(tmp_path) is None
+
+    (tmp_path / "cpu.max").unlink()
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    assert cpu_quota(tmp_path) is None
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("50000\n")
+    assert cpu_quota(tmp_path) == 0.5
+
+
+def test_one_worker_per_cpu_of_the_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert worker_count(tmp_path) == 1
+
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert worker_count(tmp_path) == min(2, len(os.sched_getaffinity(0)))
+
+
+def test_every_agent_is_warmed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    built = []
+
+    def storage(agent_id, tenant_id=None, schema=None):
+        built.append(("storage", agent_id, tenant_id))
+
+    def vector_db(tenant_id, schema=None):
+        built.append(("knowledge", tenant_id))
+
+    for module in (sage, scholar):
+        monkeypatch.setattr(module, "get_agent_storage", storage)
+    monkeypatch.setattr(sage, "get_vector_db", vector_db)
+
+    assert warm_agents() == ["sage", "scholar"]
+    assert ("knowledge", WARMUP_TENANT_ID) in built
+    assert {entry[1] for entry in built if entry[0] == "storage"} == {"sage", "scholar"}
+    # The template tenant leaves no rag_data directory behind
+    assert not (tmp_path / "rag_data" / WARMUP_TENANT_ID).exists()
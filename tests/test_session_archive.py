@@ -0,0 +1,36 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.storage.session.agent import AgentSession
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from db.storage.archive import ArchivedSessionsMixin, decode_session, encode_session
+
+
+def test_sessions_round_trip_through_the_archive_encoding():
+    session = AgentSession(
+        session_id="s1",
+        user_id="alice",
+        agent_id="sage",
+        memory={"runs": [{"message": {"role": "user", "content": "hello " * 200}}]},
+        session_data={"session_name": "Greetings"},
+        created_at=1700000000,
+        updated_at=1700000100,
+    )
+    for codec in ("gzip", "none"):
+        data = encode_session(session, codec)
+        assert decode_session(data, codec) == session
+    assert len(encode_session(session, "gzip")) < len(encode_session(session, "none")) / 5
+
+
+def test_archive_table_sits_next_to_the_session_table():
+    storage = SimpleNamespace(table_name="1a2b3c4d_sage_sessions", schema="user_alice")
+    table = ArchivedSessionsMixin.get_archive_table(storage)
+    ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+    assert 'user_alice."1a2b3c4d_sage_sessions_archive"' in ddl
+    assert "data BYTEA NOT NULL" in ddl
+    assert [column.name for column in table.primary_key] == ["session_id"]
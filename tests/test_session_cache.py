@@ -0,0 +1,89 @@
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.storage.session.agent import AgentSession
+
+from db.storage import cache
+from db.storage.cache import SessionCache, cached_storage_class
+
+
+def make_session(session_id, runs=1):
+    return AgentSession(session_id=session_id, user_id="u1", memory={"runs": [{"n": n} for n in range(runs)]})
+
+
+def test_hits_are_copies_checked_against_the_version():
+    session_cache = SessionCache(max_bytes=1 << 20)
+    session_cache.put("s1", "100", make_session("s1"))
+
+    first = session_cache.get("s1", "100")
+    first.memory["runs"].append({"n": 99})
+    assert session_cache.get("s1", "100").memory == {"runs": [{"n": 0}]}
+
+    # Written by another process since it was cached
+    assert session_cache.get("s1", "101") is None
+    assert session_cache.get("s1", "100") is None
+    stats = session_cache.stats()
+    assert (stats.hits, stats.stale, stats.misses, stats.entries) == (2, 1, 1, 0)
+    assert stats.hit_rate == 0.5
+
+
+def test_least_recently_used_sessions_are_evicted():
+    size = len(pickle.dumps(make_session("s0"), protocol=pickle.HIGHEST_PROTOCOL))
+    session_cache = SessionCache(max_bytes=3 * size)
+    for n in range(3):
+        session_cache.put(f"s{n}", "1", make_session(f"s{n}"))
+    session_cache.get("s0", "1")
+    session_cache.put("s3", "1", make_session("s3"))
+
+    assert session_cache.get("s1", "1") is None
+    assert [session_cache.get(f"s{n}", "1") is not None for n in (0, 2, 3)] == [True, True, True]
+    assert session_cache.stats().evictions == 1
+    assert session_cache.stats().bytes <= 3 * size
+
+    # Larger than the whole cache, not kept
+    session_cache.put("big", "1", make_session("big", runs=10_000))
+    assert session_cache.get("big", "1") is None
+
+
+class FakeStorage:
+    schema = "ai"
+    table_name = "sage_sessions"
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+
+    def read(self, session_id, user_id=None):
+        self.reads += 1
+        return self.rows.get(session_id, (None, None))[1]
+
+    def upsert_versioned(self, session, create_and_retry=True):
+        version = str(int(self.rows.get(session.session_id, ("0",))[0]) + 1)
+        self.rows[session.session_id] = (version, session)
+        return session, version
+
+
+class VersionedFakeStorage(cached_storage_class(FakeStorage)):
+    def _read_version(self, session_id):
+        return self.rows.get(session_id, (None,))[0]
+
+
+def test_storage_reads_through_the_cache(monkeypatch):
+    monkeypatch.setattr(cache, "session_cache", SessionCache(max_bytes=1 << 20))
+    storage = VersionedFakeStorage()
+    storage.upsert(make_session("s1"))
+
+    # Written through, the read only checks the version
+    assert storage.read("s1").memory == {"runs": [{"n": 0}]}
+    assert storage.reads == 0
+    assert storage.read("s1", user_id="someone-else") is None
+
+    # A write that bypassed this process' cache changes the version
+    storage.rows["s1"] = ("7", make_session("s1", runs=2))
+    assert len(storage.read("s1").memory["runs"]) == 2
+    assert storage.reads == 1
+    storage.read("s1")
+    assert storage.reads == 1
@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import sqlalchemy
+from agno.storage.agent.postgres import PostgresAgentStorage
+from sqlalchemy.dialects import postgresql
+
+from db.storage import export
+from db.storage.export import iter_session_runs, jsonl_chunks, markdown_chunks, runs_page_query
+from db.storage.runlog import RunLogPostgresAgentStorage
+
+RUNS = [
+    {
+        "message": {"role": "user", "content": "Who are you?"},
+        "response": {
+            "content": "I am Sage.",
+            "tools": [{"tool_name": "duckduckgo_search", "tool_args": {"query": "sage"}, "content": "[]"}],
+        },
+    },
+    {"message": {"role": "user", "content": "Tell me more"}, "response": {"content": "Sure", "event": "RunCancelled"}},
+]
+
+
+def _storage():
+    storage = SimpleNamespace(
+        table_name="1a2b3c4d_sage_sessions", schema="alice", mode="agent", metadata=sqlalchemy.MetaData(schema="alice")
+    )
+    storage.table = PostgresAgentStorage.get_table_v1(storage)
+    storage.log_table = RunLogPostgresAgentStorage.get_log_table(storage)
+    return storage
+
+
+def test_row_sessions_are_paged_over_the_runs_array():
+    query = runs_page_query(_storage(), "row", "s1", after=49, limit=50).compile(dialect=postgresql.dialect())
+    sql = str(query)
+    assert "jsonb_path_query_array" in sql and "WITH ORDINALITY" in sql and "session_id" in sql
+    # Only the page's slice of the runs array is selected
+    assert query.params["param_1"] == "$[50 to 99]"
+
+
+def test_row_sessions_read_each_run_once():
+    runs = [{"n": n} for n in range(120)]
+    pages = []
+
+    class Session:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def execute(self, query):
+            # Evaluate the jsonpath slice the query selects, as Postgres would
+            params = query.compile(dialect=postgresql.dialect()).params
+            first, last = (int(i) for i in params["param_1"].strip("$[]").split(" to "))
+            page = [(n, runs[n]) for n in range(first, min(last + 1, len(runs)))]
+            pages.append(len(page))
+            return SimpleNamespace(fetchall=lambda: page)
+
+    storage = _storage()
+    storage.Session = Session
+    assert list(iter_session_runs(storage, "s1", "row", page_size=50)) == runs
+    assert pages == [50, 50, 20]
+
+
+def test_run_log_sessions_are_paged_over_the_log():
+    sql = str(runs_page_query(_storage(), "log", "s1", after=-1, limit=50).compile(dialect=postgresql.dialect()))
+    assert 'alice."1a2b3c4d_sage_sessions_log"' in sql
+    assert "ORDER BY" in sql and "LIMIT" in sql
+
+
+def test_runs_are_read_a_page_at_a_time(monkeypatch):
+    runs = [{"n": n} for n in range(7)]
+    queries = []
+
+    class Session:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def execute(self, query):
+            after, limit = query
+            queries.append(query)
+            return SimpleNamespace(fetchall=lambda: [(n, runs[n]) for n in range(after + 1, min(after + 1 + limit, 7))])
+
+    monkeypatch.setattr(export, "runs_page_query", lambda storage, source, session_id, after, limit: (after, limit))
+    storage = SimpleNamespace(Session=Session)
+    assert list(iter_session_runs(storage, "s1", "log", page_size=3)) == runs
+    assert queries == [(-1, 3), (2, 3), (5, 3)]
+
+
+def test_markdown_and_jsonl_are_written_run_by_run():
+    markdown = list(markdown_chunks("sage", RUNS))
+    assert markdown[0] == "# sage - Chat History\n\n"
+    assert len(markdown) == 3
+    assert "### 👤 User\nWho are you?" in markdown[1]
+    assert "**1. duckduckgo_search**" in markdown[1] and '{"query": "sage"}' in markdown[1]
+    assert "### 🤖 Assistant (cancelled)\nSure" in markdown[2]
+    assert list(markdown_chunks("sage", [])) == ["# sage - Chat History\n\n", "No messages to export.\n"]
+
+    lines = list(jsonl_chunks(RUNS))
+    assert [json.loads(line) for line in lines] == RUNS
+    assert all(line.endswith("\n") and line.count("\n") == 1 for line in lines)
@@ -0,0 +1,84 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.embedder.base import Embedder
+from sqlalchemy.sql.expression import select
+
+from db import partitioned
+from db.partitioned import shared_knowledge_ddl, shared_sessions_ddl, tenant_partition_name
+from db.settings import db_settings
+from db.tenancy import table_prefix, tenant_schema
+from knowledge.settings import knowledge_settings
+from knowledge.shared import SharedPgVector
+
+TENANT_ID = "177e3ac4-2b0c-4c53-9a55-0b7f5d1f3c11"
+
+
+def test_tenant_naming():
+    assert tenant_schema("Jane.Doe@example.com") == "jane_doe_example_com"
+    assert table_prefix(TENANT_ID) == "177e3ac4"
+    assert tenant_partition_name("knowledge", TENANT_ID) == "knowledge_t_177e3ac42b0c4c539a550b7f5d1f3c11"
+
+
+def test_shared_tables_are_partitioned_by_tenant():
+    knowledge = "\n".join(shared_knowledge_ddl("ai", 1536))
+    sessions = "\n".join(shared_sessions_ddl("ai"))
+    assert "PRIMARY KEY (tenant_id, id)" in knowledge
+    assert "PRIMARY KEY (tenant_id, session_id)" in sessions
+    if db_settings.shared_partitioning == "hash":
+        assert "PARTITION BY HASH (tenant_id)" in knowledge
+        assert f"MODULUS {db_settings.shared_partitions}, REMAINDER 0" in sessions
+
+
+def test_shared_vector_db_is_tenant_scoped():
+    vector_db = SharedPgVector(
+        tenant_id=TENANT_ID,
+        schema="ai",
+        db_url="postgresql+psycopg://ai:ai@localhost:5432/ai",
+        embedder=Embedder(dimensions=8),
+    )
+    assert vector_db.table.fullname == "ai.knowledge"
+    assert [c.name for c in vector_db.table.primary_key.columns] == ["tenant_id", "id"]
+    stmt = vector_db._scope(select(vector_db.table.c.id))
+    assert "knowledge.tenant_id =" in str(stmt)
+
+
+def test_shared_knowledge_index_is_hnsw(monkeypatch):
+    # IVFFlat lists built on the empty parent would never be trained
+    monkeypatch.setattr(knowledge_settings, "kg_vector_index", "ivfflat")
+    knowledge = "\n".join(shared_knowledge_ddl("ai", 1536))
+    assert "USING hnsw" in knowledge and "ivfflat" not in knowledge
+    vector_db = SharedPgVector(
+        tenant_id=TENANT_ID,
+        schema="ai",
+        db_url="postgresql+psycopg://ai:ai@localhost:5432/ai",
+        embedder=Embedder(dimensions=8),
+    )
+    assert vector_db.index_method == "hnsw"
+
+
+def test_list_partitioning_has_no_default_partition(monkeypatch):
+    monkeypatch.setattr(db_settings, "shared_partitioning", "list")
+    assert partitioned._partition_statements("ai", "knowledge") == []
+
+
+class FakeCatalog:
+    def __init__(self, row):
+        self.row = row
+
+    def execute(self, statement, params):
+        return self
+
+    def first(self):
+        return self.row
+
+
+def test_partitions_are_detached_concurrently():
+    detach = partitioned._detach_statement
+    assert detach(FakeCatalog(None), "ai", "knowledge", "ai.p") is None
+    assert detach(FakeCatalog((False, False)), "ai", "knowledge", "ai.p").endswith("DETACH PARTITION ai.p CONCURRENTLY")
+    # Not allowed next to a default partition, and an interrupted detach has to be finalized
+    assert detach(FakeCatalog((False, True)), "ai", "knowledge", "ai.p").endswith("DETACH PARTITION ai.p")
+    assert detach(FakeCatalog((True, False)), "ai", "knowledge", "ai.p").endswith("DETACH PARTITION ai.p FINALIZE")
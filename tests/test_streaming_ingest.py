@@ -0,0 +1,76 @@
+import io
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from knowledge.chunking import TokenAwareChunking
+from knowledge.ingest import ingest_file
+from knowledge.readers import iter_csv, iter_text
+from knowledge.uploads import UploadTooLarge, safe_filename, save_upload, staging_name
+
+
+def test_csv_is_read_in_row_batches(tmp_path):
+    path = tmp_path / "movies.csv"
+    path.write_text("Title,Year\n" + "".join(f"Movie {i},2000\n" for i in range(5)))
+    documents = list(iter_csv(path, rows_per_document=2))
+    assert [d.id for d in documents] == ["movies.csv_1", "movies.csv_2", "movies.csv_3"]
+    assert documents[0].name == "movies"
+    assert documents[0].content == "Title, Year\nMovie 0, 2000\nMovie 1, 2000"
+    assert documents[2].content == "Title, Year\nMovie 4, 2000"
+
+
+def test_text_blocks_break_at_blank_lines(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("aaaa\nbbbb\n\ncccc\n\ndddd\n")
+    documents = list(iter_text(path, block_chars=8))
+    assert [d.content for d in documents] == ["aaaa\nbbbb\n", "\ncccc\n\ndddd\n"]
+    # Ids keep the extension, so notes.md would not write over the chunks of notes.txt
+    assert [d.id for d in documents] == ["notes.txt_1", "notes.txt_2"]
+
+
+def test_save_upload_streams_to_disk(tmp_path):
+    source = io.BytesIO(b"x" * 10_000)
+    path = save_upload(source, tmp_path, "../../report.pdf", chunk_bytes=1024)
+    assert path == tmp_path / "report.pdf"
+    assert path.read_bytes() == b"x" * 10_000
+
+    with pytest.raises(UploadTooLarge):
+        save_upload(io.BytesIO(b"x" * 10_000), tmp_path, "big.pdf", chunk_bytes=1024, max_bytes=5000)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["report.pdf"]
+
+
+def test_safe_filename():
+    assert safe_filename("C:\\Users\\me\\cv.docx") == "cv.docx"
+    with pytest.raises(ValueError):
+        safe_filename("../")
+
+
+def test_uploads_of_the_same_file_are_staged_apart(tmp_path):
+    first = save_upload(io.BytesIO(b"first"), tmp_path, staging_name("../report.pdf"))
+    second = save_upload(io.BytesIO(b"second"), tmp_path, staging_name("report.pdf"))
+    assert first != second
+    assert first.name.endswith("-report.pdf") and first.suffix == ".pdf"
+    assert (first.read_bytes(), second.read_bytes()) == (b"first", b"second")
+
+
+class WholeDocumentChunking(TokenAwareChunking):
+    """One chunk per document, without a tokenizer."""
+
+    def chunk_many(self, documents):
+        return [self._make_chunk(document, document.content, 1, 0) for document in documents]
+
+
+def test_staged_uploads_are_named_after_the_uploaded_file(tmp_path):
+    loaded = []
+    knowledge = SimpleNamespace(load_documents=lambda documents, upsert, filters: loaded.extend(documents))
+    for _ in range(2):
+        path = save_upload(io.BytesIO(b"Title,Year\nMovie,2000\n"), tmp_path, staging_name("movies.csv"))
+        ingest_file(knowledge, path, "t1", strategy=WholeDocumentChunking(), document_id="movies.csv")
+    # Both uploads write the same chunk ids, so the second one upserts over the first
+    assert [d.id for d in loaded[:1]] == [d.id for d in loaded[1:]]
+    assert loaded[0].id == "movies.csv_1_1" and loaded[0].name == "movies"
+    assert loaded[0].meta_data["document_id"] == "movies.csv"
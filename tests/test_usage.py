@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from agno.agent import RunResponse
+from sqlalchemy.exc import DataError
+
+from agents.models import AgentOpenAIChat
+from agents.runtime import ToolMetricsAgent
+from agents.usage import run_cost, usage_record
+from db.usage import LATENCY_BUCKETS_MS, UsageRecord, UsageWriter, histogram_percentile, rollup_statement
+
+
+class RecordingEngine:
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.batches = []
+        self.fail = fail
+        self.delay = delay
+
+    @contextmanager
+    def begin(self):
+        def execute(stmt, rows):
+            time.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("database is down")
+            if any(row["tenant_id"] == "not-a-uuid" for row in rows):
+                raise DataError("INSERT INTO ai.usage_runs", None, Exception("invalid input syntax for type uuid"))
+            self.batches.append(rows)
+
+        yield SimpleNamespace(execute=execute)
+
+
+def _record(n: int = 0) -> UsageRecord:
+    return UsageRecord(
+        created_at=datetime.now(timezone.utc),
+        tenant_id=None,
+        agent_id="sage",
+        model_id="gpt-4o",
+        status="completed",
+        duration_ms=n,
+    )
+
+
+def test_usage_record_from_run_metrics():
+    agent = ToolMetricsAgent(agent_id="sage", model=AgentOpenAIChat(id="gpt-4o", api_key="test"))
+    agent.run_id = "run-1"
+    agent.storage = SimpleNamespace(last_read_cached=True)
+    agent.run_response = RunResponse(
+        metrics={
+            "input_tokens": [1000, 2000],
+            "output_tokens": [100, 300],
+            "prompt_tokens_details": [{"cached_tokens": 0}, {"cached_tokens": 1024}],
+            "time": [0.8, 1.2],
+            "time_to_first_token": [0.3],
+            "tool_call_times": {"duckduckgo_search": [0.5, 0.25], "search_knowledge_base": [0.1]},
+        }
+    )
+    record = usage_record(agent, "7b0c4f1e-0000-0000-0000-000000000000", "completed", 3.5)
+    assert (record.agent_id, record.model_id, record.run_id, record.status) == ("sage", "gpt-4o", "run-1", "completed")
+    assert (record.input_tokens, record.output_tokens, record.cached_tokens) == (3000, 400, 1024)
+    assert (record.duration_ms, record.model_ms, record.first_token_ms) == (3500, 2000, 300)
+    assert (record.tool_ms, record.tool_calls) == (850, 3)
+    assert record.session_cache_hit is True
+    assert record.cost_usd == run_cost("gpt-4o", 3000, 1024, 400)
+    # 1976 uncached and 1024 cached input tokens, 400 output tokens
+    assert abs(record.cost_usd - (1976 * 2.5 + 1024 * 1.25 + 400 * 10) / 1_000_000) < 1e-12
+    assert run_cost("unpriced-model", 1000, 0, 1000) == 0.0
+
+
+def test_records_are_written_in_batches():
+    engine = RecordingEngine()
+    writer = UsageWriter(batch_size=3, flush_seconds=0.05, queue_max=100, engine=engine)
+    for n in range(7):
+        writer.record(_record(n))
+    writer.close()
+    assert [len(batch) for batch in engine.batches] == [3, 3, 1]
+    assert [row["duration_ms"] for batch in engine.batches for row in batch] == list(range(7))
+    assert writer.stats().written == 7
+
+
+def test_recording_never_waits_on_the_database():
+    engine = RecordingEngine(delay=0.5)
+    writer = UsageWriter(batch_size=1, flush_seconds=0.01, queue_max=2, engine=engine)
+    start = time.perf_counter()
+    for n in range(10):
+        writer.record(_record(n))
+    assert time.perf_counter() - start < 0.1
+    stats = writer.stats()
+    # One record in the slow INSERT, two queued, the others dropped
+    assert stats.dropped >= 7
+    writer.close(timeout=0)
+
+    failing = UsageWriter(batch_size=10, flush_seconds=0.01, engine=RecordingEngine(fail=True))
+    failing.record(_record())
+    failing.close()
+    assert (failing.stats().failed, failing.stats().written) == (1, 0)
+    assert not failing._thread.is_alive()
+
+
+def test_a_rejected_record_does_not_drop_its_batch():
+    engine = RecordingEngine()
+    writer = UsageWriter(batch_size=5, flush_seconds=0.05, engine=engine)
+    records = [_record(n) for n in range(5)]
+    records[2].tenant_id = "not-a-uuid"
+    for record in records:
+        writer.record(record)
+    writer.close()
+    assert [row["duration_ms"] for batch in engine.batches for row in batch] == [0, 1, 3, 4]
+    assert (writer.stats().written, writer.stats().failed) == (4, 1)
+
+    # Invalid tenant ids are not queued in the first place
+    agent = ToolMetricsAgent(agent_id="sage", model=AgentOpenAIChat(id="gpt-4o", api_key="test"))
+    with pytest.raises(ValueError):
+        usage_record(agent, "foo", "completed", 1.0)
+
+
+def test_latency_percentiles_from_histograms():
+    # Bucket 0 holds runs under 250ms, bucket 3 runs from 1s to 2s, the last bucket runs over 120s
+    histogram = {0: 50, 3: 45, 5: 4, len(LATENCY_BUCKETS_MS): 1}
+    assert histogram_percentile(histogram, 0.5) == 250
+    assert histogram_percentile(histogram, 0.95) == 2000
+    assert histogram_percentile(histogram, 0.99) == 5000
+    assert histogram_percentile(histogram, 1.0) == LATENCY_BUCKETS_MS[-1]
+    assert histogram_percentile({}, 0.5) is None
+
+
+def test_rollups_are_built_from_the_runs_table():
+    sql = rollup_statement()
+    assert "FROM ai.usage_runs" in sql and "INSERT INTO ai.usage_rollups" in sql
+    assert "percentile_cont(0.95) WITHIN GROUP (ORDER BY r.duration_ms)" in sql
+    assert f"width_bucket(duration_ms, ARRAY[{LATENCY_BUCKETS_MS[0]}," in sql
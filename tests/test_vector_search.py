@@ -0,0 +1,116 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agno.embedder.base import Embedder
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import create_engine
+
+from db.session import configure_prepared_statements
+from knowledge.settings import knowledge_settings
+from knowledge.vector_db import TenantPgVector, get_vector_index
+
+TENANT_ID = "177e3ac4-2b0c-4c53-9a55-0b7f5d1f3c11"
+
+
+class FixedEmbedder(Embedder):
+    def get_embedding(self, text):
+        return [0.5] * (self.dimensions or 0)
+
+
+class RecordingSession:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, stmt, params=None):
+        self.executed.append((str(stmt.compile(dialect=postgresql.dialect())), params))
+        return SimpleNamespace(fetchall=lambda: [])
+
+    def begin(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _vector_db(vector_index=None) -> TenantPgVector:
+    return TenantPgVector(
+        table_name="177e3ac4_sage_kg",
+        schema="jane",
+        db_url="postgresql+psycopg://ai:ai@localhost:5432/ai",
+        embedder=FixedEmbedder(dimensions=8),
+        vector_index=vector_index or HNSW(ef_search=40),
+    )
+
+
+def test_tenant_search_parameters(monkeypatch):
+    monkeypatch.setattr(knowledge_settings, "kg_tenant_search", {TENANT_ID: {"ef_search": 120, "probes": 30}})
+    monkeypatch.setattr(knowledge_settings, "kg_vector_index", "hnsw")
+    assert get_vector_index(TENANT_ID).ef_search == 120
+    assert get_vector_index("another-tenant").ef_search == knowledge_settings.kg_hnsw_ef_search
+    monkeypatch.setattr(knowledge_settings, "kg_vector_index", "ivfflat")
+    assert get_vector_index(TENANT_ID).probes == 30
+    assert get_vector_index(None).probes == knowledge_settings.kg_ivfflat_probes
+
+
+def test_hybrid_search_sql_is_the_same_for_every_query():
+    vector_db = _vector_db()
+    statements = []
+    for query, ef_search in (("pgvector indexes", 40), ("tenant layouts", 40)):
+        session = RecordingSession()
+        vector_db.Session = lambda: session
+        vector_db.hybrid_search(query, limit=5)
+        (set_sql, set_params), (search_sql, _) = session.executed
+        # ANN parameters are bound, not written into the SQL
+        assert set_sql == "SELECT set_config(%(name)s, %(value)s, true)"
+        assert set_params == {"name": "hnsw.ef_search", "value": str(max(ef_search, 5 * 4))}
+        statements.append(search_sql)
+    assert statements[0] == statements[1]
+    # LIMITs are inlined so the generic plan keeps using the ANN index
+    assert "LIMIT 20" in statements[0] and "LIMIT 5" in statements[0]
+
+
+def test_quantized_search_rescores_with_full_precision(monkeypatch):
+    monkeypatch.setattr(knowledge_settings, "kg_rescore_multiplier", 4)
+    vector_db = TenantPgVector(
+        table_name="177e3ac4_sage_kg",
+        schema="jane",
+        db_url="postgresql+psycopg://ai:ai@localhost:5432/ai",
+        embedder=FixedEmbedder(dimensions=8),
+        vector_index=HNSW(ef_search=10),
+        vector_storage="binary",
+    )
+    session = RecordingSession()
+    vector_db.Session = lambda: session
+    vector_db.vector_search("pgvector", limit=5)
+    (_, set_params), (search_sql, _) = session.executed
+    # ef_search covers the 20 candidates taken from the quantized index
+    assert set_params == {"name": "hnsw.ef_search", "value": "20"}
+    # Same expression as the index, then the full-precision distance for the 5 results
+    assert 'ORDER BY CAST(binary_quantize(jane."177e3ac4_sage_kg".embedding) AS BIT(8)) <~>' in search_sql
+    assert "LIMIT 20" in search_sql
+    assert search_sql.endswith("LIMIT 5")
+    assert "embedding <=> " in search_sql
+
+
+def test_ivfflat_probes_are_bound():
+    vector_db = _vector_db(Ivfflat(probes=25))
+    session = RecordingSession()
+    vector_db._set_ann_parameters(session, 100)
+    assert session.executed[0][1] == {"name": "ivfflat.probes", "value": "25"}
+
+
+def test_prepared_statements_are_configured_on_connect():
+    engine = configure_prepared_statements(
+        create_engine("postgresql+psycopg://ai:ai@localhost:5432/ai"), threshold=1, prepared_max=300
+    )
+    connection = SimpleNamespace(prepare_threshold=5, prepared_max=100)
+    # The dialect's own connect hooks need a real connection, run the one added last
+    list(engine.pool.dispatch.connect)[-1](connection, None)
+    assert (connection.prepare_threshold, connection.prepared_max) == (1, 300)
@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import knowledge.watcher as watcher
+from knowledge.watcher import RagDataWatcher, load_state, sync_tenant
+
+
+class RecordingVectorDb:
+    def __init__(self):
+        self.deleted = []
+
+    def delete_document(self, document_id):
+        self.deleted.append(document_id)
+        return 1
+
+
+class RecordingKnowledge:
+    def __init__(self):
+        self.vector_db = RecordingVectorDb()
+
+
+def test_sync_tenant_only_processes_the_delta(tmp_path, monkeypatch):
+    ingested = []
+    monkeypatch.setattr(
+        watcher, "ingest_file", lambda knowledge, path, tenant_id, document_id: ingested.append(document_id) or 1
+    )
+    monkeypatch.setattr(watcher, "record_ingestion", lambda *args, **kwargs: None)
+    monkeypatch.setattr(watcher, "forget_ingestion", lambda *args, **kwargs: None)
+    knowledge = RecordingKnowledge()
+    (tmp_path / "a.txt").write_text("alpha")
+    (tmp_path / "b.csv").write_text("x,y\n1,2\n")
+    (tmp_path / ".partial.txt").write_text("skipped")
+    (tmp_path / "image.png").write_bytes(b"skipped")
+
+    delta = sync_tenant(tmp_path, "t1", knowledge)
+    assert (delta.added, delta.changed, delta.removed) == (["a.txt", "b.csv"], [], [])
+    assert ingested == ["a.txt", "b.csv"]
+    # Chunks of a file the state did not know, also those the old readers named by stem, are replaced
+    assert knowledge.vector_db.deleted == ["a.txt", "a", "b.csv", "b"]
+    assert set(load_state(tmp_path)) == {"a.txt", "b.csv"}
+
+    # Nothing changed, nothing is re-ingested
+    assert not sync_tenant(tmp_path, "t1", knowledge)
+
+    # Touched with the same content is not a change
+    os.utime(tmp_path / "a.txt", ns=(0, 0))
+    assert not sync_tenant(tmp_path, "t1", knowledge)
+
+    (tmp_path / "a.txt").write_text("alpha, second version")
+    (tmp_path / "b.csv").unlink()
+    delta = sync_tenant(tmp_path, "t1", knowledge)
+    assert (delta.added, delta.changed, delta.removed) == ([], ["a.txt"], ["b.csv"])
+    assert knowledge.vector_db.deleted[4:] == ["b.csv", "a.txt"]
+    assert ingested == ["a.txt", "b.csv", "a.txt"]
+    assert set(load_state(tmp_path)) == {"a.txt"}
+
+
+def test_changed_paths_map_to_tenant_dirs(tmp_path):
+    for name in ("t1", "t2", "blobs"):
+        (tmp_path / name).mkdir()
+    rag_watcher = RagDataWatcher(lambda tenant_id: None, root=tmp_path)
+    changed = [
+        str(tmp_path / "t1" / "report.pdf"),
+        str(tmp_path / "t2" / ".uploads" / "staged.pdf"),
+        str(tmp_path / "t2" / "manifest.json"),
+        str(tmp_path / "blobs" / "ab" / "abcdef.gz"),
+    ]
+    assert rag_watcher._changed_dirs(changed) == [tmp_path / "t1"]
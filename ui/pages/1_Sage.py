@@ -1,11 +1,14 @@
 import asyncio
+import time
 import nest_asyncio
 import streamlit as st
 from agno.agent import Agent
 from agno.tools.streamlit.components import check_password
 from agno.utils.log import logger
 
+from agents.routing import record_route_latency, route_agent
 from agents.sage import get_sage
+from agents.usage import record_run_usage
 from ui.css import CUSTOM_CSS
 from ui.utils import (
     about_agno,
@@ -136,6 +139,8 @@ async def body() -> None:
             with st.spinner(":thinking_face: Thinking..."):
                 response = ""
                 try:
+                    start = time.perf_counter()
+                    route = route_agent(sage, model_id, user_message)
                     run_response = await sage.arun(user_message, stream=True)
                     async for resp_chunk in run_response:
                         if resp_chunk.tools and len(resp_chunk.tools) > 0:
@@ -143,12 +148,16 @@ async def body() -> None:
                         if resp_chunk.content is not None:
                             response += resp_chunk.content
                             resp_container.markdown(response)
+                    elapsed = time.perf_counter() - start
+                    record_route_latency(route, elapsed)
+                    record_run_usage(sage, tenant_id, "completed", elapsed)
                     if sage.run_response is not None:
                         await add_message(agent_name, "assistant", response, sage.run_response.tools)
                     else:
                         await add_message(agent_name, "assistant", response)
                 except Exception as e:
                     logger.error(f"Error during agent run: {str(e)}", exc_info=True)
+                    record_run_usage(sage, tenant_id, "failed", time.perf_counter() - start)
                     error_message = f"Sorry, I encountered an error: {str(e)}"
                     await add_message(agent_name, "assistant", error_message)
                     st.error(error_message)
@@ -0,0 +1,111 @@
+import asyncio
+
+import nest_asyncio
+import pandas as pd
+import streamlit as st
+from agno.tools.streamlit.components import check_password
+
+from api.settings import api_settings
+from db.session import get_db_engine
+from db.usage import hourly_usage, usage_by_tenant, window_start
+from ui.css import CUSTOM_CSS
+
+nest_asyncio.apply()
+
+st.set_page_config(
+    page_title="Usage",
+    page_icon=":bar_chart:",
+    layout="wide",
+)
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+WINDOWS = {"Last 24 hours": 24, "Last 7 days": 24 * 7, "Last 30 days": 24 * 30}
+
+
+async def header():
+    st.markdown("<h1 class='heading'>Usage</h1>", unsafe_allow_html=True)
+    st.markdown(
+        "<p class='subheading'>Runs, latency and cost per tenant, from the hourly usage rollups.</p>",
+        unsafe_allow_html=True,
+    )
+
+
+# The rollups change every few minutes at most (USAGE_ROLLUP_INTERVAL_SECONDS)
+@st.cache_data(ttl=60, show_spinner=False)
+def load_usage(hours: int):
+    start = window_start(hours)
+    engine = get_db_engine()
+    return usage_by_tenant(engine, start), hourly_usage(engine, start)
+
+
+async def body() -> None:
+    if "phantom_token" not in st.session_state:
+        st.error("🔐 Please log in first.")
+        st.stop()
+    _, username = st.session_state["phantom_token"].split(":")
+    if username.lower() not in {user.lower() for user in api_settings.admin_users}:
+        st.error("This page is for administrators (ADMIN_USERS).")
+        st.stop()
+
+    window = st.sidebar.selectbox("Window", options=list(WINDOWS), index=0)
+    hours = WINDOWS[window]
+    tenants, hourly = load_usage(hours)
+    if not tenants:
+        st.info("No usage recorded in this window yet.")
+        return
+
+    runs = sum(tenant.runs for tenant in tenants)
+    cols = st.columns(4)
+    cols[0].metric("Runs", f"{runs:,}")
+    cols[1].metric("Runs per hour", f"{runs / hours:,.1f}")
+    cols[2].metric("Cost", f"${sum(tenant.cost_usd for tenant in tenants):,.2f}")
+    cols[3].metric("Tokens", f"{sum(tenant.input_tokens + tenant.output_tokens for tenant in tenants):,}")
+
+    st.markdown("#### Per tenant")
+    # Percentiles are upper bounds of the latency histogram buckets
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {
+                    "user": tenant.user_name or tenant.tenant_id or "(no tenant)",
+                    "runs": tenant.runs,
+                    "runs/hour": round(tenant.runs / hours, 2),
+                    "cancelled": tenant.cancelled_runs,
+                    "failed": tenant.failed_runs,
+                    "input tokens": tenant.input_tokens,
+                    "output tokens": tenant.output_tokens,
+                    "prompt cache": f"{tenant.prompt_cache_rate:.0%}",
+                    "cost ($)": round(tenant.cost_usd, 4),
+                    "avg (ms)": round(tenant.avg_ms),
+                    "p50 (ms)": tenant.percentile_ms(0.5),
+                    "p95 (ms)": tenant.percentile_ms(0.95),
+                    "p99 (ms)": tenant.percentile_ms(0.99),
+                    "model (ms/run)": round(tenant.model_ms / tenant.runs) if tenant.runs else 0,
+                    "tools (ms/run)": round(tenant.tool_ms / tenant.runs) if tenant.runs else 0,
+                }
+                for tenant in tenants
+            ]
+        ),
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    if hourly:
+        frame = pd.DataFrame(hourly).set_index("bucket")
+        left, right = st.columns(2)
+        with left:
+            st.markdown("#### Runs per hour")
+            st.line_chart(frame["runs"])
+        with right:
+            st.markdown("#### Cost per hour ($)")
+            st.bar_chart(frame["cost_usd"])
+
+
+async def main():
+    await header()
+    await body()
+
+
+if __name__ == "__main__":
+    if check_password():
+        asyncio.run(main())
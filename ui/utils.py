@@ -1,22 +1,19 @@
-from typing import Any, Callable, Dict, List, Optional
 import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+from pathlib import Path
 from uuid import UUID
-from urllib.parse import urlparse
-from datetime import datetime
 
 import streamlit as st
-import requests
 
 from agno.agent import Agent
-from agno.document import Document
-from agno.document.reader import Reader
-from agno.document.reader.csv_reader import CSVReader
-from agno.document.reader.docx_reader import DocxReader
-from agno.document.reader.pdf_reader import PDFReader
-from agno.document.reader.text_reader import TextReader
-from agno.document.reader.website_reader import WebsiteReader
 from agno.utils.log import logger
 
+from knowledge.ingest import ingest_upload, ingest_url
+from knowledge.readers import SUPPORTED_FILE_TYPES
+from knowledge.store import delete_tenant_knowledge
+from knowledge.uploads import safe_filename, save_upload, staging_name, tenant_upload_dir
+
 
 async def initialize_agent_session_state(agent_name: str):
     logger.info(f"---*--- Initializing session state for {agent_name} ---*---")
@@ -32,6 +29,7 @@ async def selected_model() -> str:
     model_options = {
         "gpt-4o": "gpt-4o",
         "o3-mini": "o3-mini",
+        "auto": "auto",
     }
     selected_model = st.sidebar.selectbox(
         "Choose a model",
@@ -109,33 +107,17 @@ async def example_inputs(agent_name: str) -> None:
                 )
 
 
-def process_document_with_agent(agent: Agent, tenant_id: UUID, file_path: str):
-    """Uses agent.knowledge.load_documents to auto-vectorize and insert documents."""
+def process_document_with_agent(agent: Agent, tenant_id: UUID, file_path: str, name: Optional[str] = None):
+    """Streams the file through the chunker into agent.knowledge in batches."""
     logger.info(f"📄 Loading document for tenant: {tenant_id}")
     file_type = file_path.split(".")[-1].lower()
-
-    reader: Reader
-    if file_type == "pdf":
-        reader = PDFReader()
-    elif file_type == "csv":
-        reader = CSVReader()
-    elif file_type == "txt":
-        reader = TextReader()
-    elif file_type == "docx":
-        reader = DocxReader()
-    else:
+    if file_type not in SUPPORTED_FILE_TYPES:
         raise ValueError(f"Unsupported file type: {file_type}")
 
     try:
-        with open(file_path, "rb") as f:
-            documents: List[Document] = reader.read(f)
-
-        if not documents:
-            logger.warning(f"No content extracted from: {file_path}")
-            return
-
-        agent.knowledge.load_documents(documents, upsert=True, filters={"tenant_id": str(tenant_id)})
-        logger.info(f"✅ Document inserted for tenant {tenant_id}")
+        chunks = ingest_upload(agent.knowledge, Path(file_path), str(tenant_id), name=name)
+        if chunks:
+            logger.info(f"✅ Document inserted for tenant {tenant_id} ({chunks} chunks)")
     except Exception as e:
         logger.error(f"❌ Failed to load document for tenant {tenant_id}: {str(e)}")
 
@@ -150,21 +132,10 @@ async def knowledge_widget(agent_name: str, agent: Agent) -> None:
         )
         if st.sidebar.button("Add URL") and input_url:
             st.sidebar.info("Processing URL...", icon="ℹ️")
-            rag_path = os.path.join("rag_data", tenant_id)
-            os.makedirs(rag_path, exist_ok=True)
             try:
-                response = requests.get(input_url)
-                response.raise_for_status()
-                parsed_url = urlparse(input_url)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{parsed_url.netloc}_{timestamp}.html"
-                file_path = os.path.join(rag_path, filename)
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(response.text)
-                scraper = WebsiteReader(max_links=2, max_depth=1)
-                web_documents: List[Document] = scraper.read(input_url)
-                if web_documents:
-                    agent.knowledge.load_documents(web_documents, upsert=True, filters={"tenant_id": tenant_id})
+                # Crawled pages are not kept in the blob store, like the API's ingest_url: chunks are
+                # tagged with the URL, which is not a file name delete_document could remove
+                if ingest_url(agent.knowledge, input_url, tenant_id):
                     st.sidebar.success("URL added to knowledge base.")
                 else:
                     st.sidebar.error("Could not read website.")
@@ -181,14 +152,11 @@ async def knowledge_widget(agent_name: str, agent: Agent) -> None:
             st.sidebar.info("Processing document...", icon="🧠")
             document_name = uploaded_file.name.split(".")[0]
             if f"{document_name}_uploaded" not in st.session_state:
-                rag_path = os.path.join("rag_data", tenant_id)
-                os.makedirs(rag_path, exist_ok=True)
-                file_path = os.path.join(rag_path, uploaded_file.name)
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-
                 try:
-                    process_document_with_agent(agent, tenant_id, file_path)
+                    # Copied to disk in chunks, the file is then read back page by page / row by row
+                    name = safe_filename(uploaded_file.name)
+                    file_path = save_upload(uploaded_file, tenant_upload_dir(tenant_id), staging_name(name))
+                    process_document_with_agent(agent, tenant_id, str(file_path), name=name)
                     st.sidebar.success("Document added to knowledge base.")
                 except Exception as e:
                     st.sidebar.error(f"Could not process document: {str(e)}")
@@ -197,8 +165,10 @@ async def knowledge_widget(agent_name: str, agent: Agent) -> None:
                 st.session_state[agent_name]["file_uploader_key"] += 1
 
         if st.sidebar.button("🗑️ Delete Knowledge"):
-            await agent.knowledge.delete(filters={"tenant_id": tenant_id})
-            st.sidebar.success("Knowledge deleted!")
+            if delete_tenant_knowledge(agent.knowledge, tenant_id):
+                st.sidebar.success("Knowledge deleted!")
+            else:
+                st.sidebar.error("Could not delete knowledge.")
 
 
 async def session_selector(agent_name: str, agent: Agent, get_agent: Callable, user_id: str, model_id: str) -> None:
@@ -263,23 +233,33 @@ async def session_selector(agent_name: str, agent: Agent, get_agent: Callable, u
         st.sidebar.error("Failed to load sessions")
 
 
-def export_chat_history(agent_name: str):
-    if "messages" not in st.session_state[agent_name] or not st.session_state[agent_name]["messages"]:
-        return f"# {agent_name} - Chat History\n\nNo messages to export."
-    chat_text = f"# {agent_name} - Chat History\n\n"
-    for msg in st.session_state[agent_name]["messages"]:
-        role_label = "🤖 Assistant" if msg["role"] == "assistant" else "👤 User"
-        chat_text += f"### {role_label}\n{msg['content']}\n\n"
-        if msg.get("tool_calls"):
-            chat_text += "#### Tool Calls:\n"
-            for i, tool_call in enumerate(msg["tool_calls"]):
-                tool_name = tool_call.get("name", "Unknown Tool")
-                chat_text += f"**{i + 1}. {tool_name}**\n\n"
-                if "arguments" in tool_call:
-                    chat_text += f"Arguments: ```json\n{tool_call['arguments']}\n```\n\n"
-                if "content" in tool_call:
-                    chat_text += f"Results: ```\n{tool_call['content']}\n```\n\n"
-    return chat_text
+def export_chat_history(agent_name: str, agent: Agent) -> Optional[Path]:
+    """Write the session's chat history as Markdown to a temporary file, read from the agent's session
+    storage a page of runs at a time like the API's streamed export.
+
+    Built here rather than linked to the API so the phantom token never ends up in a URL.
+    """
+    from db.storage.export import find_session, iter_session_runs, markdown_chunks
+
+    source = find_session(agent.storage, agent.session_id, agent.user_id)
+    if source is None:
+        return None
+    runs = iter_session_runs(agent.storage, agent.session_id, source, user_id=agent.user_id)
+    fd, name = tempfile.mkstemp(prefix=f"{agent_name}_", suffix=".md")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for chunk in markdown_chunks(agent_name, runs):
+                f.write(chunk)
+    except BaseException:
+        Path(name).unlink(missing_ok=True)
+        raise
+    return Path(name)
+
+
+def drop_export(agent_name: str) -> None:
+    export = st.session_state[agent_name].pop("export", None)
+    if export:
+        export[1].unlink(missing_ok=True)
 
 
 async def utilities_widget(agent_name: str, agent: Agent) -> None:
@@ -289,16 +269,28 @@ async def utilities_widget(agent_name: str, agent: Agent) -> None:
         if st.button("🔄 Start New Chat"):
             restart_agent(agent_name)
     with col2:
-        fn = f"{agent_name}_chat_history.md"
-        if "session_id" in st.session_state[agent_name]:
-            fn = f"{agent_name}_{st.session_state[agent_name]['session_id']}.md"
-        if st.download_button(
-            ":file_folder: Export Chat History",
-            export_chat_history(agent_name),
-            file_name=fn,
-            mime="text/markdown",
-        ):
-            st.sidebar.success("Chat history exported!")
+        messages = st.session_state[agent_name].get("messages")
+        if agent.session_id and messages:
+            # An export is only offered for the turns it was built from
+            key = (agent.session_id, len(messages))
+            export = st.session_state[agent_name].get("export")
+            if export and (export[0] != key or not export[1].exists()):
+                drop_export(agent_name)
+            elif export:
+                with export[1].open("rb") as f:
+                    st.download_button(
+                        ":file_folder: Download Chat History",
+                        data=f,
+                        file_name=f"{agent_name}_{agent.session_id}.md",
+                        mime="text/markdown",
+                    )
+            if "export" not in st.session_state[agent_name] and st.button(":file_folder: Export Chat History"):
+                path = export_chat_history(agent_name, agent)
+                if path is None:
+                    st.sidebar.error("Session not found")
+                else:
+                    st.session_state[agent_name]["export"] = (key, path)
+                    st.rerun()
 
 
 def restart_agent(agent_name: str):
@@ -306,6 +298,7 @@ def restart_agent(agent_name: str):
     st.session_state[agent_name]["agent"] = None
     st.session_state[agent_name]["session_id"] = None
     st.session_state[agent_name]["messages"] = []
+    drop_export(agent_name)
     if "url_scrape_key" in st.session_state[agent_name]:
         st.session_state[agent_name]["url_scrape_key"] += 1
     if "file_uploader_key" in st.session_state[agent_name]:
@@ -218,7 +218,7 @@ prd_fastapi = FastApi(
     name=f"{ws_settings.prd_key}-api",
     group="api",
     image=prd_image,
-    command="uvicorn api.main:app --workers 2",
+    command="python -m api.server",
     port_number=8000,
     ecs_task_cpu="1024",
     ecs_task_memory="2048",
@@ -232,7 +232,7 @@ prd_fastapi = FastApi(
     # load_balancer_certificate_arn="LOAD_BALANCER_CERTIFICATE_ARN",
     load_balancer_security_groups=[prd_lb_sg],
     create_load_balancer=True,
-    health_check_path="/v1/health",
+    health_check_path="/v1/ready",
     env_vars=container_env,
     skip_delete=skip_delete,
     save_output=save_output,